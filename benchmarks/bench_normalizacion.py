@@ -0,0 +1,117 @@
+"""
+Benchmark de normalización de texto
+Compara rpa_texto.normalize_text con la implementación anterior (siete
+str.replace y un re.sub) sobre textos de varios megabytes, y verifica que
+ambas den el mismo resultado con los caracteres que cubría la anterior.
+
+Uso:
+  python benchmarks/bench_normalizacion.py
+  python benchmarks/bench_normalizacion.py --tamanos 1,8,32 --repeticiones 5
+  python benchmarks/bench_normalizacion.py --texto input/entregable1.pdf
+"""
+
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rpa_texto import normalize_text
+
+
+def normalize_text_anterior(text: str) -> str:
+    """Implementación anterior, conservada como referencia"""
+    text = text.upper()
+    replacements = {
+        'Á': 'A', 'É': 'E', 'Í': 'I', 'Ó': 'O', 'Ú': 'U',
+        'Ñ': 'N', '\n': ' ', '\t': ' '
+    }
+    for old, new in replacements.items():
+        text = text.replace(old, new)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+PALABRAS = (
+    "antecedentes ubicación del proyecto infraestructura existente servicios básicos "
+    "compatibilización del área a intervenir verificación partida registral señalización "
+    "diseño de mezclas calicata N° 3 escala 1/100 fecha 12/05/2023 según RNE A.010"
+).split()
+
+# Caracteres que la implementación anterior no cubría
+EXTRA = ["pingüino", "À", "ﬁn", " ", "•", "–", "“cita”", "Œ"]
+
+
+def sample_text(size_mb: float, extra: bool, seed: int = 0) -> str:
+    """Texto sintético con líneas cortas, tabulaciones y espacios repetidos"""
+    rng = random.Random(seed)
+    words = PALABRAS + (EXTRA if extra else [])
+    target = int(size_mb * 1024 * 1024)
+    lines = []
+    total = 0
+    while total < target:
+        line = " ".join(rng.choice(words) for _ in range(rng.randint(3, 14)))
+        if rng.random() < 0.1:
+            line = "\t" + line.upper() + "  "
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines)
+
+
+def load_text(path: str) -> str:
+    """Texto de un archivo .txt o extraído de un PDF"""
+    if path.lower().endswith(".pdf"):
+        from rpa_general import EntregableValidator
+        return EntregableValidator().extract_text_from_pdf(path)
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def best_time(func, text: str, repeticiones: int) -> float:
+    best = float("inf")
+    for _ in range(repeticiones):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(casos, repeticiones: int):
+    print(f"{'Caso':<28}{'MB':>8}{'Anterior (ms)':>16}{'Actual (ms)':>14}{'MB/s':>10}{'Mejora':>9}  Igual")
+    print("-" * 93)
+    for nombre, text, comparable in casos:
+        size_mb = len(text.encode('utf-8')) / (1024 * 1024)
+        anterior = best_time(normalize_text_anterior, text, repeticiones)
+        actual = best_time(normalize_text, text, repeticiones)
+        igual = normalize_text_anterior(text) == normalize_text(text) if comparable else None
+        print(f"{nombre:<28}{size_mb:>8.1f}{anterior * 1000:>16.1f}{actual * 1000:>14.1f}"
+              f"{size_mb / actual:>10.0f}{anterior / actual:>8.1f}x  "
+              f"{'-' if igual is None else ('sí' if igual else 'NO')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de normalización de texto")
+    parser.add_argument("--tamanos", default="1,4,16", help="Tamaños en MB separados por comas")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Repeticiones por caso (se toma la mejor)")
+    parser.add_argument("--texto", help="Archivo .txt o .pdf real a incluir (repetido hasta 16 MB)")
+    args = parser.parse_args()
+
+    casos = []
+    for size in (float(s) for s in args.tamanos.split(",") if s):
+        casos.append((f"sintético {size:g} MB", sample_text(size, extra=False), True))
+        casos.append((f"sintético {size:g} MB + unicode", sample_text(size, extra=True), False))
+    if args.texto:
+        text = load_text(args.texto)
+        if text:
+            repeat = max(1, (16 * 1024 * 1024) // max(1, len(text)))
+            casos.append((os.path.basename(args.texto)[:28], text * repeat, False))
+
+    run(casos, args.repeticiones)
+
+
+if __name__ == "__main__":
+    main()
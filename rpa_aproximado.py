@@ -0,0 +1,118 @@
+"""
+Búsqueda aproximada de títulos
+Tolera errores del texto extraído de documentos escaneados (palabras partidas
+como 'COMPATIBIL IZACION' o letras confundidas como 'PARTlDA').
+
+Cada título con presupuesto de k errores se divide en k + 1 fragmentos: toda
+aparición con k errores o menos contiene al menos un fragmento exacto
+(principio del palomar). Los fragmentos se localizan con búsqueda de
+subcadenas y solo las ventanas alrededor de esas posiciones se verifican con
+el algoritmo de Myers (distancia de edición con vectores de bits), por lo que
+el costo es casi lineal en el tamaño del texto.
+"""
+
+
+from typing import Dict, List, Optional, Tuple
+
+
+def split_pieces(pattern: str, errors: int) -> List[Tuple[int, str]]:
+    """Divide el patrón en errors + 1 fragmentos (desplazamiento, fragmento)"""
+    count = errors + 1
+    size, extra = divmod(len(pattern), count)
+    pieces = []
+    offset = 0
+    for i in range(count):
+        length = size + (1 if i < extra else 0)
+        pieces.append((offset, pattern[offset:offset + length]))
+        offset += length
+    return pieces
+
+
+def char_masks(pattern: str) -> Dict[str, int]:
+    """Máscara de bits de las posiciones de cada carácter del patrón"""
+    masks: Dict[str, int] = {}
+    for i, char in enumerate(pattern):
+        masks[char] = masks.get(char, 0) | (1 << i)
+    return masks
+
+
+def myers_search(pattern: str, text: str, masks: Optional[Dict[str, int]] = None) -> Tuple[int, int]:
+    """Menor distancia de edición del patrón contra cualquier subcadena del texto
+
+    Devuelve (errores, posición final de la coincidencia). Implementa el
+    algoritmo de Myers (1999) con enteros de Python como vectores de bits,
+    por lo que no hay límite de longitud del patrón.
+    """
+    m = len(pattern)
+    if m == 0:
+        return 0, 0
+    if masks is None:
+        masks = char_masks(pattern)
+    full = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv, mv = full, 0
+    score = m
+    best, best_end = m, -1
+    for position, char in enumerate(text):
+        eq = masks.get(char, 0)
+        xv = eq | mv
+        xh = ((((eq & pv) + pv) & full) ^ pv) | eq
+        ph = mv | (~(xh | pv) & full)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        # El inicio en el texto es libre: se desplaza un 0 en la fila superior
+        ph = (ph << 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(xv | ph) & full)
+        mv = ph & xv
+        if score < best:
+            best, best_end = score, position
+    return best, best_end + 1
+
+
+class ApproximateHeading:
+    """Título preparado para búsqueda aproximada con un presupuesto de errores"""
+
+    def __init__(self, heading: str, max_errors: int):
+        self.heading = heading
+        self.max_errors = max_errors
+        self.pieces = split_pieces(heading, max_errors)
+        self.masks = char_masks(heading)
+        self.reversed_masks = char_masks(heading[::-1])
+
+    def search(self, text: str) -> Optional[Dict]:
+        """Mejor coincidencia dentro del presupuesto, o None
+
+        Devuelve los errores, la posición y el fragmento del texto coincidente.
+        """
+        m = len(self.heading)
+        k = self.max_errors
+        best = None
+        checked = set()
+        for offset, piece in self.pieces:
+            if not piece:
+                continue
+            position = text.find(piece)
+            while position != -1:
+                # Ventana donde puede estar el título si el fragmento coincide aquí
+                start = max(0, position - offset - k)
+                end = min(len(text), position - offset + m + k)
+                if start not in checked:
+                    checked.add(start)
+                    errors, window_end = myers_search(self.heading, text[start:end], self.masks)
+                    if errors <= k and (best is None or errors < best["errores"]):
+                        match_end = start + window_end
+                        # El inicio se obtiene buscando el título invertido hacia atrás
+                        _, length = myers_search(self.heading[::-1], text[start:match_end][::-1], self.reversed_masks)
+                        best = {
+                            "errores": errors,
+                            "posicion": match_end - length,
+                            "fragmento": text[match_end - length:match_end]
+                        }
+                        if errors == 0:
+                            return best
+                position = text.find(piece, position + 1)
+        return best
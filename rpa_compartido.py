@@ -0,0 +1,185 @@
+"""
+Traspaso de documentos en memoria compartida
+El proceso que extrae un PDF publica el texto de las páginas y el texto
+normalizado en un segmento de memoria compartida; el proceso que valida lo
+adjunta y lee de él sin que el texto viaje serializado entre procesos. Solo
+el nombre del segmento pasa por la cola del ejecutor.
+
+Formato del segmento:
+  cabecera   firma b'RPAD', versión, indicadores, páginas, bytes del texto,
+             bytes del normalizado
+  páginas    posición (en caracteres) donde termina cada página, uint64
+  texto      texto extraído en UTF-8
+  normalizado  texto normalizado en UTF-8 (si el indicador está presente)
+
+El proceso principal reserva el nombre de cada segmento antes de encargar la
+extracción y lo elimina al terminar la validación, también si un trabajador
+falla o muere a mitad de camino.
+"""
+
+
+import os
+import struct
+from dataclasses import dataclass
+from itertools import count
+from multiprocessing import resource_tracker, shared_memory
+from typing import Set, Tuple
+
+from rpa_documento import Document
+
+
+_MAGIC = b"RPAD"
+_VERSION = 1
+_HAS_NORMALIZED = 0x1
+# firma, versión, indicadores, páginas, bytes del texto, bytes del normalizado
+_HEADER = struct.Struct("<4sHHIQQ")
+
+
+@dataclass(frozen=True)
+class SharedDocumentHandle:
+    """Referencia serializable a un documento publicado"""
+    name: str
+    path: str
+    from_cache: bool = False
+    timed_out_pages: Tuple[int, ...] = ()
+    image_pages: Tuple[int, ...] = ()
+
+
+def publish_document(document: Document, name: str, normalized: bool = True) -> SharedDocumentHandle:
+    """Copia el documento a un segmento nuevo con ese nombre
+
+    El segmento queda publicado al cerrar este proceso su vista; quien
+    reservó el nombre es responsable de eliminarlo. Si ya existe, es de un
+    intento anterior de la misma tarea (reencolada tras caer el grupo de
+    trabajadores) y se reemplaza.
+    """
+    text = document.text.encode('utf-8')
+    text_normalized = document.normalized.encode('utf-8') if normalized else b""
+    pages = len(document.page_ends)
+    ends_size = 8 * pages
+    size = _HEADER.size + ends_size + len(text) + len(text_normalized)
+    try:
+        segment = shared_memory.SharedMemory(name=name, create=True, size=max(size, 1))
+    except FileExistsError:
+        unlink_segment(name)
+        segment = shared_memory.SharedMemory(name=name, create=True, size=max(size, 1))
+    try:
+        buf = segment.buf
+        _HEADER.pack_into(buf, 0, _MAGIC, _VERSION, _HAS_NORMALIZED if normalized else 0,
+                          pages, len(text), len(text_normalized))
+        struct.pack_into(f"<{pages}Q", buf, _HEADER.size, *document.page_ends)
+        offset = _HEADER.size + ends_size
+        buf[offset:offset + len(text)] = text
+        offset += len(text)
+        buf[offset:offset + len(text_normalized)] = text_normalized
+        del buf
+    except BaseException:
+        segment.close()
+        segment.unlink()
+        raise
+    segment.close()
+    return SharedDocumentHandle(name, document.path, document.from_cache, document.timed_out_pages,
+                                document.image_pages)
+
+
+class SharedDocument:
+    """Documento publicado, adjuntado sin copiar el segmento
+
+    Las vistas text_view y normalized_view apuntan directamente a la memoria
+    compartida; document() las decodifica una vez para los validadores.
+    """
+
+    def __init__(self, handle: SharedDocumentHandle):
+        self.handle = handle
+        self._segment = shared_memory.SharedMemory(name=handle.name)
+        buf = self._segment.buf
+        magic, version, flags, pages, text_size, normalized_size = _HEADER.unpack_from(buf)
+        if magic != _MAGIC or version != _VERSION:
+            del buf
+            self._segment.close()
+            self._segment = None
+            raise ValueError(f"Segmento {handle.name} con formato desconocido")
+        self.page_ends = struct.unpack_from(f"<{pages}Q", buf, _HEADER.size)
+        offset = _HEADER.size + 8 * pages
+        self.text_view = buf[offset:offset + text_size]
+        offset += text_size
+        self.normalized_view = buf[offset:offset + normalized_size] if flags & _HAS_NORMALIZED else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        # Las vistas deben liberarse antes de cerrar el segmento
+        self.close()
+
+    def document(self) -> Document:
+        """Documento con el texto y el normalizado ya calculado"""
+        normalized = None if self.normalized_view is None else str(self.normalized_view, 'utf-8')
+        return Document(self.handle.path, str(self.text_view, 'utf-8'), self.page_ends,
+                        self.handle.from_cache, normalized=normalized,
+                        timed_out_pages=self.handle.timed_out_pages, image_pages=self.handle.image_pages)
+
+    def close(self):
+        """Libera las vistas y se desconecta del segmento (sin eliminarlo)"""
+        if getattr(self, "_segment", None) is None:
+            return
+        self.text_view.release()
+        if self.normalized_view is not None:
+            self.normalized_view.release()
+        self._segment.close()
+        self._segment = None
+
+
+def unlink_segment(name: str) -> bool:
+    """Elimina un segmento por nombre; False si ya no existía"""
+    try:
+        segment = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return False
+    segment.close()
+    segment.unlink()
+    return True
+
+
+class SharedSegments:
+    """Nombres de segmentos reservados por el proceso principal
+
+    Al cerrar (o al salir del bloque with) se eliminan los segmentos que
+    sigan reservados, aunque el trabajador que los creó haya muerto. Debe
+    crearse antes que el ejecutor de procesos.
+    """
+
+    def __init__(self, prefix: str = "rpa"):
+        # Los trabajadores creados después heredan este rastreador de recursos:
+        # si todos los procesos mueren, él elimina los segmentos restantes
+        resource_tracker.ensure_running()
+        self.prefix = f"{prefix}_{os.getpid()}"
+        self._counter = count()
+        self._reserved: Set[str] = set()
+
+    def __len__(self):
+        return len(self._reserved)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def reserve(self) -> str:
+        """Nombre nuevo para un segmento que creará un trabajador"""
+        name = f"{self.prefix}_{next(self._counter)}"
+        self._reserved.add(name)
+        return name
+
+    def release(self, name: str):
+        """Elimina el segmento (si llegó a crearse) y libera el nombre"""
+        self._reserved.discard(name)
+        unlink_segment(name)
+
+    def close(self):
+        for name in list(self._reserved):
+            self.release(name)
@@ -0,0 +1,236 @@
+"""
+Coordinación de varios nodos sobre un sistema de archivos compartido
+Los nodos que validan las mismas entradas (p. ej. input/ y output/ en NFS)
+se reparten los PDFs sin un servidor intermedio: cada uno toma un PDF
+creando su arrendamiento con O_EXCL, lo renueva mientras lo procesa y, al
+terminar, deja una marca de hecho y libera el arrendamiento.
+
+Un arrendamiento que no se renueva durante su plazo se da por abandonado
+(nodo caído) y otro nodo lo reclama. El plazo se mide con el reloj de quien
+observa el arrendamiento, no con una hora escrita por otro nodo, de modo que
+la diferencia de relojes entre hosts no importa.
+
+Directorio de estado:
+  arrendamientos/<clave>.lease   nodo, archivo y número de renovación
+  hechos/<clave>.json           resultado de cada PDF ya validado
+
+La clave combina la ruta del PDF, su tamaño y su fecha de modificación: un
+PDF reemplazado se vuelve a validar. Todos los nodos deben recibir las
+entradas con las mismas rutas.
+"""
+
+
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from rpa_registro import log_event, log_failure
+
+
+def default_node_id() -> str:
+    """Identificador del nodo: host y proceso"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def atomic_write(output_path: str, content: str):
+    """Escribe un archivo completo o nada (archivo temporal y renombrado)
+
+    El temporal lleva el host y el proceso para que dos nodos nunca
+    escriban el mismo temporal en un directorio compartido.
+    """
+    tmp_path = f"{output_path}.{socket.gethostname()}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, output_path)
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+class LeaseCoordinator:
+    """Arrendamientos de PDFs en un directorio compartido por varios nodos
+
+    Un hilo de fondo renueva los arrendamientos tomados cada tercio del plazo.
+    Al cerrar se liberan los que no llegaron a completarse.
+    """
+
+    def __init__(self, state_dir: str, node: Optional[str] = None, ttl: float = 120.0):
+        self.node = node or default_node_id()
+        self.ttl = ttl
+        self.leases_dir = os.path.join(state_dir, "arrendamientos")
+        self.done_dir = os.path.join(state_dir, "hechos")
+        os.makedirs(self.leases_dir, exist_ok=True)
+        os.makedirs(self.done_dir, exist_ok=True)
+        # Contenido escrito en cada arrendamiento propio, por clave
+        self._held: Dict[str, str] = {}
+        # Último contenido visto de los arrendamientos ajenos y desde cuándo
+        self._observed: Dict[str, Tuple[str, float]] = {}
+        self._done = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._renewer = threading.Thread(target=self._renew_loop, name="renovacion", daemon=True)
+        self._renewer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def poll_interval(self) -> float:
+        """Espera entre revisiones cuando todo lo pendiente está tomado por otros"""
+        return max(self.ttl / 4, 0.1)
+
+    def key(self, pdf_path: str) -> Optional[str]:
+        """Clave del PDF en su versión actual (None si ya no existe)"""
+        try:
+            stat = os.stat(pdf_path)
+        except OSError:
+            return None
+        source = f"{os.path.normpath(pdf_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        return hashlib.sha1(source.encode('utf-8')).hexdigest()[:20]
+
+    def _lease_path(self, key: str) -> str:
+        return os.path.join(self.leases_dir, f"{key}.lease")
+
+    def _done_path(self, key: str) -> str:
+        return os.path.join(self.done_dir, f"{key}.json")
+
+    def is_done(self, key: str) -> bool:
+        if key not in self._done and os.path.exists(self._done_path(key)):
+            self._done.add(key)
+        return key in self._done
+
+    def pending(self, pdfs: Iterable[str]) -> int:
+        """PDFs que aún no tienen marca de hecho (tomados o no)"""
+        keys = (self.key(pdf) for pdf in pdfs)
+        return sum(1 for key in keys if key is not None and not self.is_done(key))
+
+    def claim(self, pdfs: Iterable[str], limit: int) -> List[Tuple[str, str]]:
+        """Toma hasta limit PDFs libres (o abandonados) y devuelve (ruta, clave)"""
+        claimed = []
+        for pdf in pdfs:
+            if len(claimed) >= limit:
+                break
+            key = self.key(pdf)
+            if key is None or key in self._held or self.is_done(key):
+                continue
+            if self._acquire(key, pdf):
+                claimed.append((pdf, key))
+        return claimed
+
+    def _acquire(self, key: str, pdf_path: str) -> bool:
+        lease_path = self._lease_path(key)
+        content = json.dumps({"nodo": self.node, "archivo": pdf_path, "renovacion": 0, "token": uuid.uuid4().hex})
+        try:
+            fd = os.open(lease_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return self._expired(key, lease_path) and self._steal(key, pdf_path, lease_path)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        # Pudo terminarlo otro nodo entre la revisión y la creación
+        if os.path.exists(self._done_path(key)):
+            os.unlink(lease_path)
+            self._done.add(key)
+            return False
+        with self._lock:
+            self._held[key] = content
+        return True
+
+    def _expired(self, key: str, lease_path: str) -> bool:
+        """Abandonado: su contenido no cambió durante un plazo completo, medido localmente"""
+        content = _read(lease_path)
+        if content is None:
+            return False
+        now = time.monotonic()
+        seen = self._observed.get(key)
+        if seen is None or seen[0] != content:
+            self._observed[key] = (content, now)
+            return False
+        return now - seen[1] > self.ttl
+
+    def _steal(self, key: str, pdf_path: str, lease_path: str) -> bool:
+        stale = self._observed.pop(key)[0]
+        # Solo un nodo logra renombrar el arrendamiento abandonado
+        stolen = f"{lease_path}.{uuid.uuid4().hex}.reclamado"
+        try:
+            os.rename(lease_path, stolen)
+        except FileNotFoundError:
+            return False
+        content = _read(stolen)
+        if content != stale:
+            # Se renovó justo antes del renombrado: se devuelve a su dueño
+            try:
+                os.link(stolen, lease_path)
+            except FileExistsError:
+                pass
+            os.unlink(stolen)
+            return False
+        os.unlink(stolen)
+        try:
+            previous = json.loads(stale).get("nodo")
+        except ValueError:
+            previous = None
+        log_event("arrendamiento_reclamado", archivo=pdf_path, nodo=self.node, nodo_anterior=previous)
+        return self._acquire(key, pdf_path)
+
+    def _renew_loop(self):
+        while not self._stop.wait(self.ttl / 3):
+            self.renew()
+
+    def renew(self):
+        """Renueva los arrendamientos propios; el que ya no es propio se abandona"""
+        with self._lock:
+            for key, content in list(self._held.items()):
+                lease_path = self._lease_path(key)
+                if _read(lease_path) != content:
+                    del self._held[key]
+                    log_event("arrendamiento_perdido", clave=key, nodo=self.node)
+                    continue
+                lease = json.loads(content)
+                lease["renovacion"] += 1
+                self._held[key] = json.dumps(lease)
+                try:
+                    atomic_write(lease_path, self._held[key])
+                except OSError as e:
+                    log_failure("arrendamiento", e, clave=key, nodo=self.node)
+
+    def complete(self, key: str, pdf_path: str, estado: str):
+        """Deja la marca de hecho y libera el arrendamiento"""
+        atomic_write(self._done_path(key), json.dumps({
+            "archivo": pdf_path,
+            "estado": estado,
+            "nodo": self.node,
+            "fecha": datetime.now().isoformat()
+        }, ensure_ascii=False))
+        self._done.add(key)
+        self.release(key)
+
+    def release(self, key: str):
+        """Libera un arrendamiento propio (si aún lo es)"""
+        with self._lock:
+            content = self._held.pop(key, None)
+            lease_path = self._lease_path(key)
+            if content is not None and _read(lease_path) == content:
+                try:
+                    os.unlink(lease_path)
+                except FileNotFoundError:
+                    pass
+
+    def close(self):
+        self._stop.set()
+        self._renewer.join()
+        for key in list(self._held):
+            self.release(key)
@@ -0,0 +1,167 @@
+"""
+Costo de las reglas de títulos
+Modo de instrumentación que atribuye a cada título configurado el tiempo que
+find_sections dedica a buscarlo y, dentro de la búsqueda exacta, el tiempo y
+las coincidencias de cada una de sus formas (aislado, tras numeración, tras
+letras). Sirve para que quien escribe las reglas vea qué títulos son caros y
+cuánto gasta el buscador por documento.
+
+El tiempo total de cada título es el de la búsqueda real. El de cada forma se
+mide después, ejecutándola por separado sobre los mismos textos, por lo que
+duplica la búsqueda exacta: solo se activa a pedido (--costo-reglas). El
+total incluye además la compilación de la expresión del título la primera
+vez que cada proceso lo busca.
+"""
+
+
+import re
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, Iterable, List
+
+from rpa_reglas import RulePlan, heading_forms
+
+
+FORMS = ("aislado", "numerado", "letras")
+
+
+@dataclass
+class HeadingCost:
+    """Costo acumulado de buscar un título (en uno o varios documentos)"""
+    titulo: str
+    busquedas: int = 0
+    encontrado: int = 0
+    total_ms: float = 0.0
+    # Búsqueda exacta (filtro de subcadena y expresión) y aproximada
+    exacta_ms: float = 0.0
+    aproximada_ms: float = 0.0
+    # Textos en que el filtro de subcadena evitó la expresión
+    filtrados: int = 0
+    formas_ms: Dict[str, float] = field(default_factory=lambda: dict.fromkeys(FORMS, 0.0))
+    coincidencias: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(FORMS, 0))
+
+    def add(self, other: "HeadingCost"):
+        self.busquedas += other.busquedas
+        self.encontrado += other.encontrado
+        self.total_ms += other.total_ms
+        self.exacta_ms += other.exacta_ms
+        self.aproximada_ms += other.aproximada_ms
+        self.filtrados += other.filtrados
+        for form in FORMS:
+            self.formas_ms[form] += other.formas_ms.get(form, 0.0)
+            self.coincidencias[form] += other.coincidencias.get(form, 0)
+
+    def to_dict(self) -> Dict:
+        row = asdict(self)
+        for key in ("total_ms", "exacta_ms", "aproximada_ms"):
+            row[key] = round(row[key], 3)
+        row["formas_ms"] = {form: round(ms, 3) for form, ms in self.formas_ms.items()}
+        return row
+
+
+def _ms(start: float) -> float:
+    return (time.perf_counter() - start) * 1000
+
+
+class RuleCostRecorder:
+    """Acumula el costo por título de las búsquedas de find_sections"""
+
+    def __init__(self):
+        self.costs: Dict[str, HeadingCost] = {}
+        self._forms: Dict[str, Dict[str, re.Pattern]] = {}
+        self.documents = 0
+
+    def locate(self, plan: RulePlan, locate: Callable[[str, str, str], str],
+               headings: str, text_normalized: str, heading: str) -> str:
+        """Ejecuta locate(headings, text_normalized, heading) y atribuye su costo al título"""
+        start = time.perf_counter()
+        location = locate(headings, text_normalized, heading)
+        total_ms = _ms(start)
+
+        cost = self.costs.setdefault(heading, HeadingCost(heading))
+        cost.busquedas += 1
+        cost.encontrado += bool(location)
+        cost.total_ms += total_ms
+        # Textos que recorrió la búsqueda exacta, en el mismo orden que _locate
+        sources = [headings]
+        if location != "titulo" and plan.body_fallback:
+            sources.append(text_normalized)
+        exact_ms = 0.0
+        for source in sources:
+            start = time.perf_counter()
+            plan.search(source, heading)
+            exact_ms += _ms(start)
+            self._measure_forms(cost, source, heading)
+        cost.exacta_ms += exact_ms
+        if location not in ("titulo", "cuerpo"):
+            cost.aproximada_ms += max(total_ms - exact_ms, 0.0)
+        return location
+
+    def _measure_forms(self, cost: HeadingCost, source: str, heading: str):
+        if heading not in source:
+            cost.filtrados += 1
+            return
+        forms = self._forms.get(heading)
+        if forms is None:
+            forms = self._forms[heading] = {
+                form: re.compile(pattern) for form, pattern in heading_forms(heading).items()
+            }
+        for form, compiled in forms.items():
+            start = time.perf_counter()
+            matches = sum(1 for _ in compiled.finditer(source))
+            cost.formas_ms[form] += _ms(start)
+            cost.coincidencias[form] += matches
+
+    def ranked(self) -> List[HeadingCost]:
+        """Títulos de mayor a menor tiempo total"""
+        return sorted(self.costs.values(), key=lambda cost: cost.total_ms, reverse=True)
+
+    def summary(self) -> Dict:
+        """Totales y títulos ordenados por costo (para el reporte y el registro)"""
+        rows = self.ranked()
+        return {
+            "documentos": self.documents,
+            "titulos": len(rows),
+            "total_ms": round(sum(cost.total_ms for cost in rows), 3),
+            "exacta_ms": round(sum(cost.exacta_ms for cost in rows), 3),
+            "aproximada_ms": round(sum(cost.aproximada_ms for cost in rows), 3),
+            "formas_ms": {form: round(sum(cost.formas_ms[form] for cost in rows), 3) for form in FORMS},
+            "por_titulo": [cost.to_dict() for cost in rows]
+        }
+
+    def take(self) -> Dict:
+        """Resumen del documento actual; el registrador queda listo para el siguiente"""
+        self.documents += 1
+        summary = self.summary()
+        self.reset()
+        return summary
+
+    def reset(self):
+        self.costs = {}
+        self.documents = 0
+
+    def merge(self, summary: Dict):
+        """Agrega el resumen de otro documento o trabajador"""
+        self.documents += summary.get("documentos", 0)
+        for row in summary.get("por_titulo", []):
+            other = HeadingCost(**row)
+            self.costs.setdefault(other.titulo, HeadingCost(other.titulo)).add(other)
+
+
+def format_table(summary: Dict, limit: int = 20) -> Iterable[str]:
+    """Tabla de títulos ordenados por costo, para consola"""
+    total = summary["total_ms"] or 1.0
+    yield (f"Buscador de títulos: {summary['total_ms']:.1f} ms en {summary['documentos']} documento(s) "
+           f"(exacta {summary['exacta_ms']:.1f} ms, aproximada {summary['aproximada_ms']:.1f} ms)")
+    formas = summary["formas_ms"]
+    yield "Formas por separado: " + ", ".join(f"{form} {formas[form]:.1f} ms" for form in FORMS)
+    yield (f"{'MS':>9} {'%':>5} {'EXACTA':>8} {'APROX.':>8} {'AISLADO':>8} {'NUMER.':>8} {'LETRAS':>8} "
+           f"{'COINC.':>7} {'BÚSQ.':>6}  TÍTULO")
+    for row in summary["por_titulo"][:limit]:
+        formas = row["formas_ms"]
+        yield (f"{row['total_ms']:>9.2f} {100 * row['total_ms'] / total:>5.1f} {row['exacta_ms']:>8.2f} "
+               f"{row['aproximada_ms']:>8.2f} {formas['aislado']:>8.2f} {formas['numerado']:>8.2f} "
+               f"{formas['letras']:>8.2f} {sum(row['coincidencias'].values()):>7} {row['busquedas']:>6}  "
+               f"{row['titulo']}")
+    if len(summary["por_titulo"]) > limit:
+        yield f"... {len(summary['por_titulo']) - limit} título(s) más"
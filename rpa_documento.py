@@ -0,0 +1,106 @@
+"""
+Documento compartido entre perfiles de validación
+Un PDF se extrae y se normaliza una sola vez; el índice de títulos y las
+evidencias numéricas se calculan al primer uso y los reutilizan todos los
+validadores que revisan el mismo documento.
+"""
+
+
+from typing import Dict, Optional, Tuple
+
+from rpa_evidencias import EvidenceTable, extract_evidence
+from rpa_extraccion import ExtractionBudget, ExtractionCache, extract_pdf, text_coverage
+from rpa_indice import HeadingIndex
+from rpa_registro import log_failure, phase
+from rpa_texto import normalize_text
+
+
+class Document:
+    """Texto extraído de un PDF y los datos derivados de él"""
+
+    def __init__(self, path: str, text: str, page_ends: Tuple[int, ...] = (), from_cache: bool = False,
+                 normalized: Optional[str] = None, timed_out_pages: Tuple[int, ...] = (),
+                 image_pages: Tuple[int, ...] = ()):
+        self.path = path
+        self.text = text
+        # Posición donde termina cada página en el texto
+        self.page_ends = tuple(page_ends)
+        self.from_cache = from_cache
+        # Páginas (desde 1) que quedaron sin texto por agotar el tiempo de extracción
+        self.timed_out_pages = tuple(timed_out_pages)
+        # Páginas (desde 1) sin capa de texto, no interpretadas al extraer
+        self.image_pages = tuple(image_pages)
+        # Normalizado ya calculado en otro proceso (memoria compartida)
+        self._normalized = normalized
+        self._indexes: Dict[int, HeadingIndex] = {}
+        self._evidence: Optional[EvidenceTable] = None
+
+    @classmethod
+    def from_pdf(cls, path: str, extraction_cache: Optional[ExtractionCache] = None,
+                 budget: Optional[ExtractionBudget] = None) -> "Document":
+        """Extrae el PDF (con la caché y el presupuesto de tiempo si se indican)
+        
+        Un PDF ilegible da un documento vacío.
+        """
+        image_pages = []
+        
+        def extractor(source):
+            image_pages.clear()
+            return extract_pdf(source, budget, image_pages=image_pages)
+        
+        with phase("extraccion", archivo=path) as info:
+            try:
+                if extraction_cache is None:
+                    text, page_ends = extractor(path)
+                    cached = False
+                else:
+                    text, page_ends, cached = extraction_cache.extract(
+                        path, extractor, should_store=lambda: not (budget and budget.incomplete)
+                    )
+            except Exception as e:
+                log_failure("extraccion", e, archivo=path)
+                text, page_ends, cached = "", (), False
+            timed_out = tuple(budget.timed_out_pages) if budget and not cached else ()
+            info["desde_cache"] = cached
+            info["paginas"] = len(page_ends)
+            info["caracteres"] = len(text)
+            if timed_out:
+                info["paginas_tiempo_agotado"] = len(timed_out)
+            if image_pages:
+                info["paginas_solo_imagen"] = len(image_pages)
+        return cls(path, text, page_ends, cached, timed_out_pages=timed_out, image_pages=tuple(image_pages))
+
+    @property
+    def pages(self) -> int:
+        return len(self.page_ends)
+
+    @property
+    def normalized(self) -> str:
+        """Texto normalizado (mayúsculas, sin tildes, espacios simples)"""
+        if self._normalized is None:
+            with phase("normalizacion", caracteres=len(self.text)):
+                self._normalized = normalize_text(self.text)
+        return self._normalized
+
+    def heading_index(self, max_length: int) -> HeadingIndex:
+        """Índice de líneas de título para una longitud máxima de título"""
+        index = self._indexes.get(max_length)
+        if index is None:
+            with phase("indice_titulos") as info:
+                index = self._indexes[max_length] = HeadingIndex(self.text, max_length)
+                info["lineas"] = index.total_lines
+                info["lineas_titulo"] = len(index)
+        return index
+
+    def coverage(self) -> Dict:
+        """Cobertura de texto por página"""
+        return text_coverage(self.text, self.page_ends)
+    
+    def evidence(self) -> EvidenceTable:
+        """Evidencias numéricas del texto normalizado"""
+        if self._evidence is None:
+            text_normalized = self.normalized
+            with phase("evidencias") as info:
+                self._evidence = extract_evidence(text_normalized)
+                info.update(self._evidence.summary())
+        return self._evidence
@@ -0,0 +1,107 @@
+"""
+Ejecución por etapas con colas acotadas
+Cada fase del flujo (extraer, validar, escribir reportes, mostrar) es una
+etapa con sus propias tareas, conectada a la siguiente por una cola
+asyncio de tamaño fijo. Las etapas de CPU delegan el trabajo a un ejecutor
+(procesos) y las de E/S a hilos, de modo que la escritura de los reportes del
+documento N se superpone con la extracción del documento N+1. Una cola llena
+detiene a la etapa anterior: el número de documentos en vuelo, y con él la
+memoria, queda acotado.
+"""
+
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List
+
+from rpa_registro import log_event
+
+
+# Marca de fin de la entrada de una etapa
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """Etapa del flujo: una corrutina por elemento y cuántas corren a la vez
+
+    Si la corrutina devuelve None el elemento no pasa a la etapa siguiente.
+    """
+    nombre: str
+    func: Callable[[Any], Awaitable[Any]]
+    concurrencia: int = 1
+    procesados: int = field(default=0, init=False)
+    espera_s: float = field(default=0.0, init=False)
+
+
+class StagedPipeline:
+    """Etapas encadenadas por colas acotadas, en un bucle de eventos asyncio"""
+
+    def __init__(self, stages: List[Stage], queue_size: int = 2):
+        if not stages:
+            raise ValueError("Se requiere al menos una etapa")
+        self.stages = stages
+        self.queue_size = queue_size
+        # Profundidad máxima observada de la cola de entrada de cada etapa
+        self.max_depth: Dict[str, int] = {stage.nombre: 0 for stage in stages}
+
+    async def run(self, items: Iterable) -> None:
+        """Procesa todos los elementos; un error en una etapa cancela las demás
+
+        Las etapas convierten los fallos de un elemento en su resultado (p. ej.
+        un reporte de error) y solo dejan escapar los de infraestructura, como
+        un destino de reportes que no se puede escribir.
+        """
+        start = time.perf_counter()
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        tasks = [asyncio.create_task(self._feed(items, queues[0]))]
+        for i, stage in enumerate(self.stages):
+            output = queues[i + 1] if i + 1 < len(queues) else None
+            tasks.append(asyncio.create_task(self._run_stage(stage, queues[i], output)))
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        log_event(
+            "etapas",
+            duracion_ms=round((time.perf_counter() - start) * 1000, 3),
+            cola=self.queue_size,
+            **{
+                stage.nombre: {
+                    "procesados": stage.procesados,
+                    "concurrencia": stage.concurrencia,
+                    "espera_ms": round(stage.espera_s * 1000, 3),
+                    "cola_maxima": self.max_depth[stage.nombre]
+                }
+                for stage in self.stages
+            }
+        )
+
+    async def _feed(self, items: Iterable, queue: asyncio.Queue):
+        for item in items:
+            await queue.put(item)
+        await queue.put(_DONE)
+
+    async def _run_stage(self, stage: Stage, queue: asyncio.Queue, output):
+        async def worker():
+            while True:
+                waited = time.perf_counter()
+                item = await queue.get()
+                stage.espera_s += time.perf_counter() - waited
+                if item is _DONE:
+                    # Se devuelve la marca para las demás tareas de la etapa
+                    await queue.put(_DONE)
+                    return
+                self.max_depth[stage.nombre] = max(self.max_depth[stage.nombre], queue.qsize() + 1)
+                result = await stage.func(item)
+                stage.procesados += 1
+                if result is not None and output is not None:
+                    await output.put(result)
+
+        await asyncio.gather(*(worker() for _ in range(stage.concurrencia)))
+        if output is not None:
+            await output.put(_DONE)
@@ -0,0 +1,151 @@
+"""
+Evidencias numéricas del documento
+Tres pasadas sobre el texto normalizado extraen todas las evidencias que
+usan los validadores (conteos de fotografías, puntos de investigación, pies
+de foto, escalas, normas del RNE y fechas) en una tabla tipada con la
+posición de cada una. Los validadores consultan la tabla en lugar de volver
+a recorrer el texto con una expresión por dato.
+"""
+
+
+import re
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Iterator, List, Optional, Union
+
+
+# Las evidencias que pueden solaparse se buscan en pasadas separadas, como las
+# búsquedas independientes por dato: la fecha '1/05/2024' contiene la escala
+# '1/05' y la fecha '12/05/2024 FOTOS' el conteo '2024 FOTOS'. Dentro de cada
+# pasada las alternativas no se solapan y se prueban en orden en cada
+# posición; la anticipación inicial permite al motor saltar directamente a
+# los caracteres con que empiezan. Las normas se anclan en el punto (A.010,
+# IS.010) para no probar la expresión en cada letra del texto.
+EVIDENCE_PATTERNS = (
+    re.compile(r"""
+      (?=[\d.FI])
+      (?:
+        (?P<fecha>(?P<dia>\d{1,2})[/-](?P<mes>\d{1,2})[/-](?P<anio>\d{4}))
+      | (?P<norma>(?:(?<=\b[A-Z]{2})|(?<=\b[A-Z]))\.\s?(?P<norma_num>\d{3})\b)
+      | (?P<pie>(?P<pie_forma>FOTOGRAFIA|FOTO|FIGURA|IMAGEN)\s*N)
+      )
+    """, re.VERBOSE),
+    # 'MINIMO 20 FOTOGRAFIAS' se informa una vez, como conteo de forma MINIMO
+    re.compile(r"""
+      (?=[\dM])
+      (?:
+        (?P<minimo>MINIMO\s*(?P<minimo_n>\d+)\s*FOTOGRAFIAS)
+      | (?P<conteo>(?P<conteo_n>\d+)\s*(?P<conteo_forma>
+            FOTOGRAFIAS | FOTOS | PUNTOS?\s*DE\s*INVESTIGACION | CALICATAS? | EXPLORACIONES?))
+      )
+    """, re.VERBOSE),
+    re.compile(r"(?=1)(?P<escala>\b1\s?(?P<escala_sep>[/:])\s?(?P<escala_den>\d{2,4})\b)"),
+)
+
+# Forma del conteo -> tipo de evidencia
+_COUNT_TYPES = {
+    "FOTOGRAFIAS": "fotografias",
+    "FOTOS": "fotografias",
+}
+
+
+@dataclass(frozen=True)
+class Evidence:
+    """Evidencia encontrada en el texto normalizado"""
+    tipo: str
+    forma: str
+    valor: Union[int, str, date, None]
+    inicio: int
+    fin: int
+
+
+class EvidenceTable:
+    """Evidencias de un documento, en orden de aparición"""
+
+    def __init__(self, evidences: List[Evidence]):
+        self.evidences = evidences
+        self._by_type: Dict[str, List[Evidence]] = {}
+        for evidence in evidences:
+            self._by_type.setdefault(evidence.tipo, []).append(evidence)
+        # Posiciones de inicio por tipo (ordenadas: la tabla sigue el orden del texto)
+        self._starts = {tipo: [e.inicio for e in found] for tipo, found in self._by_type.items()}
+
+    def __len__(self):
+        return len(self.evidences)
+
+    def __iter__(self) -> Iterator[Evidence]:
+        return iter(self.evidences)
+
+    def of(self, tipo: str, forma: Optional[str] = None) -> List[Evidence]:
+        """Evidencias de un tipo (y opcionalmente de una forma)"""
+        found = self._by_type.get(tipo, [])
+        if forma is None:
+            return found
+        return [e for e in found if e.forma == forma]
+
+    def first(self, tipo: str, forma: Optional[str] = None) -> Optional[Evidence]:
+        """Primera evidencia de un tipo (y forma)"""
+        found = self.of(tipo, forma)
+        return found[0] if found else None
+
+    def within(self, tipo: str, start: int, end: int) -> List[Evidence]:
+        """Evidencias de un tipo que empiezan entre start y end del texto normalizado"""
+        found = self._by_type.get(tipo, [])
+        starts = self._starts.get(tipo, [])
+        return found[bisect_left(starts, start):bisect_left(starts, end)]
+
+    def values(self, tipo: str) -> List:
+        """Valores de las evidencias de un tipo"""
+        return [e.valor for e in self._by_type.get(tipo, [])]
+
+    def count(self, tipo: str) -> int:
+        """Número de evidencias de un tipo"""
+        return len(self._by_type.get(tipo, []))
+
+    def summary(self) -> Dict[str, int]:
+        """Cantidad de evidencias por tipo"""
+        return {tipo: len(found) for tipo, found in self._by_type.items()}
+
+
+def _parse_date(day: str, month: str, year: str) -> Optional[date]:
+    try:
+        return date(int(year), int(month), int(day))
+    except ValueError:
+        return None
+
+
+def extract_evidence(text_normalized: str) -> EvidenceTable:
+    """Extrae las evidencias numéricas del texto normalizado, en orden de aparición"""
+    evidences = []
+    for pattern in EVIDENCE_PATTERNS:
+        evidences.extend(_scan(pattern, text_normalized))
+    evidences.sort(key=lambda e: e.inicio)
+    return EvidenceTable(evidences)
+
+
+def _scan(pattern: re.Pattern, text_normalized: str) -> Iterator[Evidence]:
+    for match in pattern.finditer(text_normalized):
+        kind = match.lastgroup
+        start, end = match.span()
+        if kind == "fecha":
+            value = _parse_date(match["dia"], match["mes"], match["anio"])
+            yield Evidence("fecha", match["fecha"], value, start, end)
+        elif kind == "minimo":
+            # 'MINIMO 20 FOTOGRAFIAS' es también un conteo de fotografías
+            yield Evidence("fotografias", "MINIMO", int(match["minimo_n"]), start, end)
+        elif kind == "conteo":
+            forma = re.sub(r'\s+', ' ', match["conteo_forma"])
+            tipo = _COUNT_TYPES.get(forma, "puntos_investigacion")
+            yield Evidence(tipo, forma, int(match["conteo_n"]), start, end)
+        elif kind == "escala":
+            value = f"1{match['escala_sep']}{match['escala_den']}"
+            yield Evidence("escala", match["escala_sep"], value, start, end)
+        elif kind == "norma":
+            # Una o dos letras antes del punto (la expresión ya verificó el límite de palabra)
+            letters = text_normalized[start - 2:start] if start >= 2 and text_normalized[start - 2].isalpha() \
+                else text_normalized[start - 1]
+            value = f"{letters}.{match['norma_num']}"
+            yield Evidence("norma", letters, value, start - len(letters), end)
+        elif kind == "pie":
+            yield Evidence("pie_foto", match["pie_forma"], None, start, end)
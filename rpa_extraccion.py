@@ -0,0 +1,396 @@
+"""
+Extracción de texto y caché de extracción
+El texto extraído de un PDF depende solo del contenido del archivo, no de las
+reglas de validación, por lo que se guarda por hash del contenido y sigue
+siendo válido aunque las reglas se recarguen.
+
+Cada PDF se mapea en memoria una sola vez (solo lectura): el hash y la
+extracción leen del mismo mapeo sin copias intermedias, y los procesos
+trabajadores que abren el mismo archivo comparten sus páginas a través de la
+caché de páginas del sistema operativo.
+
+Un presupuesto de extracción limita el tiempo por página y por documento:
+la página que lo agota queda sin texto y se informa, en lugar de detener el
+proceso. Las páginas sin capa de texto (fotografías escaneadas, planos) se
+reconocen por sus recursos y su flujo de contenido y no se interpretan.
+
+El lector de PyPDF2 guarda cada objeto que resuelve, incluidos los flujos de
+contenido ya descomprimidos de todas las páginas. Cada página se suelta del
+lector en cuanto su texto queda capturado, y el lector se vacía al terminar,
+para que la memoria no crezca con el número de páginas ni espere al
+recolector de ciclos.
+"""
+
+
+import hashlib
+import io
+import mmap
+import os
+import re
+import signal
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
+
+import PyPDF2
+from PyPDF2.generic import ArrayObject, IndirectObject
+
+from rpa_metricas import METRICS
+
+
+class MappedPdf:
+    """PDF mapeado en memoria en modo de solo lectura
+    
+    Se usa como contexto; el mapeo debe cerrarse después de terminar la
+    extracción porque el lector de PyPDF2 lee de él de forma perezosa.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self.path = os.fspath(path)
+        with open(self.path, 'rb') as file:
+            self.size = os.fstat(file.fileno()).st_size
+            # Un archivo vacío no se puede mapear
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+
+    def __fspath__(self):
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def digest(self) -> str:
+        """Hash SHA-256 del contenido (hashlib lee el mapeo directamente)"""
+        return hashlib.sha256(self._map if self._map is not None else b"").hexdigest()
+
+    def stream(self):
+        """Flujo de lectura sobre el mapeo, para PyPDF2"""
+        if self._map is None:
+            return io.BytesIO(b"")
+        self._map.seek(0)
+        return self._map
+
+
+class PageTimeout(BaseException):
+    """Tiempo de extracción de una página agotado
+    
+    Deriva de BaseException para que los except Exception internos de
+    PyPDF2 no lo absorban.
+    """
+
+
+@dataclass
+class ExtractionBudget:
+    """Tiempos máximos de extracción en segundos (None: sin límite)
+    
+    Después de cada extracción indica qué páginas (desde 1) agotaron su
+    tiempo y si se agotó el del documento.
+    """
+    page_seconds: Optional[float] = None
+    document_seconds: Optional[float] = None
+    timed_out_pages: List[int] = field(default_factory=list)
+    document_timed_out: bool = False
+
+    @property
+    def incomplete(self) -> bool:
+        return bool(self.timed_out_pages)
+
+    def reset(self):
+        self.timed_out_pages = []
+        self.document_timed_out = False
+
+
+def _alarm_available() -> bool:
+    # El temporizador por señal solo existe en Unix y solo en el hilo principal
+    return hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+
+
+@contextmanager
+def _alarm(seconds: Optional[float]):
+    """Lanza PageTimeout si el bloque supera los segundos indicados"""
+    if not seconds or not _alarm_available():
+        yield
+        return
+
+    def handler(signum, frame):
+        raise PageTimeout()
+
+    previous = signal.signal(signal.SIGALRM, handler)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+@dataclass
+class PageResources:
+    """Recursos que declara una página, sin interpretar su contenido"""
+    fonts: bool = False
+    # Objetos imagen (por número de objeto) de la página y de sus formularios
+    images: Set[int] = field(default_factory=set)
+    # Formularios (XObject /Form) usados por la página, anidados incluidos
+    forms: List = field(default_factory=list)
+
+
+def page_resources(page) -> PageResources:
+    """Fuentes e imágenes de los recursos de una página y de sus formularios (XObject /Form)"""
+    found = PageResources()
+    pending = [page.get("/Resources")]
+    forms = set()
+    while pending:
+        resources = pending.pop()
+        if resources is None:
+            continue
+        resources = resources.get_object()
+        if resources.get("/Font"):
+            found.fonts = True
+        xobjects = resources.get("/XObject")
+        if not xobjects:
+            continue
+        for ref in xobjects.get_object().values():
+            xobject = ref.get_object()
+            ident = getattr(ref, "idnum", id(xobject))
+            subtype = xobject.get("/Subtype")
+            if subtype == "/Image":
+                found.images.add(ident)
+            elif subtype == "/Form" and ident not in forms:
+                forms.add(ident)
+                found.forms.append(xobject)
+                pending.append(xobject.get("/Resources"))
+    return found
+
+
+# Operadores que muestran texto, tras su cadena o arreglo: (..)Tj <..>Tj [..]TJ (..)' (..)"
+# Un BT vacío no basta: hay generadores que abren uno en cada página
+_TEXT_SHOWING = re.compile(rb"[)>]\s*(?:Tj|'|\")|\]\s*TJ")
+
+
+def page_has_text(page, resources: Optional[PageResources] = None) -> bool:
+    """Si la página puede tener texto: declara fuentes y su contenido (o el de
+    sus formularios) usa algún operador que muestra texto
+    
+    Solo se descomprimen los flujos, sin interpretarlos. Ante una estructura
+    inesperada se asume que sí tiene texto.
+    """
+    try:
+        resources = resources or page_resources(page)
+        if not resources.fonts:
+            return False
+        contents = page.get("/Contents")
+        streams = list(resources.forms)
+        if contents is not None:
+            contents = contents.get_object()
+            if isinstance(contents, ArrayObject):
+                streams.extend(stream.get_object() for stream in contents)
+            else:
+                streams.append(contents)
+        return any(_TEXT_SHOWING.search(stream.get_data()) for stream in streams)
+    except Exception:
+        return True
+
+
+def release_page(reader: PyPDF2.PdfReader, index: int, page):
+    """Quita del lector la página ya extraída y sus flujos de contenido
+
+    Las fuentes y los formularios, que suelen compartirse entre páginas,
+    se conservan. Si la versión de PyPDF2 no tiene las cachés esperadas,
+    no se suelta nada.
+    """
+    resolved = getattr(reader, "resolved_objects", None)
+    pages = getattr(reader, "flattened_pages", None)
+    if not isinstance(resolved, dict) or not isinstance(pages, list):
+        return
+    contents = page.get("/Contents")
+    refs = [contents, page.indirect_reference]
+    # /Contents puede ser una referencia a un arreglo de flujos
+    target = contents.get_object() if isinstance(contents, IndirectObject) else contents
+    if isinstance(target, ArrayObject):
+        refs.extend(target)
+    for ref in refs:
+        if isinstance(ref, IndirectObject):
+            resolved.pop((ref.generation, ref.idnum), None)
+    pages[index] = None
+
+
+def release_reader(reader: PyPDF2.PdfReader):
+    """Vacía las cachés del lector (rompe los ciclos entre el lector y sus objetos)"""
+    resolved = getattr(reader, "resolved_objects", None)
+    if isinstance(resolved, dict):
+        resolved.clear()
+    if isinstance(getattr(reader, "flattened_pages", None), list):
+        reader.flattened_pages = None
+
+
+def text_coverage(text: str, page_ends: Tuple[int, ...]) -> Dict:
+    """Cobertura de texto por página: cuántas tienen texto y cuáles no"""
+    empty = []
+    start = 0
+    for number, end in enumerate(page_ends, 1):
+        if not text[start:end].strip():
+            empty.append(number)
+        start = end
+    return {"paginas": len(page_ends), "con_texto": len(page_ends) - len(empty), "sin_texto": empty}
+
+
+def extract_pdf(source: Union[str, MappedPdf], budget: Optional[ExtractionBudget] = None,
+                first: int = 1, last: Optional[int] = None,
+                image_pages: Optional[List[int]] = None) -> Tuple[str, Tuple[int, ...]]:
+    """Texto de un PDF y la posición donde termina cada página en él (los errores se propagan)
+    
+    Con first y last (desde 1, inclusive) se extrae solo ese rango de páginas.
+    Las páginas sin capa de texto quedan vacías sin interpretarse y, si se
+    pasa la lista image_pages, se anotan en ella. Con un presupuesto, las
+    páginas que agotan su tiempo (o las que quedan cuando se agota el del
+    documento) se dejan vacías y se anotan en él.
+    """
+    if not isinstance(source, MappedPdf):
+        with MappedPdf(source) as mapped:
+            return extract_pdf(mapped, budget, first, last, image_pages)
+    if budget is not None:
+        budget.reset()
+    start = time.perf_counter()
+    pdf_reader = PyPDF2.PdfReader(source.stream())
+    try:
+        return _extract_pages(pdf_reader, budget, first, last, image_pages, start)
+    finally:
+        release_reader(pdf_reader)
+
+
+def _extract_pages(pdf_reader: PyPDF2.PdfReader, budget: Optional[ExtractionBudget], first: int,
+                   last: Optional[int], image_pages: Optional[List[int]], start: float) -> Tuple[str, Tuple[int, ...]]:
+    total = len(pdf_reader.pages) if last is None else min(last, len(pdf_reader.pages))
+    parts = []
+    page_ends = []
+    length = 0
+    for number in range(first, total + 1):
+        limit = budget.page_seconds if budget else None
+        if budget and budget.document_seconds:
+            remaining = budget.document_seconds - (time.perf_counter() - start)
+            if remaining <= 0:
+                budget.document_timed_out = True
+                budget.timed_out_pages.extend(range(number, total + 1))
+                METRICS.inc("rpa_fallos_total", value=total - number + 1, fase="tiempo_pagina")
+                for _ in range(number, total + 1):
+                    parts.append("\n")
+                    length += 1
+                    page_ends.append(length)
+                break
+            limit = min(limit, remaining) if limit else remaining
+        page = None
+        try:
+            with _alarm(limit):
+                page = pdf_reader.pages[number - 1]
+                text_layer = page_has_text(page)
+                part = page.extract_text() + "\n" if text_layer else "\n"
+        except PageTimeout:
+            budget.timed_out_pages.append(number)
+            METRICS.inc("rpa_fallos_total", fase="tiempo_pagina")
+            part = "\n"
+            # Ni extraída ni sin texto: cuenta solo entre las de tiempo agotado
+            text_layer = None
+        finally:
+            # También la página que agotó su tiempo, con lo que haya resuelto
+            if page is not None:
+                release_page(pdf_reader, number - 1, page)
+        parts.append(part)
+        length += len(part)
+        page_ends.append(length)
+        if text_layer:
+            METRICS.inc("rpa_paginas_extraidas_total")
+        elif text_layer is not None:
+            METRICS.inc("rpa_paginas_sin_texto_total")
+            if image_pages is not None:
+                image_pages.append(number)
+    return "".join(parts), tuple(page_ends)
+
+
+def pdf_page_count(source: Union[str, MappedPdf, PyPDF2.PdfReader]) -> int:
+    """Páginas que declara el árbol de páginas del PDF, sin extraer texto
+    
+    Se lee /Count de la raíz del árbol (referenciada desde el trailer); si
+    falta o no es válido se recorre el árbol. Los errores se propagan.
+    """
+    if isinstance(source, str):
+        with MappedPdf(source) as mapped:
+            return pdf_page_count(mapped)
+    pdf_reader = source if isinstance(source, PyPDF2.PdfReader) else PyPDF2.PdfReader(source.stream())
+    try:
+        count = int(pdf_reader.trailer["/Root"]["/Pages"]["/Count"])
+    except (KeyError, TypeError, ValueError):
+        count = -1
+    return count if count >= 0 else len(pdf_reader.pages)
+
+
+def file_digest(path: str) -> str:
+    """Hash SHA-256 del contenido de un archivo"""
+    with MappedPdf(path) as mapped:
+        return mapped.digest()
+
+
+class ExtractionCache:
+    """Textos extraídos recientemente (LRU), por hash del contenido del PDF"""
+
+    def __init__(self, max_entries: int = 16, max_chars: int = 50_000_000):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self._entries: "OrderedDict[str, Tuple[str, Tuple[int, ...]]]" = OrderedDict()
+        self._chars = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Tuple[str, Tuple[int, ...]]]:
+        """Texto y fines de página guardados, o None"""
+        entry = self._entries.get(key)
+        METRICS.cache("extraccion", hit=entry is not None)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, text: str, page_ends: Tuple[int, ...]):
+        """Guarda un texto extraído (los textos vacíos no se guardan)"""
+        if not text or len(text) > self.max_chars:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._chars -= len(previous[0])
+        self._entries[key] = (text, page_ends)
+        self._chars += len(text)
+        while len(self._entries) > self.max_entries or self._chars > self.max_chars:
+            _, (old_text, _) = self._entries.popitem(last=False)
+            self._chars -= len(old_text)
+
+    def extract(self, path: str, extractor: Callable[[Union[str, MappedPdf]], Tuple[str, Tuple[int, ...]]],
+                should_store: Callable[[], bool] = lambda: True) -> Tuple[str, Tuple[int, ...], bool]:
+        """Devuelve (texto, fines de página, desde_cache), extrayendo solo si no está guardado
+        
+        El archivo se mapea una vez: el extractor recibe el mismo mapeo con el
+        que se calculó el hash. Si should_store() es falso tras extraer (texto
+        incompleto) el resultado no se guarda.
+        """
+        try:
+            mapped = MappedPdf(path)
+        except OSError:
+            text, page_ends = extractor(path)
+            return text, page_ends, False
+        with mapped:
+            key = mapped.digest()
+            entry = self.get(key)
+            if entry is not None:
+                return entry[0], entry[1], True
+            text, page_ends = extractor(mapped)
+        if should_store():
+            self.put(key, text, page_ends)
+        return text, page_ends, False
@@ -4,12 +4,14 @@ Proyecto: IE N° 33065 Pacro Yuncan
 """
 
 
-import PyPDF2
 import re
 import os
-from datetime import datetime, timedelta
-from dataclasses import dataclass
-from typing import List, Dict, Tuple
+import argparse
+import time
+from contextlib import nullcontext
+from datetime import date, datetime, timedelta
+from dataclasses import dataclass, field
+from typing import List, Dict, Tuple, Optional, Union
 import json
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -18,6 +20,28 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, Tabl
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
 
+from rpa_texto import normalize_text
+from rpa_reglas import RuleWatcher, RulePlan, load_plan, bundled_rules
+from rpa_extraccion import ExtractionBudget, ExtractionCache, MappedPdf, extract_pdf, text_coverage
+from rpa_indice import HeadingIndex
+from rpa_evidencias import EvidenceTable, extract_evidence
+from rpa_documento import Document
+from rpa_historial import ResultsStore, DEFAULT_DB_PATH
+from rpa_jsonl import JsonlSink
+from rpa_costo_reglas import RuleCostRecorder, format_table
+from rpa_memoria import document_memory, track_allocations
+from rpa_metricas import METRICS
+from rpa_perfilado import ENV_VAR, interval_from_env, profiled
+from rpa_registro import (
+    DEFAULT_LOG_DIR, configure_logging, console, correlation, log_event, log_failure,
+    logged_phase, phase
+)
+
+
+# Caracteres del texto normalizado tras cada mención del certificado de calibración
+# en los que se buscan sus fechas
+DEFAULT_CERTIFICATE_WINDOW = 1500
+
 
 @dataclass
 class ValidationResult:
@@ -27,284 +51,263 @@ class ValidationResult:
     missing_items: List[str]
     warnings: List[str]
     details: Dict
+    # Títulos buscados para el componente y si se encontraron (para el historial)
+    sections: Dict[str, bool] = field(default_factory=dict)
 
 
 class EntregableValidator:
     """Validador principal del Entregable 1"""
     
-    def __init__(self):
-        self.estructura_entregable1 = {
-            "INFORME_INSPECCION_OCULAR": {
-                "secciones_obligatorias": [
-                    "ANTECEDENTES",
-                    "METODOLOGÍA EMPLEADA PARA LA INSPECCIÓN",
-                    "METODOLOGIA EMPLEADA PARA LA INSPECCION",  # Variante sin tilde
-                    "UBICACIÓN Y ACCESOS",
-                    "UBICACION Y ACCESOS",
-                    "INFORMACIÓN RECOGIDA DE CAMPO",
-                    "INFORMACION RECOGIDA DE CAMPO",
-                    "INFRAESTRUCTURA EXISTENTE",
-                    "SERVICIOS BÁSICOS EXISTENTES",
-                    "SERVICIOS BASICOS EXISTENTES",
-                    "LIBRE DISPONIBILIDAD DE TERRENO",
-                    "COMPATIBILIZACIÓN DEL ÁREA A INTERVENIR",
-                    "COMPATIBILIZACION DEL AREA A INTERVENIR",
-                    "VERIFICACIÓN DE DATOS CONSIGNADOS EN LA PARTIDA REGISTRAL",
-                    "VERIFICACION DE DATOS CONSIGNADOS EN LA PARTIDA REGISTRAL",
-                    "PANEL FOTOGRÁFICO",
-                    "PANEL FOTOGRAFICO",
-                    "CONCLUSIONES Y RECOMENDACIONES"
-                ],
-                "minimo_requerido": 11  # Al menos 11 secciones únicas
-            },
-            
-            "ESTUDIO_TOPOGRAFICO": {
-                "memoria_descriptiva": {
-                    "secciones": [
-                        "ANTECEDENTES",
-                        "OBJETIVOS Y ALCANCES",
-                        "PROCEDIMIENTO TOPOGRÁFICO",
-                        "PROCEDIMIENTO TOPOGRAFICO",
-                        "DESCRIPCIÓN DE LOS LINDEROS",
-                        "DESCRIPCION DE LOS LINDEROS",
-                        "DESCRIPCIÓN DE LAS CONSTRUCCIONES EXISTENTES",
-                        "DESCRIPCION DE LAS CONSTRUCCIONES EXISTENTES",
-                        "DESCRIPCIÓN DE LOS SERVICIOS BÁSICOS",
-                        "DESCRIPCION DE LOS SERVICIOS BASICOS",
-                        "CUADRO DE DATOS TÉCNICOS",
-                        "CUADRO DE DATOS TECNICOS"
-                    ],
-                    "minimo_requerido": 7
-                },
-                "anexos_obligatorios": [
-                    "PARTIDA REGISTRAL",
-                    "CERTIFICADO DE CALIBRACIÓN",
-                    "CERTIFICADO DE CALIBRACION",
-                    "LIBRETA DE CAMPO",
-                    "PANEL FOTOGRÁFICO",
-                    "PANEL FOTOGRAFICO",
-                    "FICHA DE DESCRIPCIÓN DE BMS",
-                    "FICHA DE DESCRIPCION DE BMS"
-                ],
-                "planos_obligatorios": [
-                    "PLANO DE UBICACIÓN Y LOCALIZACIÓN",
-                    "PLANO DE UBICACION Y LOCALIZACION",
-                    "PLANO PERIMÉTRICO",
-                    "PLANO PERIMETRICO",
-                    "PLANO TOPOGRÁFICO",
-                    "PLANO TOPOGRAFICO",
-                    "PLANO TOPOGRÁFICO - SECCIONES",
-                    "PLANO TOPOGRAFICO - SECCIONES"
-                ],
-                "validaciones_especificas": {
-                    "minimo_fotografias": 20,
-                    "certificado_calibracion_meses": 6,
-                    "escalas_validas": ["1/100", "1:100", "1/200", "1:200", "1/500", "1:500"]
-                }
-            },
-            
-            "ESTUDIO_DEMOLICION": {
-                "memoria_descriptiva": [
-                    "ANTECEDENTES Y DESCRIPCIÓN",
-                    "ANTECEDENTES Y DESCRIPCION",
-                    "ALCANCE DE LA DEMOLICIÓN",
-                    "ALCANCE DE LA DEMOLICION",
-                    "PROCEDIMIENTOS DE DEMOLICIÓN",
-                    "PROCEDIMIENTOS DE DEMOLICION"
-                ],
-                "informe_tecnico": [
-                    "ESTADO DE CONSERVACIÓN",
-                    "ESTADO DE CONSERVACION",
-                    "SUSTENTO TÉCNICO DE DEMOLICIÓN",
-                    "SUSTENTO TECNICO DE DEMOLICION",
-                    "VERIFICACIÓN ESTRUCTURAL",
-                    "VERIFICACION ESTRUCTURAL"
-                ],
-                "planos": [
-                    "PLANO GENERAL DE INFRAESTRUCTURA EXISTENTE"
-                ]
-            },
-            
-            "ESTUDIO_MECANICA_SUELOS": {
-                "secciones_principales": [
-                    "NOMBRE DEL PROYECTO",
-                    "ANTECEDENTES",
-                    "UBICACIÓN",
-                    "UBICACION",
-                    "OBJETIVOS Y ALCANCES",
-                    "METODOLOGÍA",
-                    "METODOLOGIA",
-                    "RESUMEN DE LAS CONDICIONES DE CIMENTACIÓN",
-                    "RESUMEN DE LAS CONDICIONES DE CIMENTACION",
-                    "INFORMACIÓN PREVIA",
-                    "INFORMACION PREVIA",
-                    "EXPLORACIÓN DE CAMPO",
-                    "EXPLORACION DE CAMPO",
-                    "ENSAYOS DE LABORATORIO",
-                    "PERFIL DEL SUELO",
-                    "NIVEL DE LA NAPA FREÁTICA",
-                    "NIVEL DE LA NAPA FREATICA",
-                    "ANÁLISIS DE LA CIMENTACIÓN",
-                    "ANALISIS DE LA CIMENTACION",
-                    "EFECTO DEL SISMO",
-                    "PARÁMETROS PARA EL DISEÑO",
-                    "PARAMETROS PARA EL DISEÑO",
-                    "AGRESIÓN AL SUELO",
-                    "AGRESION AL SUELO",
-                    "CONCLUSIONES Y RECOMENDACIONES"
-                ],
-                "minimo_puntos_investigacion": 3
-            },
-            
-            "ESTUDIO_CANTERAS_AGUA": {
-                "secciones": [
-                    "CANTERAS",
-                    "FUENTES DE AGUA",
-                    "DISEÑO DE MEZCLA",
-                    "DISEÑO DE MEZCLAS"
-                ]
-            },
-            
-            "ESTUDIO_DEMANDA": {
-                "secciones": [
-                    "ANTECEDENTES",
-                    "MARCO NORMATIVO",
-                    "HORIZONTE DE EVALUACIÓN",
-                    "HORIZONTE DE EVALUACION",
-                    "ÁREA DE INFLUENCIA",
-                    "AREA DE INFLUENCIA",
-                    "ANÁLISIS DE LA DEMANDA",
-                    "ANALISIS DE LA DEMANDA",
-                    "POBLACIÓN DE REFERENCIA",
-                    "POBLACION DE REFERENCIA",
-                    "POBLACIÓN DEMANDANTE POTENCIAL",
-                    "POBLACION DEMANDANTE POTENCIAL",
-                    "POBLACIÓN DEMANDANTE EFECTIVA",
-                    "POBLACION DEMANDANTE EFECTIVA",
-                    "ANÁLISIS DE LA OFERTA",
-                    "ANALISIS DE LA OFERTA",
-                    "DETERMINACIÓN DE LA BRECHA",
-                    "DETERMINACION DE LA BRECHA",
-                    "CONCLUSIONES Y RECOMENDACIONES"
-                ],
-                "minimo_requerido": 10
-            },
-            
-            "ANTEPROYECTO_ARQUITECTURA": {
-                "memoria_descriptiva": [
-                    "INTRODUCCIÓN",
-                    "INTRODUCCION",
-                    "GENERALIDADES",
-                    "JUSTIFICACIÓN DEL PROYECTO",
-                    "JUSTIFICACION DEL PROYECTO",
-                    "NOMBRE DEL PROYECTO",
-                    "UBICACIÓN GEOGRÁFICA",
-                    "UBICACION GEOGRAFICA",
-                    "LOCALIZACIÓN EDUCATIVA",
-                    "LOCALIZACION EDUCATIVA",
-                    "CAPACIDAD EDUCATIVA",
-                    "METAS - INFRAESTRUCTURA",
-                    "IDENTIFICACIÓN DE MÓDULOS",
-                    "IDENTIFICACION DE MODULOS",
-                    "TIPO DE INTERVENCIÓN",
-                    "TIPO DE INTERVENCION",
-                    "UBICACION ESPECÍFICA",
-                    "UBICACION ESPECIFICA",
-                    "LOCALIZACIÓN Y ENTORNO URBANO",
-                    "LOCALIZACION Y ENTORNO URBANO",
-                    "TERRENO",
-                    "INFRAESTRUCTURA EXISTENTE",
-                    "CRITERIOS DE DISEÑO",
-                    "DESCRIPCIÓN DEL PROYECTO",
-                    "DESCRIPCION DEL PROYECTO",
-                    "ZONIFICACIÓN",
-                    "ZONIFICACION",
-                    "NORMATIVIDAD",
-                    "CRITERIOS GENERALES DE DISEÑO",
-                    "PROGRAMACIÓN ARQUITECTONICA",
-                    "PROGRAMACION ARQUITECTONICA"
-                ],
-                "memoria_calculo": [
-                    "ANTECEDENTES",
-                    "OBJETIVOS",
-                    "NORMATIVIDAD",
-                    "CRITERIOS Y REQUISITOS DE SEGURIDAD",
-                    "MEDIOS DE EVACUACIÓN",
-                    "MEDIOS DE EVACUACION",
-                    "ZONAS SEGURAS",
-                    "UBICACIÓN DE LUCES DE EMERGENCIA",
-                    "UBICACION DE LUCES DE EMERGENCIA",
-                    "SEÑALIZACIÓN",
-                    "SEÑALIZACION",
-                    "CONCLUSIONES Y RECOMENDACIONES"
-                ],
-                "planos_obligatorios": [
-                    "PLANO DE LOCALIZACIÓN Y UBICACIÓN",
-                    "PLANO DE LOCALIZACION Y UBICACION",
-                    "PLANO GENERAL DE EJES Y TERRAZAS",
-                    "PLANO DE DISTRIBUCIÓN GENERAL",
-                    "PLANO DE DISTRIBUCION GENERAL",
-                    "PLANO DE CORTE GENERAL",
-                    "PLANO DE ELEVACIÓN GENERAL",
-                    "PLANO DE ELEVACION GENERAL"
-                ]
-            }
-        }
+    def __init__(self, rules_path: Optional[str] = None, watch_rules: bool = False,
+                 extraction_cache: Optional[ExtractionCache] = None,
+                 extraction_budget: Optional[ExtractionBudget] = None,
+                 rule_costs: Optional[RuleCostRecorder] = None):
+        # Requisitos del entregable (títulos, mínimos, escalas, normas, anexos)
+        rules_path = rules_path or bundled_rules("entregable1")
+        # Con watch_rules el plan se revisa al inicio de cada documento
+        self.rule_watcher = RuleWatcher(rules_path) if watch_rules else None
+        self._use_plan(self.rule_watcher.plan if self.rule_watcher else load_plan(rules_path))
+        # Textos extraídos por hash del PDF (independientes de las reglas)
+        self.extraction_cache = extraction_cache
+        # Tiempos máximos de extracción por página y por documento
+        self.extraction_budget = extraction_budget
+        # Con un registrador, el costo de cada título se agrega al reporte
+        self.rule_costs = rule_costs
         
         self.validation_results = []
+        # Caché del último texto normalizado (find_sections se llama con el mismo texto)
+        self._normalized_source = None
+        self._normalized_text = ""
+        # Páginas del último PDF extraído y posición final de cada una en el texto
+        self.last_page_count = 0
+        self.last_page_ends: Tuple[int, ...] = ()
+        # Páginas del último PDF que agotaron el tiempo de extracción
+        self.last_timed_out_pages: List[int] = []
+        # Páginas del último PDF extraído sin capa de texto (no interpretadas)
+        self.last_image_pages: List[int] = []
+        # Evidencias numéricas del último texto normalizado
+        self._evidence_source = None
+        self._evidence = None
+        # Documento compartido en validación (texto normalizado, índice y evidencias)
+        self.document: Optional[Document] = None
+        # Fechas del certificado de calibración del último texto normalizado
+        self._certificate_source = None
+        self._certificate_key = None
+        self._certificate_dates = []
+    
+    def _use_plan(self, plan: RulePlan):
+        """Fija el plan de reglas con el que se valida el documento siguiente"""
+        self.plan = plan
+        self.estructura_entregable1 = plan.rules["componentes"]
+        # Las coincidencias guardadas pertenecen al plan anterior
+        self._matches_text = None
+        self._matches = {}
+        self._approximate_matches = {}
+        self._approximate_hits = {}
+        self._body_hits = {}
+        self._searched = {}
+        # Índice de títulos del último texto (depende de la longitud máxima del plan)
+        self._index_source = None
+        self._index = None
     
-    def extract_text_from_pdf(self, pdf_path: str) -> str:
-        """Extrae texto de un PDF"""
+    def _extract(self, pdf_path: str) -> Tuple[str, bool]:
+        """Extrae el texto usando la caché de extracción si está disponible"""
+        if self.extraction_cache is None:
+            return self.extract_text_from_pdf(pdf_path), False
+        
+        def extractor(path):
+            return self.extract_text_from_pdf(path), self.last_page_ends
+        
+        # Un texto incompleto (páginas sin tiempo) no se guarda en la caché
+        self.last_timed_out_pages = []
+        self.last_image_pages = []
+        text, self.last_page_ends, cached = self.extraction_cache.extract(
+            pdf_path, extractor, should_store=lambda: not self.last_timed_out_pages
+        )
+        self.last_page_count = len(self.last_page_ends)
+        return text, cached
+    
+    def extract_text_from_pdf(self, pdf_path: Union[str, MappedPdf]) -> str:
+        """Extrae texto de un PDF (ruta o PDF ya mapeado en memoria)"""
+        self.last_page_count = 0
+        self.last_page_ends = ()
+        self.last_timed_out_pages = []
+        self.last_image_pages = []
         try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-                return text
+            text, self.last_page_ends = extract_pdf(pdf_path, self.extraction_budget,
+                                                    image_pages=self.last_image_pages)
+            self.last_page_count = len(self.last_page_ends)
+            if self.extraction_budget and self.extraction_budget.incomplete:
+                self.last_timed_out_pages = list(self.extraction_budget.timed_out_pages)
+            return text
         except Exception as e:
-            print(f"Error al leer PDF: {e}")
+            log_failure("extraccion", e, archivo=os.fspath(pdf_path))
+            console.info(f"Error al leer PDF: {e}")
             return ""
     
     def normalize_text(self, text: str) -> str:
         """Normaliza texto para comparación"""
-        # Convertir a mayúsculas
-        text = text.upper()
-        # Eliminar tildes y caracteres especiales
-        replacements = {
-            'Á': 'A', 'É': 'E', 'Í': 'I', 'Ó': 'O', 'Ú': 'U',
-            'Ñ': 'N', '\n': ' ', '\t': ' '
-        }
-        for old, new in replacements.items():
-            text = text.replace(old, new)
-        # Eliminar espacios múltiples
-        text = re.sub(r'\s+', ' ', text)
-        return text.strip()
+        if self.document is not None and text is self.document.text:
+            return self.document.normalized
+        if text is self._normalized_source:
+            METRICS.cache("texto_normalizado", hit=True)
+            return self._normalized_text
+        if len(text) <= 1000:
+            # Títulos sueltos: no se guardan ni se miden
+            return normalize_text(text)
+        METRICS.cache("texto_normalizado", hit=False)
+        with phase("normalizacion", caracteres=len(text)):
+            normalized = normalize_text(text)
+        self._normalized_source = text
+        self._normalized_text = normalized
+        return normalized
+    
+    def evidence(self, text: str) -> EvidenceTable:
+        """Evidencias numéricas del texto (se extraen una vez por documento)"""
+        if self.document is not None and text is self.document.text:
+            return self.document.evidence()
+        text_normalized = self.normalize_text(text)
+        if text_normalized is not self._evidence_source:
+            with phase("evidencias") as info:
+                self._evidence = extract_evidence(text_normalized)
+                info.update(self._evidence.summary())
+            self._evidence_source = text_normalized
+        return self._evidence
+    
+    def certificate_dates(self, text: str, headings: List[str], window: int) -> List[date]:
+        """Fechas válidas cercanas a las menciones del certificado (una vez por documento)
+        
+        Solo se consideran las fechas que empiezan dentro de `window` caracteres
+        tras cada mención de uno de los títulos del certificado.
+        """
+        text_normalized = self.normalize_text(text)
+        headings_normalized = tuple(dict.fromkeys(self.plan.normalize(h) for h in headings))
+        key = (headings_normalized, window)
+        if text_normalized is self._certificate_source and key == self._certificate_key:
+            return self._certificate_dates
+        evidencias = self.evidence(text)
+        with phase("certificado_calibracion") as info:
+            starts = set()
+            for heading in headings_normalized:
+                if self.plan.search(text_normalized, heading):
+                    starts.update(m.start() for m in self.plan.pattern(heading).finditer(text_normalized))
+                elif heading in self._approximate_matches:
+                    # Título dañado: se ubica por el fragmento que coincidió
+                    fragment = self._approximate_matches[heading]["fragmento"]
+                    starts.update(m.start() for m in re.finditer(re.escape(fragment), text_normalized))
+            found = {}
+            for start in sorted(starts):
+                for evidence in evidencias.within("fecha", start, start + window):
+                    if evidence.valor is not None:
+                        found[evidence.inicio] = evidence.valor
+            info["menciones"] = len(starts)
+            info["fechas"] = len(found)
+        self._certificate_source = text_normalized
+        self._certificate_key = key
+        self._certificate_dates = [found[start] for start in sorted(found)]
+        return self._certificate_dates
+    
+    def heading_index(self, text: str) -> HeadingIndex:
+        """Índice de líneas de título del texto (se construye una vez por documento)"""
+        if self.document is not None and text is self.document.text:
+            return self.document.heading_index(self.plan.heading_line_max)
+        if text is not self._index_source:
+            with phase("indice_titulos") as info:
+                self._index = HeadingIndex(text, self.plan.heading_line_max)
+                info["lineas"] = self._index.total_lines
+                info["lineas_titulo"] = len(self._index)
+            self._index_source = text
+        return self._index
     
     def find_sections(self, text: str, sections_list: List[str]) -> Dict[str, bool]:
-        """Busca secciones en el texto"""
+        """Busca secciones en el texto
+        
+        Cada título se busca primero en las líneas de título del documento y,
+        si no aparece allí, en el cuerpo completo.
+        """
         text_normalized = self.normalize_text(text)
+        if text_normalized is not self._matches_text:
+            self._matches_text = text_normalized
+            self._matches = {}
+            self._approximate_matches = {}
+        headings = self.heading_index(text).text
         found_sections = {}
         
         for section in sections_list:
-            section_normalized = self.normalize_text(section)
-            # Buscar la sección como título (puede tener números, puntos, etc.)
-            patterns = [
-                rf'\b{re.escape(section_normalized)}\b',
-                rf'\d+\.?\s*{re.escape(section_normalized)}',
-                rf'[A-Z]+\.?\s*{re.escape(section_normalized)}'
-            ]
-            
-            found = False
-            for pattern in patterns:
-                if re.search(pattern, text_normalized):
-                    found = True
-                    break
-            
-            found_sections[section] = found
+            # Cada título distinto se busca una sola vez por documento
+            section_normalized = self.plan.normalize(section)
+            location = self._matches.get(section_normalized)
+            if location is None:
+                if self.rule_costs is not None:
+                    location = self.rule_costs.locate(self.plan, self._locate, headings, text_normalized,
+                                                      section_normalized)
+                else:
+                    location = self._locate(headings, text_normalized, section_normalized)
+                self._matches[section_normalized] = location
+            if location == "cuerpo":
+                self._body_hits.setdefault(section_normalized, section)
+            elif location == "aproximada":
+                self._approximate_hits.setdefault(
+                    section_normalized, (section, self._approximate_matches[section_normalized])
+                )
+            found_sections[section] = bool(location)
+            self._searched.setdefault(section_normalized, (section, bool(location)))
         
         return found_sections
     
+    def _locate(self, headings: str, text_normalized: str, section_normalized: str) -> str:
+        """Dónde aparece un título: 'titulo', 'cuerpo', 'aproximada' o '' si no aparece"""
+        if self.plan.search(headings, section_normalized):
+            return "titulo"
+        if self.plan.body_fallback and self.plan.search(text_normalized, section_normalized):
+            return "cuerpo"
+        # Texto dañado (palabras partidas, letras confundidas)
+        sources = [("titulo", headings)]
+        if self.plan.body_fallback:
+            sources.append(("cuerpo", text_normalized))
+        for ubicacion, source in sources:
+            approximate = self.plan.approximate(source, section_normalized)
+            if approximate:
+                self._approximate_matches[section_normalized] = {
+                    "errores": approximate["errores"],
+                    "fragmento": approximate["fragmento"],
+                    "ubicacion": ubicacion
+                }
+                return "aproximada"
+        return ""
+    
+    def _add_match_notes(self, result: ValidationResult, notes: Dict):
+        """Agrega al resultado los títulos hallados fuera de las líneas de título o de forma aproximada"""
+        # Se informan aparte para que el revisor confirme el título en el documento
+        result.details.update(notes)
+        if "secciones_aproximadas" in notes:
+            result.warnings.append(
+                f"{len(notes['secciones_aproximadas'])} sección(es) encontrada(s) por coincidencia aproximada"
+            )
+        if "secciones_en_cuerpo" in notes:
+            result.warnings.append(
+                f"{len(notes['secciones_en_cuerpo'])} sección(es) encontrada(s) solo en el texto, no como título"
+            )
+    
+    def take_match_notes(self) -> Dict:
+        """Títulos hallados solo en el cuerpo o por coincidencia aproximada desde la última llamada"""
+        notes = {}
+        if self._approximate_hits:
+            notes["secciones_aproximadas"] = {
+                section: dict(info) for section, info in self._approximate_hits.values()
+            }
+        if self._body_hits:
+            notes["secciones_en_cuerpo"] = list(self._body_hits.values())
+        self._approximate_hits = {}
+        self._body_hits = {}
+        return notes
+    
+    def take_searched_sections(self) -> Dict[str, bool]:
+        """Títulos buscados desde la última llamada y si se encontraron (una fila por variante)"""
+        searched = dict(self._searched.values())
+        self._searched = {}
+        return searched
+    
     def validate_informe_inspeccion(self, text: str) -> ValidationResult:
         """Valida el Informe de Inspección Ocular"""
         config = self.estructura_entregable1["INFORME_INSPECCION_OCULAR"]
@@ -314,16 +317,7 @@ class EntregableValidator:
         
         # Agrupar variantes y contar únicas
         unique_sections = {}
-        section_groups = [
-            ["METODOLOGÍA EMPLEADA PARA LA INSPECCIÓN", "METODOLOGIA EMPLEADA PARA LA INSPECCION"],
-            ["UBICACIÓN Y ACCESOS", "UBICACION Y ACCESOS"],
-            ["INFORMACIÓN RECOGIDA DE CAMPO", "INFORMACION RECOGIDA DE CAMPO"],
-            ["SERVICIOS BÁSICOS EXISTENTES", "SERVICIOS BASICOS EXISTENTES"],
-            ["COMPATIBILIZACIÓN DEL ÁREA A INTERVENIR", "COMPATIBILIZACION DEL AREA A INTERVENIR"],
-            ["VERIFICACIÓN DE DATOS CONSIGNADOS EN LA PARTIDA REGISTRAL", 
-             "VERIFICACION DE DATOS CONSIGNADOS EN LA PARTIDA REGISTRAL"],
-            ["PANEL FOTOGRÁFICO", "PANEL FOTOGRAFICO"]
-        ]
+        section_groups = self.plan.variant_groups(secciones)
         
         for section in secciones:
             # Buscar si pertenece a algún grupo
@@ -378,50 +372,45 @@ class EntregableValidator:
         found_planos = self.find_sections(text, planos)
         
         # Validaciones específicas
-        text_normalized = self.normalize_text(text)
-        
-        # Buscar número de fotografías
-        foto_patterns = [
-            r'(\d+)\s*FOTOGRAFIAS',
-            r'(\d+)\s*FOTOS',
-            r'MINIMO\s*(\d+)\s*FOTOGRAFIAS'
-        ]
-        num_fotos = 0
-        for pattern in foto_patterns:
-            match = re.search(pattern, text_normalized)
-            if match:
-                num_fotos = max(num_fotos, int(match.group(1)))
+        evidencias = self.evidence(text)
+        
+        # Buscar número de fotografías (primera mención de cada forma)
+        fotos = evidencias.of("fotografias")
+        num_fotos = max(
+            next((e.valor for e in fotos if e.forma in ("FOTOGRAFIAS", "MINIMO")), 0),
+            next((e.valor for e in fotos if e.forma == "FOTOS"), 0),
+            next((e.valor for e in fotos if e.forma == "MINIMO"), 0)
+        )
         
         # Buscar certificado de calibración y fecha
         cert_calibracion_found = any(found_anexos.get(a, False) for a in anexos if 'CALIBR' in a)
         cert_date_valid = False
         
+        cert_fecha = None
+        
         if cert_calibracion_found:
-            # Buscar fechas en formato DD/MM/YYYY o similar
-            date_pattern = r'(\d{1,2})[/-](\d{1,2})[/-](\d{4})'
-            dates_found = re.findall(date_pattern, text)
+            # Fechas en formato DD/MM/YYYY cercanas a las menciones del certificado
+            ventana = config["validaciones_especificas"].get(
+                "certificado_calibracion_ventana", DEFAULT_CERTIFICATE_WINDOW
+            )
+            dates_found = self.certificate_dates(text, [a for a in anexos if 'CALIBR' in a], ventana)
             
             if dates_found:
                 today = datetime.now()
-                six_months_ago = today - timedelta(days=180)
+                meses = config["validaciones_especificas"]["certificado_calibracion_meses"]
+                six_months_ago = today - timedelta(days=30 * meses)
                 
-                for date_match in dates_found:
-                    try:
-                        day, month, year = map(int, date_match)
-                        cert_date = datetime(year, month, day)
-                        if cert_date >= six_months_ago:
-                            cert_date_valid = True
-                            break
-                    except:
-                        continue
+                cert_fecha = max(dates_found)
+                cert_date = datetime(cert_fecha.year, cert_fecha.month, cert_fecha.day)
+                cert_date_valid = cert_date >= six_months_ago
         
         # Buscar escalas
         escalas_validas = config["validaciones_especificas"]["escalas_validas"]
-        escalas_encontradas = []
-        for escala in escalas_validas:
-            escala_normalized = self.normalize_text(escala)
-            if escala_normalized in text_normalized:
-                escalas_encontradas.append(escala)
+        escalas_en_texto = set(evidencias.values("escala"))
+        escalas_encontradas = [
+            escala for escala in escalas_validas
+            if self.plan.normalize(escala).replace(" ", "") in escalas_en_texto
+        ]
         
         # Consolidar resultados
         missing_items = []
@@ -430,7 +419,10 @@ class EntregableValidator:
         # Agrupar secciones de memoria
         memoria_found_count = sum(1 for v in found_memoria.values() if v)
         if memoria_found_count < config["memoria_descriptiva"]["minimo_requerido"]:
-            missing_items.append(f"Memoria Descriptiva incompleta ({memoria_found_count}/7 secciones)")
+            missing_items.append(
+                f"Memoria Descriptiva incompleta ({memoria_found_count}/"
+                f"{config['memoria_descriptiva']['minimo_requerido']} secciones)"
+            )
         
         # Anexos
         anexos_found_count = sum(1 for v in found_anexos.values() if v)
@@ -443,14 +435,18 @@ class EntregableValidator:
             missing_items.append("Planos incompletos")
         
         # Fotografías
-        if num_fotos < config["validaciones_especificas"]["minimo_fotografias"]:
-            warnings.append(f"Se requieren mínimo 20 fotografías (encontradas: {num_fotos})")
+        minimo_fotografias = config["validaciones_especificas"]["minimo_fotografias"]
+        if num_fotos < minimo_fotografias:
+            warnings.append(f"Se requieren mínimo {minimo_fotografias} fotografías (encontradas: {num_fotos})")
         
         # Certificado de calibración
         if not cert_calibracion_found:
             missing_items.append("Certificado de Calibración no encontrado")
         elif not cert_date_valid:
-            warnings.append("Verificar antigüedad del Certificado de Calibración (máx 6 meses)")
+            warnings.append(
+                "Verificar antigüedad del Certificado de Calibración "
+                f"(máx {config['validaciones_especificas']['certificado_calibracion_meses']} meses)"
+            )
         
         # Escalas
         if not escalas_encontradas:
@@ -458,8 +454,8 @@ class EntregableValidator:
         
         is_valid = (
             memoria_found_count >= config["memoria_descriptiva"]["minimo_requerido"] and
-            anexos_found_count >= 3 and
-            planos_found_count >= 2 and
+            anexos_found_count >= config["minimo_anexos"] and
+            planos_found_count >= config["minimo_planos"] and
             cert_calibracion_found
         )
         
@@ -484,7 +480,8 @@ class EntregableValidator:
                 "fotografias": num_fotos,
                 "escalas_encontradas": escalas_encontradas,
                 "cert_calibracion": cert_calibracion_found,
-                "cert_fecha_valida": cert_date_valid
+                "cert_fecha_valida": cert_date_valid,
+                "cert_fecha": cert_fecha.isoformat() if cert_fecha else None
             }
         )
     
@@ -506,15 +503,20 @@ class EntregableValidator:
         informe_count = sum(1 for k, v in found_informe.items() if v and ("ESTADO" in k or "SUSTENTO" in k or "VERIFICACION" in k))
         planos_count = sum(1 for v in found_planos.values() if v)
         
+        minimos = config["minimos"]
         missing_items = []
-        if memoria_count < 2:
+        if memoria_count < minimos["memoria_descriptiva"]:
             missing_items.append("Memoria Descriptiva incompleta")
-        if informe_count < 2:
+        if informe_count < minimos["informe_tecnico"]:
             missing_items.append("Informe Técnico incompleto")
-        if planos_count < 1:
+        if planos_count < minimos["planos"]:
             missing_items.append("Plano General faltante")
         
-        is_valid = memoria_count >= 2 and informe_count >= 2 and planos_count >= 1
+        is_valid = (
+            memoria_count >= minimos["memoria_descriptiva"] and
+            informe_count >= minimos["informe_tecnico"] and
+            planos_count >= minimos["planos"]
+        )
         
         return ValidationResult(
             component="ESTUDIO DE DEMOLICIÓN",
@@ -540,43 +542,39 @@ class EntregableValidator:
         for key, found in found_sections.items():
             if found:
                 # Normalizar clave eliminando tildes y variantes
-                normalized_key = self.normalize_text(key)
+                normalized_key = self.plan.normalize(key)
                 unique_keys.add(normalized_key)
         
         sections_found = len(unique_keys)
         
-        # Buscar número de puntos de investigación (calicatas)
-        text_normalized = self.normalize_text(text)
-        puntos_patterns = [
-            r'(\d+)\s*PUNTOS?\s*DE\s*INVESTIGACION',
-            r'(\d+)\s*CALICATAS?',
-            r'(\d+)\s*EXPLORACIONES?'
-        ]
-        
-        num_puntos = 0
-        for pattern in puntos_patterns:
-            matches = re.findall(pattern, text_normalized)
-            if matches:
-                num_puntos = max(num_puntos, max(int(m) for m in matches))
+        # Número de puntos de investigación (calicatas, exploraciones)
+        num_puntos = max(self.evidence(text).values("puntos_investigacion"), default=0)
         
         missing_items = []
         warnings = []
         
-        if sections_found < 10:
-            missing_items.append(f"Secciones principales incompletas ({sections_found}/15)")
+        if sections_found < config["minimo_secciones"]:
+            missing_items.append(f"Secciones principales incompletas ({sections_found}/{config['secciones_referencia']})")
         
         if num_puntos < config["minimo_puntos_investigacion"]:
-            warnings.append(f"Se requieren mínimo 3 puntos de investigación (encontrados: {num_puntos})")
+            warnings.append(
+                f"Se requieren mínimo {config['minimo_puntos_investigacion']} puntos de investigación "
+                f"(encontrados: {num_puntos})"
+            )
         
         # Verificar anexos específicos
-        anexos_requeridos = ["REGISTRO DE EXCAVACIONES", "ENSAYOS DE LABORATORIO"]
+        anexos_requeridos = config["anexos_requeridos"]
         found_anexos = self.find_sections(text, anexos_requeridos)
         anexos_count = sum(1 for v in found_anexos.values() if v)
         
-        if anexos_count < 2:
+        if anexos_count < config["minimo_anexos"]:
             missing_items.append("Anexos incompletos (Registro Excavaciones y/o Ensayos)")
         
-        is_valid = sections_found >= 10 and num_puntos >= 3 and anexos_count >= 2
+        is_valid = (
+            sections_found >= config["minimo_secciones"] and
+            num_puntos >= config["minimo_puntos_investigacion"] and
+            anexos_count >= config["minimo_anexos"]
+        )
         
         return ValidationResult(
             component="ESTUDIO DE MECÁNICA DE SUELOS",
@@ -600,7 +598,7 @@ class EntregableValidator:
         found_count = sum(1 for v in found_sections.values() if v)
         missing = [k for k, v in found_sections.items() if not v]
         
-        is_valid = found_count >= 2  # Al menos Canteras y Fuentes de Agua
+        is_valid = found_count >= config["minimo_requerido"]  # Al menos Canteras y Fuentes de Agua
         
         warnings = []
         if not found_sections.get("DISEÑO DE MEZCLA", False) and not found_sections.get("DISEÑO DE MEZCLAS", False):
@@ -623,16 +621,7 @@ class EntregableValidator:
         
         # Contar secciones únicas
         unique_found = set()
-        section_groups = [
-            ["HORIZONTE DE EVALUACIÓN", "HORIZONTE DE EVALUACION"],
-            ["ÁREA DE INFLUENCIA", "AREA DE INFLUENCIA"],
-            ["ANÁLISIS DE LA DEMANDA", "ANALISIS DE LA DEMANDA"],
-            ["POBLACIÓN DE REFERENCIA", "POBLACION DE REFERENCIA"],
-            ["POBLACIÓN DEMANDANTE POTENCIAL", "POBLACION DEMANDANTE POTENCIAL"],
-            ["POBLACIÓN DEMANDANTE EFECTIVA", "POBLACION DEMANDANTE EFECTIVA"],
-            ["ANÁLISIS DE LA OFERTA", "ANALISIS DE LA OFERTA"],
-            ["DETERMINACIÓN DE LA BRECHA", "DETERMINACION DE LA BRECHA"]
-        ]
+        section_groups = self.plan.variant_groups(secciones)
         
         for section in secciones:
             group_found = False
@@ -651,11 +640,12 @@ class EntregableValidator:
         
         # Buscar referencia a ESCALE
         text_normalized = self.normalize_text(text)
-        escale_found = "ESCALE" in text_normalized
+        referencia = config["referencia_datos"]
+        escale_found = self.plan.normalize(referencia) in text_normalized
         
         warnings = []
         if not escale_found:
-            warnings.append("No se encontró referencia a datos de ESCALE")
+            warnings.append(f"No se encontró referencia a datos de {referencia}")
         
         is_valid = found_count >= config["minimo_requerido"]
         
@@ -692,27 +682,37 @@ class EntregableValidator:
         memoria_calc_count = len(set(k for k, v in found_calculo.items() if v))
         planos_count = len(set(k for k, v in found_planos.items() if v))
         
+        minimos = config["minimos"]
+        referencias = config["referencias"]
         missing_items = []
         warnings = []
         
-        if memoria_desc_count < 15:
-            missing_items.append(f"Memoria Descriptiva incompleta ({memoria_desc_count}/26 secciones)")
+        if memoria_desc_count < minimos["memoria_descriptiva"]:
+            missing_items.append(
+                f"Memoria Descriptiva incompleta ({memoria_desc_count}/{referencias['memoria_descriptiva']} secciones)"
+            )
         
-        if memoria_calc_count < 5:
-            missing_items.append(f"Memoria de Cálculo incompleta ({memoria_calc_count}/10 secciones)")
+        if memoria_calc_count < minimos["memoria_calculo"]:
+            missing_items.append(
+                f"Memoria de Cálculo incompleta ({memoria_calc_count}/{referencias['memoria_calculo']} secciones)"
+            )
         
-        if planos_count < 3:
-            missing_items.append(f"Planos incompletos ({planos_count}/6 mínimos)")
+        if planos_count < minimos["planos"]:
+            missing_items.append(f"Planos incompletos ({planos_count}/{referencias['planos']} mínimos)")
         
         # Buscar normatividad específica
-        text_normalized = self.normalize_text(text)
-        normas_requeridas = ["A.010", "A.040", "A.120", "A.130"]
-        normas_encontradas = [n for n in normas_requeridas if n in text_normalized]
+        normas_en_texto = set(self.evidence(text).values("norma"))
+        normas_requeridas = config["normas_requeridas"]
+        normas_encontradas = [n for n in normas_requeridas if self.plan.normalize(n) in normas_en_texto]
         
-        if len(normas_encontradas) < 3:
+        if len(normas_encontradas) < config["minimo_normas"]:
             warnings.append(f"Verificar referencias normativas (RNE): {', '.join(normas_requeridas)}")
         
-        is_valid = memoria_desc_count >= 15 and memoria_calc_count >= 5 and planos_count >= 3
+        is_valid = (
+            memoria_desc_count >= minimos["memoria_descriptiva"] and
+            memoria_calc_count >= minimos["memoria_calculo"] and
+            planos_count >= minimos["planos"]
+        )
         
         return ValidationResult(
             component="ANTEPROYECTO DE ARQUITECTURA",
@@ -738,82 +738,132 @@ class EntregableValidator:
     
     def validate_entregable1(self, pdf_path: str) -> Dict:
         """Valida el Entregable 1 completo"""
-        print(f"\n{'='*80}")
-        print(f"VALIDACIÓN DEL PRIMER ENTREGABLE")
-        print(f"{'='*80}")
-        print(f"Archivo: {pdf_path}")
-        print(f"Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
-        print(f"{'='*80}\n")
+        return self._with_correlation(pdf_path, self._validate_entregable1, pdf_path)
+    
+    def validate_document(self, document: Document) -> Dict:
+        """Valida el Entregable 1 sobre un documento ya extraído (compartido entre perfiles)"""
+        return self._with_correlation(document.path, self._validate_shared, document)
+    
+    def _with_correlation(self, pdf_path: str, validate, *args) -> Dict:
+        """Ejecuta una validación con id de correlación y eventos de inicio y fin"""
+        with correlation() as correlation_id, document_memory() as memory:
+            start = time.perf_counter()
+            log_event("inicio_documento", archivo=pdf_path)
+            report = validate(*args)
+            if "metadata" in report:
+                report["metadata"]["id_correlacion"] = correlation_id
+                # Pico residente y asignado de cada fase del documento
+                report["metadata"]["memoria"] = memory.summary()
+            log_event(
+                "fin_documento",
+                archivo=pdf_path,
+                estado=report.get("metadata", {}).get("estado", report.get("status")),
+                duracion_ms=round((time.perf_counter() - start) * 1000, 3)
+            )
+            return report
+    
+    def _pin_plan(self):
+        """El documento completo se valida con el plan vigente al iniciar"""
+        if self.rule_watcher:
+            plan = self.rule_watcher.current()
+            if plan is not self.plan:
+                self._use_plan(plan)
+    
+    def _print_header(self, pdf_path: str):
+        console.info(f"\n{'='*80}")
+        console.info(f"VALIDACIÓN DEL PRIMER ENTREGABLE")
+        console.info(f"{'='*80}")
+        console.info(f"Archivo: {pdf_path}")
+        console.info(f"Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
+        console.info(f"{'='*80}\n")
+    
+    def _validate_entregable1(self, pdf_path: str) -> Dict:
+        """Ejecuta las validaciones del Entregable 1 sobre un PDF"""
+        self._pin_plan()
+        self._print_header(pdf_path)
         
         # Extraer texto del PDF
-        print("Extrayendo texto del PDF...")
-        text = self.extract_text_from_pdf(pdf_path)
-        
-        if not text:
+        console.info("Extrayendo texto del PDF...")
+        with phase("extraccion", archivo=pdf_path) as info:
+            text, info["desde_cache"] = self._extract(pdf_path)
+            info["paginas"] = self.last_page_count
+            info["caracteres"] = len(text)
+            if self.last_timed_out_pages:
+                info["paginas_tiempo_agotado"] = len(self.last_timed_out_pages)
+            if self.last_image_pages:
+                info["paginas_solo_imagen"] = len(self.last_image_pages)
+            # Las líneas de título se indexan antes de perder los saltos de línea
+            info["lineas_titulo"] = len(self.heading_index(text))
+        
+        return self._validate_text(pdf_path, text)
+    
+    def _validate_shared(self, document: Document) -> Dict:
+        """Ejecuta las validaciones del Entregable 1 sobre un documento compartido"""
+        self._pin_plan()
+        self._print_header(document.path)
+        self.last_page_ends = document.page_ends
+        self.last_page_count = document.pages
+        self.last_timed_out_pages = list(document.timed_out_pages)
+        self.last_image_pages = list(document.image_pages)
+        self.document = document
+        try:
+            return self._validate_text(document.path, document.text)
+        finally:
+            self.document = None
+    
+    def _validate_text(self, pdf_path: str, text: str) -> Dict:
+        """Valida los componentes del Entregable 1 y arma el reporte"""
+        all_timed_out = bool(self.last_timed_out_pages) and len(self.last_timed_out_pages) == self.last_page_count
+        if not text or all_timed_out:
+            METRICS.inc("rpa_documentos_procesados_total", estado="ERROR")
             return {
                 "status": "ERROR",
-                "message": "No se pudo extraer texto del PDF"
+                "message": "Tiempo de extracción agotado en todas las páginas"
+                if all_timed_out else "No se pudo extraer texto del PDF"
             }
         
-        print(f"✓ Texto extraído: {len(text)} caracteres\n")
+        console.info(f"✓ Texto extraído: {len(text)} caracteres\n")
+        if self.rule_costs is not None:
+            self.rule_costs.reset()
         
         # Ejecutar validaciones
         validations = []
         
-        print("Validando componentes...\n")
-        
-        # 1. Informe de Inspección Ocular
-        print("1. Informe Técnico de Inspección Ocular...")
-        result1 = self.validate_informe_inspeccion(text)
-        validations.append(result1)
-        self._print_result(result1)
-        
-        # 2. Estudio Topográfico
-        print("\n2. Estudio Topográfico...")
-        result2 = self.validate_estudio_topografico(text)
-        validations.append(result2)
-        self._print_result(result2)
-        
-        # 3. Estudio de Demolición
-        print("\n3. Estudio de Demolición...")
-        result3 = self.validate_estudio_demolicion(text)
-        validations.append(result3)
-        self._print_result(result3)
-        
-        # 4. Estudio de Mecánica de Suelos
-        print("\n4. Estudio de Mecánica de Suelos...")
-        result4 = self.validate_mecanica_suelos(text)
-        validations.append(result4)
-        self._print_result(result4)
-        
-        # 5. Estudio de Canteras y Fuentes de Agua
-        print("\n5. Estudio de Canteras y Fuentes de Agua...")
-        result5 = self.validate_canteras_agua(text)
-        validations.append(result5)
-        self._print_result(result5)
-        
-        # 6. Estudio de Demanda
-        print("\n6. Estudio de Demanda...")
-        result6 = self.validate_estudio_demanda(text)
-        validations.append(result6)
-        self._print_result(result6)
-        
-        # 7. Anteproyecto de Arquitectura
-        print("\n7. Anteproyecto de Arquitectura...")
-        result7 = self.validate_anteproyecto_arquitectura(text)
-        validations.append(result7)
-        self._print_result(result7)
+        console.info("Validando componentes...\n")
+        
+        componentes = [
+            ("Informe Técnico de Inspección Ocular", self.validate_informe_inspeccion),
+            ("Estudio Topográfico", self.validate_estudio_topografico),
+            ("Estudio de Demolición", self.validate_estudio_demolicion),
+            ("Estudio de Mecánica de Suelos", self.validate_mecanica_suelos),
+            ("Estudio de Canteras y Fuentes de Agua", self.validate_canteras_agua),
+            ("Estudio de Demanda", self.validate_estudio_demanda),
+            ("Anteproyecto de Arquitectura", self.validate_anteproyecto_arquitectura),
+        ]
+        
+        for idx, (titulo, validate) in enumerate(componentes, 1):
+            console.info(f"{chr(10) if idx > 1 else ''}{idx}. {titulo}...")
+            with phase(validate.__name__) as info:
+                result = validate(text)
+                self._add_match_notes(result, self.take_match_notes())
+                result.sections = self.take_searched_sections()
+                info["aproximadas"] = len(result.details.get("secciones_aproximadas", {}))
+                info["en_cuerpo"] = len(result.details.get("secciones_en_cuerpo", []))
+                info["componente"] = result.component
+                info["valido"] = result.is_valid
+            validations.append(result)
+            self._print_result(result)
         
         # Resumen general
         total_valid = sum(1 for v in validations if v.is_valid)
         total_components = len(validations)
         
-        print(f"\n{'='*80}")
-        print(f"RESUMEN GENERAL")
-        print(f"{'='*80}")
-        print(f"Componentes válidos: {total_valid}/{total_components}")
-        print(f"Estado general: {'✓ APROBADO' if total_valid == total_components else '✗ OBSERVADO'}")
-        print(f"{'='*80}\n")
+        console.info(f"\n{'='*80}")
+        console.info(f"RESUMEN GENERAL")
+        console.info(f"{'='*80}")
+        console.info(f"Componentes válidos: {total_valid}/{total_components}")
+        console.info(f"Estado general: {'✓ APROBADO' if total_valid == total_components else '✗ OBSERVADO'}")
+        console.info(f"{'='*80}\n")
         
         # Generar reporte detallado
         report = {
@@ -822,7 +872,9 @@ class EntregableValidator:
                 "fecha_validacion": datetime.now().isoformat(),
                 "total_componentes": total_components,
                 "componentes_validos": total_valid,
-                "estado": "APROBADO" if total_valid == total_components else "OBSERVADO"
+                "estado": "APROBADO" if total_valid == total_components else "OBSERVADO",
+                "reglas": self.plan.nombre,
+                "version_reglas": self.plan.version
             },
             "validaciones": [
                 {
@@ -830,13 +882,36 @@ class EntregableValidator:
                     "valido": v.is_valid,
                     "elementos_faltantes": v.missing_items,
                     "advertencias": v.warnings,
-                    "detalles": v.details
+                    "detalles": v.details,
+                    "secciones": v.sections
                 }
                 for v in validations
             ],
             "observaciones_generales": self._generate_general_observations(validations)
         }
         
+        coverage = report["metadata"]["cobertura_texto"] = text_coverage(text, self.last_page_ends)
+        if coverage["sin_texto"]:
+            report["observaciones_generales"].append(
+                f"Páginas sin texto: {len(coverage['sin_texto'])} de {coverage['paginas']} "
+                f"(escaneadas o solo imagen; no se revisan sin OCR)"
+            )
+        
+        if self.last_timed_out_pages:
+            # Las páginas sin texto por tiempo se informan en lugar de detener el lote
+            report["metadata"]["paginas_tiempo_agotado"] = self.last_timed_out_pages
+            report["observaciones_generales"].insert(
+                0, f"Extracción incompleta: tiempo agotado en {len(self.last_timed_out_pages)} página(s) "
+                   f"({', '.join(map(str, self.last_timed_out_pages))})"
+            )
+        
+        if self.rule_costs is not None:
+            costs = report["metadata"]["costo_reglas"] = self.rule_costs.take()
+            log_event("costo_reglas", **{k: v for k, v in costs.items() if k != "por_titulo"},
+                      mas_costosos=[row["titulo"] for row in costs["por_titulo"][:5]])
+        
+        METRICS.inc("rpa_documentos_procesados_total", estado=report["metadata"]["estado"])
+        
         return report
     
     def _print_result(self, result: ValidationResult):
@@ -844,17 +919,17 @@ class EntregableValidator:
         status_icon = "✓" if result.is_valid else "✗"
         status_text = "VÁLIDO" if result.is_valid else "OBSERVADO"
         
-        print(f"   {status_icon} {status_text}")
+        console.info(f"   {status_icon} {status_text}")
         
         if result.missing_items:
-            print(f"   Elementos faltantes:")
+            console.info(f"   Elementos faltantes:")
             for item in result.missing_items:
-                print(f"      • {item}")
+                console.info(f"      • {item}")
         
         if result.warnings:
-            print(f"   Advertencias:")
+            console.info(f"   Advertencias:")
             for warning in result.warnings:
-                print(f"      ⚠ {warning}")
+                console.info(f"      ⚠ {warning}")
     
     def _generate_general_observations(self, validations: List[ValidationResult]) -> List[str]:
         """Genera observaciones generales"""
@@ -880,17 +955,20 @@ class EntregableValidator:
         
         return observations
     
+    @logged_phase("export_report")
     def export_report(self, report: Dict, output_path: str = "reporte_validacion_entregable1.json"):
         """Exporta reporte a JSON"""
         try:
             with open(output_path, 'w', encoding='utf-8') as f:
                 json.dump(report, f, ensure_ascii=False, indent=2)
-            print(f"\n✓ Reporte exportado: {output_path}")
+            console.info(f"\n✓ Reporte exportado: {output_path}")
             return True
         except Exception as e:
-            print(f"\n✗ Error al exportar reporte: {e}")
+            log_failure("export_report", e, archivo=output_path)
+            console.info(f"\n✗ Error al exportar reporte: {e}")
             return False
     
+    @logged_phase("export_report_txt")
     def export_report_txt(self, report: Dict, output_path: str = "reporte_validacion_entregable1.txt"):
         """Exporta reporte a formato TXT legible"""
         try:
@@ -940,12 +1018,14 @@ class EntregableValidator:
                 f.write("Fin del reporte\n")
                 f.write("="*80 + "\n")
             
-            print(f"✓ Reporte TXT exportado: {output_path}")
+            console.info(f"✓ Reporte TXT exportado: {output_path}")
             return True
         except Exception as e:
-            print(f"✗ Error al exportar reporte TXT: {e}")
+            log_failure("export_report_txt", e, archivo=output_path)
+            console.info(f"✗ Error al exportar reporte TXT: {e}")
             return False
     
+    @logged_phase("export_report_pdf")
     def export_report_pdf(self, report: Dict, output_path: str = "reporte_validacion_entregable1.pdf"):
         """Exporta reporte a formato PDF profesional"""
         try:
@@ -1223,11 +1303,12 @@ class EntregableValidator:
             # Construir PDF
             doc.build(story)
             
-            print(f"✓ Reporte PDF exportado: {output_path}")
+            console.info(f"✓ Reporte PDF exportado: {output_path}")
             return True
             
         except Exception as e:
-            print(f"✗ Error al exportar reporte PDF: {e}")
+            log_failure("export_report_pdf", e, archivo=output_path)
+            console.info(f"✗ Error al exportar reporte PDF: {e}")
             import traceback
             traceback.print_exc()
             return False
@@ -1235,58 +1316,115 @@ class EntregableValidator:
 
 def main():
     """Función principal"""
-    import sys
+    parser = argparse.ArgumentParser(
+        usage="python rpa_general.py <ruta_pdf> [opciones]",
+        epilog="Ejemplo: python rpa_general.py entregable1.pdf"
+    )
+    parser.add_argument("pdf_path", nargs="?")
+    parser.add_argument("--reglas", help="Archivo de reglas (por defecto reglas/entregable1.json)")
+    parser.add_argument("--historial", default=DEFAULT_DB_PATH,
+                        help="Base de datos del historial de validaciones")
+    parser.add_argument("--sin-historial", action="store_true",
+                        help="No registrar el resultado en el historial")
+    parser.add_argument("--jsonl", help="Agregar el reporte a un archivo JSON Lines")
+    parser.add_argument("--solo-jsonl", action="store_true",
+                        help="Generar solo el JSON Lines, sin reportes JSON/TXT/PDF")
+    parser.add_argument("--metricas-archivo",
+                        help="Escribir métricas Prometheus en este archivo (textfile collector)")
+    parser.add_argument("--logs", default=DEFAULT_LOG_DIR,
+                        help="Carpeta de eventos estructurados (JSON Lines)")
+    parser.add_argument("--sin-logs", action="store_true", help="No registrar eventos en archivo")
+    parser.add_argument("--silencioso", action="store_true", help="Sin salida de consola")
+    parser.add_argument("--costo-reglas", action="store_true",
+                        help="Medir el costo de cada título de las reglas y mostrar los más caros")
+    parser.add_argument("--memoria-asignaciones", action="store_true",
+                        help="Registrar también el pico de memoria asignada por fase (tracemalloc; más lento)")
+    parser.add_argument("--perfilar", action="store_true", default=interval_from_env() > 0,
+                        help=f"Perfilar la validación y los reportes en <logs>/perfilado (o ${ENV_VAR}=1)")
+    args = parser.parse_args()
+    
+    configure_logging(None if args.sin_logs else args.logs, console_enabled=not args.silencioso)
+    
+    console.info("\n" + "="*80)
+    console.info("RPA - VALIDADOR DE ENTREGABLE 1")
+    console.info("Expediente Técnico IE N° 33065 Pacro Yuncan")
+    console.info("="*80 + "\n")
     
-    print("\n" + "="*80)
-    print("RPA - VALIDADOR DE ENTREGABLE 1")
-    print("Expediente Técnico IE N° 33065 Pacro Yuncan")
-    print("="*80 + "\n")
+    if args.solo_jsonl and not args.jsonl:
+        parser.error("--solo-jsonl requiere --jsonl")
     
     # Verificar argumentos
-    if len(sys.argv) < 2:
-        print("Uso: python rpa_validador.py <ruta_pdf>")
-        print("\nEjemplo:")
-        print("  python rpa_validador.py entregable1.pdf")
+    if not args.pdf_path:
+        console.info("Uso: python rpa_general.py <ruta_pdf>")
+        console.info("\nEjemplo:")
+        console.info("  python rpa_general.py entregable1.pdf")
         return
     
-    pdf_path = sys.argv[1]
+    pdf_path = args.pdf_path
     
     # Verificar que el archivo existe
     if not os.path.exists(pdf_path):
-        print(f"✗ Error: El archivo '{pdf_path}' no existe")
+        console.info(f"✗ Error: El archivo '{pdf_path}' no existe")
         return
     
-    # Crear validador
-    validator = EntregableValidator()
+    if args.memoria_asignaciones:
+        track_allocations()
     
-    # Ejecutar validación
-    report = validator.validate_entregable1(pdf_path)
+    # Con --perfilar se perfilan la validación y los reportes
+    with profiled(pdf_path, args.logs) if args.perfilar else nullcontext():
+        # Crear validador
+        validator = EntregableValidator(args.reglas, rule_costs=RuleCostRecorder() if args.costo_reglas else None)
     
-    if report.get("status") == "ERROR":
-        print(f"\n✗ Error: {report.get('message')}")
-        return
+        # Ejecutar validación
+        report = validator.validate_entregable1(pdf_path)
+    
+        if report.get("status") == "ERROR":
+            console.info(f"\n✗ Error: {report.get('message')}")
+            return
+    
+        # Exportar reportes
+        base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+    
+        json_output = f"reporte_{base_name}.json"
+        txt_output = f"reporte_{base_name}.txt"
+        pdf_output = f"reporte_{base_name}.pdf"
+        generated = [] if args.solo_jsonl else [json_output, txt_output, pdf_output]
+    
+        if args.jsonl:
+            with JsonlSink(args.jsonl) as sink:
+                sink.write(report)
+            generated.append(args.jsonl)
     
-    # Exportar reportes
-    base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+        if not args.solo_jsonl:
+            # Los eventos de exportación comparten el id de correlación del documento
+            with correlation(report["metadata"]["id_correlacion"]):
+                validator.export_report(report, json_output)
+                validator.export_report_txt(report, txt_output)
+                validator.export_report_pdf(report, pdf_output)
     
-    json_output = f"reporte_{base_name}.json"
-    txt_output = f"reporte_{base_name}.txt"
-    pdf_output = f"reporte_{base_name}.pdf"
+    # Registrar en el historial
+    if not args.sin_historial:
+        with ResultsStore(args.historial) as store:
+            store.save_report(report)
+        console.info(f"✓ Resultado registrado en historial: {args.historial}")
     
-    validator.export_report(report, json_output)
-    validator.export_report_txt(report, txt_output)
-    validator.export_report_pdf(report, pdf_output)
+    if args.metricas_archivo:
+        METRICS.write_textfile(args.metricas_archivo)
     
-    print("\n" + "="*80)
-    print("VALIDACIÓN COMPLETADA")
-    print("="*80)
-    print(f"\nEstado: {report['metadata']['estado']}")
-    print(f"Componentes válidos: {report['metadata']['componentes_validos']}/{report['metadata']['total_componentes']}")
-    print(f"\nReportes generados:")
-    print(f"  • {json_output}")
-    print(f"  • {txt_output}")
-    print(f"  • {pdf_output}")
-    print("\n")
+    console.info("\n" + "="*80)
+    console.info("VALIDACIÓN COMPLETADA")
+    console.info("="*80)
+    console.info(f"\nEstado: {report['metadata']['estado']}")
+    console.info(f"Componentes válidos: {report['metadata']['componentes_validos']}/{report['metadata']['total_componentes']}")
+    console.info(f"Memoria residente pico: {report['metadata']['memoria']['pico_rss_mb']} MB")
+    console.info(f"\nReportes generados:")
+    for output in generated:
+        console.info(f"  • {output}")
+    if args.costo_reglas:
+        console.info("")
+        for line in format_table(report["metadata"]["costo_reglas"]):
+            console.info(line)
+    console.info("\n")
 
 
 
@@ -0,0 +1,344 @@
+"""
+Historial de validaciones del RPA en una base SQLite indexada
+Una fila por archivo, por componente y por sección
+
+Uso:
+  python rpa_historial.py importar reporte_*.json
+  python rpa_historial.py fallos --seccion "VERIFICACION DE DATOS CONSIGNADOS EN LA PARTIDA REGISTRAL" --mes 2025-10
+  python rpa_historial.py componentes --componente "ESTUDIO TOPOGRÁFICO" --observados
+  python rpa_historial.py resumen
+"""
+
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from rpa_registro import DEFAULT_LOG_DIR, configure_logging, log_failure
+from rpa_texto import normalize_text
+
+
+DEFAULT_DB_PATH = os.path.join("output", "historial.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS archivos (
+    id INTEGER PRIMARY KEY,
+    archivo TEXT NOT NULL,
+    expediente TEXT NOT NULL,
+    fecha_validacion TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    total_componentes INTEGER NOT NULL,
+    componentes_validos INTEGER NOT NULL,
+    reporte TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS componentes (
+    id INTEGER PRIMARY KEY,
+    archivo_id INTEGER NOT NULL REFERENCES archivos(id) ON DELETE CASCADE,
+    componente TEXT NOT NULL,
+    valido INTEGER NOT NULL,
+    fecha_validacion TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS secciones (
+    id INTEGER PRIMARY KEY,
+    archivo_id INTEGER NOT NULL REFERENCES archivos(id) ON DELETE CASCADE,
+    componente_id INTEGER NOT NULL REFERENCES componentes(id) ON DELETE CASCADE,
+    seccion TEXT NOT NULL,
+    seccion_normalizada TEXT NOT NULL,
+    encontrada INTEGER NOT NULL,
+    fecha_validacion TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_archivos_fecha ON archivos(fecha_validacion);
+CREATE INDEX IF NOT EXISTS idx_archivos_expediente ON archivos(expediente, fecha_validacion);
+CREATE INDEX IF NOT EXISTS idx_componentes_busqueda ON componentes(componente, valido, fecha_validacion);
+CREATE INDEX IF NOT EXISTS idx_componentes_archivo ON componentes(archivo_id);
+CREATE INDEX IF NOT EXISTS idx_secciones_busqueda ON secciones(seccion_normalizada, encontrada, fecha_validacion);
+CREATE INDEX IF NOT EXISTS idx_secciones_archivo ON secciones(archivo_id);
+"""
+
+# Un reporte se identifica por expediente, fecha de validación y ruta: volver a
+# importarlo lo reemplaza en lugar de duplicarlo
+UNIQUE_INDEX = "idx_archivos_unico"
+UNIQUE_SCHEMA = f"""
+CREATE UNIQUE INDEX IF NOT EXISTS {UNIQUE_INDEX} ON archivos(expediente, fecha_validacion, archivo);
+"""
+
+
+def report_validations(report: Dict) -> List[Dict]:
+    """Devuelve la lista de validaciones de un reporte (general o de inspección)"""
+    if "validaciones" in report:
+        return report["validaciones"]
+    if "validacion" in report:
+        return [report["validacion"]]
+    return []
+
+
+def validation_sections(validation: Dict) -> Dict[str, bool]:
+    """Títulos buscados en un componente y si se encontraron
+
+    Los reportes generales los traen en "secciones"; los del validador de
+    inspección (y los reportes anteriores) solo en detalle_secciones.
+    """
+    return validation.get("secciones") or validation.get("detalles", {}).get("detalle_secciones", {})
+
+
+def expediente_from_path(path: str) -> str:
+    """Obtiene el identificador del expediente a partir del nombre del archivo"""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+class ResultsStore:
+    """Almacén local de resultados de validación"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+        self._add_unique_index()
+
+    def _add_unique_index(self):
+        """Crea el índice único en bases anteriores, eliminando antes los reportes duplicados"""
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (UNIQUE_INDEX,)
+        ).fetchone()
+        if exists:
+            return
+        with self.conn:
+            # Se conserva la primera copia; componentes y secciones se borran en cascada
+            self.conn.execute(
+                "DELETE FROM archivos WHERE id NOT IN "
+                "(SELECT MIN(id) FROM archivos GROUP BY expediente, fecha_validacion, archivo)"
+            )
+            self.conn.executescript(UNIQUE_SCHEMA)
+
+    def close(self):
+        """Cierra la conexión"""
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def save_report(self, report: Dict) -> Optional[int]:
+        """Guarda un reporte de validación y devuelve el id del archivo
+
+        Si el reporte ya estaba guardado (mismo expediente, fecha y ruta) se
+        reemplaza junto con sus componentes y secciones.
+        """
+        meta = report.get("metadata")
+        if not meta:
+            return None
+
+        validaciones = report_validations(report)
+        fecha = meta["fecha_validacion"]
+        total = meta.get("total_componentes", len(validaciones))
+        validos = meta.get("componentes_validos", sum(1 for v in validaciones if v["valido"]))
+
+        expediente = expediente_from_path(meta["archivo"])
+        values = (
+            meta["estado"],
+            total,
+            validos,
+            json.dumps(report, ensure_ascii=False, separators=(",", ":"))
+        )
+
+        with self.conn:
+            row = self.conn.execute(
+                "SELECT id FROM archivos WHERE expediente = ? AND fecha_validacion = ? AND archivo = ?",
+                (expediente, fecha, meta["archivo"])
+            ).fetchone()
+            if row:
+                archivo_id = row["id"]
+                self.conn.execute(
+                    "UPDATE archivos SET estado = ?, total_componentes = ?, componentes_validos = ?, "
+                    "reporte = ? WHERE id = ?",
+                    values + (archivo_id,)
+                )
+                # Las secciones se borran en cascada
+                self.conn.execute("DELETE FROM componentes WHERE archivo_id = ?", (archivo_id,))
+            else:
+                cursor = self.conn.execute(
+                    "INSERT INTO archivos (archivo, expediente, fecha_validacion, estado, "
+                    "total_componentes, componentes_validos, reporte) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (meta["archivo"], expediente, fecha) + values
+                )
+                archivo_id = cursor.lastrowid
+
+            for val in validaciones:
+                cursor = self.conn.execute(
+                    "INSERT INTO componentes (archivo_id, componente, valido, fecha_validacion) "
+                    "VALUES (?, ?, ?, ?)",
+                    (archivo_id, val["componente"], int(bool(val["valido"])), fecha)
+                )
+                componente_id = cursor.lastrowid
+
+                detalle = validation_sections(val)
+                self.conn.executemany(
+                    "INSERT INTO secciones (archivo_id, componente_id, seccion, seccion_normalizada, "
+                    "encontrada, fecha_validacion) VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (archivo_id, componente_id, seccion, normalize_text(seccion), int(bool(encontrada)), fecha)
+                        for seccion, encontrada in detalle.items()
+                    ]
+                )
+
+        return archivo_id
+
+    def import_json_files(self, paths: List[str]) -> int:
+        """Importa reportes JSON existentes al historial"""
+        imported = 0
+        for path in paths:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    report = json.load(f)
+            except (OSError, ValueError) as e:
+                log_failure("importacion_historial", e, archivo=path)
+                continue
+            if self.save_report(report) is not None:
+                imported += 1
+        return imported
+
+    def failed_section(self, seccion: str, desde: Optional[str] = None,
+                       hasta: Optional[str] = None) -> List[sqlite3.Row]:
+        """Expedientes en los que no se encontró una sección en el rango de fechas"""
+        query = (
+            "SELECT a.expediente, a.archivo, a.fecha_validacion, a.estado, c.componente "
+            "FROM secciones s "
+            "JOIN archivos a ON a.id = s.archivo_id "
+            "JOIN componentes c ON c.id = s.componente_id "
+            "WHERE s.seccion_normalizada = ? AND s.encontrada = 0"
+        )
+        params = [normalize_text(seccion)]
+        query, params = self._date_range(query, params, "s", desde, hasta)
+        query += " ORDER BY a.fecha_validacion DESC"
+        return self.conn.execute(query, params).fetchall()
+
+    def component_results(self, componente: str, observados: bool = False,
+                          desde: Optional[str] = None, hasta: Optional[str] = None) -> List[sqlite3.Row]:
+        """Resultados de un componente en el rango de fechas"""
+        query = (
+            "SELECT a.expediente, a.archivo, a.fecha_validacion, c.valido "
+            "FROM componentes c JOIN archivos a ON a.id = c.archivo_id "
+            "WHERE c.componente = ?"
+        )
+        params = [componente]
+        if observados:
+            query += " AND c.valido = 0"
+        query, params = self._date_range(query, params, "c", desde, hasta)
+        query += " ORDER BY a.fecha_validacion DESC"
+        return self.conn.execute(query, params).fetchall()
+
+    def summary(self, desde: Optional[str] = None, hasta: Optional[str] = None) -> List[sqlite3.Row]:
+        """Tasa de observación por componente"""
+        query = (
+            "SELECT c.componente, COUNT(*) AS total, SUM(c.valido = 0) AS observados "
+            "FROM componentes c WHERE 1 = 1"
+        )
+        query, params = self._date_range(query, [], "c", desde, hasta)
+        query += " GROUP BY c.componente ORDER BY observados DESC"
+        return self.conn.execute(query, params).fetchall()
+
+    @staticmethod
+    def _date_range(query: str, params: List, alias: str,
+                    desde: Optional[str], hasta: Optional[str]):
+        """Agrega filtro de fechas (ISO) a una consulta"""
+        if desde:
+            query += f" AND {alias}.fecha_validacion >= ?"
+            params.append(desde)
+        if hasta:
+            query += f" AND {alias}.fecha_validacion < ?"
+            params.append(hasta)
+        return query, params
+
+
+def _month_range(mes: str):
+    """Convierte 'AAAA-MM' en el rango [inicio, fin) en formato ISO"""
+    inicio = datetime.strptime(mes, "%Y-%m")
+    if inicio.month == 12:
+        fin = inicio.replace(year=inicio.year + 1, month=1)
+    else:
+        fin = inicio.replace(month=inicio.month + 1)
+    return inicio.isoformat(), fin.isoformat()
+
+
+def _resolve_dates(args):
+    """Obtiene el rango de fechas a partir de --mes o --desde/--hasta"""
+    if args.mes:
+        return _month_range(args.mes)
+    return args.desde, args.hasta
+
+
+def _add_date_arguments(parser):
+    parser.add_argument("--mes", help="Mes a consultar (AAAA-MM)")
+    parser.add_argument("--desde", help="Fecha inicial ISO (inclusive)")
+    parser.add_argument("--hasta", help="Fecha final ISO (exclusiva)")
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Historial de validaciones del RPA")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Ruta de la base de datos")
+    parser.add_argument("--logs", default=DEFAULT_LOG_DIR,
+                        help="Carpeta de eventos estructurados (JSON Lines)")
+    parser.add_argument("--sin-logs", action="store_true", help="No registrar eventos en archivo")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_importar = sub.add_parser("importar", help="Importa reportes JSON existentes")
+    p_importar.add_argument("reportes", nargs="+")
+
+    p_fallos = sub.add_parser("fallos", help="Expedientes sin una sección")
+    p_fallos.add_argument("--seccion", required=True)
+    _add_date_arguments(p_fallos)
+
+    p_comp = sub.add_parser("componentes", help="Resultados de un componente")
+    p_comp.add_argument("--componente", required=True)
+    p_comp.add_argument("--observados", action="store_true", help="Solo componentes observados")
+    _add_date_arguments(p_comp)
+
+    p_resumen = sub.add_parser("resumen", help="Tasa de observación por componente")
+    _add_date_arguments(p_resumen)
+
+    args = parser.parse_args()
+
+    configure_logging(None if args.sin_logs else args.logs)
+
+    with ResultsStore(args.db) as store:
+        if args.comando == "importar":
+            imported = store.import_json_files(args.reportes)
+            print(f"✓ Reportes importados: {imported}/{len(args.reportes)}")
+            return
+
+        desde, hasta = _resolve_dates(args)
+
+        if args.comando == "fallos":
+            rows = store.failed_section(args.seccion, desde, hasta)
+            for row in rows:
+                print(f"{row['fecha_validacion']}  {row['expediente']}  [{row['componente']}]  {row['estado']}")
+            print(f"\nTotal: {len(rows)}")
+        elif args.comando == "componentes":
+            rows = store.component_results(args.componente, args.observados, desde, hasta)
+            for row in rows:
+                estado = "✓ VÁLIDO" if row['valido'] else "✗ OBSERVADO"
+                print(f"{row['fecha_validacion']}  {row['expediente']}  {estado}")
+            print(f"\nTotal: {len(rows)}")
+        elif args.comando == "resumen":
+            for row in store.summary(desde, hasta):
+                print(f"{row['observados']:>6}/{row['total']:<6} {row['componente']}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(1)
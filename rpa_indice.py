@@ -0,0 +1,63 @@
+"""
+Índice de líneas de título
+Conserva los saltos de línea del texto extraído y separa las líneas candidatas
+a título (cortas, con numeración o letra inicial, o en mayúsculas). La búsqueda
+de secciones se hace primero sobre ese conjunto reducido y solo recurre al
+cuerpo completo cuando el título no aparece en él.
+"""
+
+
+import re
+from typing import List
+
+from rpa_texto import normalize_text
+
+
+DEFAULT_MAX_LENGTH = 120
+
+# Numeración al inicio de la línea: '1.', '2.3', '10)', 'A.', 'b)', 'IV.'
+_NUMBERED = re.compile(r'^\s*(?:\d+(?:\.\d+)*[\.\)]?|[A-Za-z][\.\)]|[IVXLC]+[\.\)])\s*\S')
+
+
+def is_heading_line(line: str, max_length: int = DEFAULT_MAX_LENGTH) -> bool:
+    """Indica si una línea del texto extraído puede ser un título"""
+    stripped = line.strip()
+    if len(stripped) < 3 or len(stripped) > max_length:
+        return False
+    if _NUMBERED.match(stripped):
+        return True
+    letters = [c for c in stripped if c.isalpha()]
+    if len(letters) < 3:
+        return False
+    upper = sum(1 for c in letters if c.isupper())
+    # Mayúsculas sostenidas (se toleran conectores en minúscula)
+    return upper >= 0.8 * len(letters)
+
+
+class HeadingIndex:
+    """Líneas candidatas a título de un documento, normalizadas
+
+    Las líneas candidatas consecutivas forman un bloque (títulos partidos en
+    varias líneas); los bloques se separan con saltos de línea en `text`.
+    """
+
+    def __init__(self, text: str, max_length: int = DEFAULT_MAX_LENGTH):
+        self.max_length = max_length
+        blocks: List[List[str]] = []
+        previous = False
+        total = 0
+        for line in text.split("\n"):
+            total += 1
+            heading = is_heading_line(line, max_length)
+            if heading:
+                if previous:
+                    blocks[-1].append(line)
+                else:
+                    blocks.append([line])
+            previous = heading
+        self.total_lines = total
+        self.heading_lines = sum(len(block) for block in blocks)
+        self.text = "\n".join(normalize_text(" ".join(block)) for block in blocks)
+
+    def __len__(self):
+        return self.heading_lines
@@ -0,0 +1,73 @@
+"""
+Salida JSON Lines para lotes de validación
+Una línea compacta por documento validado, con rotación por tamaño
+y compresión opcional de los segmentos rotados
+"""
+
+
+import gzip
+import json
+import os
+import shutil
+from datetime import datetime
+from typing import Dict, Optional
+
+
+class JsonlSink:
+    """Escritor incremental de reportes en formato JSON Lines"""
+
+    def __init__(self, output_path: str, max_bytes: Optional[int] = None, compress: bool = False):
+        self.output_path = output_path
+        self.max_bytes = max_bytes
+        self.compress = compress
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = None
+        self._open()
+
+    def _open(self):
+        """Abre el archivo activo en modo append"""
+        self._file = open(self.output_path, 'a', encoding='utf-8')
+
+    def write(self, report: Dict):
+        """Agrega un reporte como una línea y la vuelca a disco"""
+        line = json.dumps(report, ensure_ascii=False, separators=(",", ":")) + "\n"
+        if self.max_bytes and self._file.tell() > 0 and self._file.tell() + len(line.encode('utf-8')) > self.max_bytes:
+            self.rotate()
+        self._file.write(line)
+        self._file.flush()
+
+    def rotate(self):
+        """Cierra el archivo activo, lo renombra con marca de tiempo y abre uno nuevo"""
+        self._file.close()
+        base, ext = os.path.splitext(self.output_path)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        rotated = f"{base}-{stamp}{ext}"
+        os.replace(self.output_path, rotated)
+        if self.compress:
+            with open(rotated, 'rb') as src, gzip.open(rotated + ".gz", 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(rotated)
+        self._open()
+
+    def close(self):
+        """Cierra el archivo activo"""
+        if self._file and not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_jsonl(path: str):
+    """Itera los reportes de un archivo JSON Lines (plano o .gz)"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
@@ -0,0 +1,836 @@
+"""
+Validación por lotes del Entregable 1
+Valida todos los PDFs de una carpeta y agrega los resultados a un único
+archivo JSON Lines, con reportes individuales opcionales
+
+Uso:
+  python rpa_lote.py input/ --jsonl output/reportes.jsonl
+  python rpa_lote.py input/ --formatos json,txt,pdf --procesos 4
+  python rpa_lote.py input/ --solo-jsonl --jsonl output/reportes.jsonl --resumen output/resumen_lote
+  python rpa_lote.py input/ --vigilar 10 --revalidar --jsonl output/reportes.jsonl
+  python rpa_lote.py input/ --etapas --procesos 4 --cola 2 --jsonl output/reportes.jsonl
+  python rpa_lote.py input/ --tiempo-pagina 30 --tiempo-documento 300 --jsonl output/reportes.jsonl
+  python rpa_lote.py input/ --procesos 8 --parte-minima 100 --costo-pagina 0.02 --jsonl output/reportes.jsonl
+  python rpa_lote.py input/ --coordinar output/coordinacion --jsonl output/reportes.jsonl   (en cada nodo)
+  python rpa_lote.py input/ --perfilar 50 --jsonl output/reportes.jsonl   (perfiles en logs/perfilado)
+  python rpa_lote.py input/ --vigilar 10 --reciclar-documentos 200 --memoria-maxima 1500 --jsonl output/reportes.jsonl
+"""
+
+
+import argparse
+import asyncio
+import glob
+import os
+import signal
+import socket
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from rpa_coordinacion import LeaseCoordinator, default_node_id
+from rpa_compartido import SharedDocument, SharedDocumentHandle, SharedSegments, publish_document
+from rpa_costo_reglas import RuleCostRecorder, format_table
+from rpa_documento import Document
+from rpa_etapas import Stage, StagedPipeline
+from rpa_extraccion import ExtractionBudget, ExtractionCache, extract_pdf
+from rpa_general import EntregableValidator
+from rpa_historial import ResultsStore, DEFAULT_DB_PATH
+from rpa_jsonl import JsonlSink
+from rpa_memoria import rss_bytes, track_allocations
+from rpa_metricas import METRICS
+from rpa_perfilado import ENV_VAR, DocumentSampler, interval_from_env, run_profiled
+from rpa_planificador import CostModel, CostReport, Job, estimate_pdf, plan_jobs
+from rpa_registro import (
+    DEFAULT_LOG_DIR, configure_logging, console, correlation, log_event, log_failure, new_correlation_id, phase
+)
+from rpa_reglas import RuleWatcher, bundled_rules
+from rpa_resumen_lote import BatchSummary
+from rpa_supervisor import Supervisor, TaskTimeout
+
+
+FORMATOS_VALIDOS = ("json", "txt", "pdf")
+
+# Validador del proceso trabajador, reutilizado entre documentos
+_worker_validator: Optional[EntregableValidator] = None
+
+# Con --costo-reglas cada trabajador mide el costo de los títulos
+_worker_rule_costs = False
+
+
+@dataclass(frozen=True)
+class RecyclePolicy:
+    """Cuándo se recicla un trabajador tras un documento (None: sin límite)"""
+    memoria_mb: Optional[float] = None
+    documentos: Optional[int] = None
+    mb_procesados: Optional[float] = None
+    
+    @property
+    def active(self) -> bool:
+        return bool(self.memoria_mb or self.documentos or self.mb_procesados)
+    
+    def reason(self, documents: int, processed_bytes: int) -> Optional[str]:
+        """Motivo para reciclar un trabajador con ese historial, o None"""
+        if self.memoria_mb:
+            rss_mb = rss_bytes() / 1_048_576
+            if rss_mb > self.memoria_mb:
+                return f"memoria residente {rss_mb:.0f} MB sobre el techo de {self.memoria_mb:g} MB"
+        if self.documentos and documents >= self.documentos:
+            return f"{documents} documento(s) procesado(s)"
+        if self.mb_procesados and processed_bytes >= self.mb_procesados * 1_048_576:
+            return f"{processed_bytes / 1_048_576:.0f} MB de PDFs procesados"
+        return None
+
+
+# Política de reciclaje del trabajador y lo que lleva procesado
+_worker_recycle = RecyclePolicy()
+_worker_documents = 0
+_worker_bytes = 0
+
+
+def collect_pdfs(paths: List[str], report_missing: bool = True) -> List[str]:
+    """Obtiene la lista de PDFs a partir de archivos y carpetas"""
+    pdfs = []
+    for path in paths:
+        if os.path.isdir(path):
+            pdfs.extend(sorted(glob.glob(os.path.join(path, "*.pdf"))))
+        elif os.path.isfile(path):
+            pdfs.append(path)
+        elif report_missing:
+            console.info(f"✗ Error: El archivo '{path}' no existe")
+    return pdfs
+
+
+def worker_validator(rules_path: Optional[str] = None,
+                     budget: Optional[ExtractionBudget] = None) -> EntregableValidator:
+    """Validador del proceso actual
+    
+    Se crea una vez por trabajador: revisa el archivo de reglas antes de cada
+    documento y conserva la caché de extracción aunque las reglas cambien.
+    """
+    global _worker_validator
+    if _worker_validator is None:
+        _worker_validator = EntregableValidator(rules_path, watch_rules=True, extraction_cache=ExtractionCache(),
+                                                extraction_budget=budget,
+                                                rule_costs=RuleCostRecorder() if _worker_rule_costs else None)
+        # Revisar en cada documento: un stat es despreciable frente a la extracción
+        _worker_validator.rule_watcher.check_interval = 0
+    return _worker_validator
+
+
+def validate_file(pdf_path: str, rules_path: Optional[str] = None,
+                  budget: Optional[ExtractionBudget] = None) -> Tuple[Dict, Dict]:
+    """Valida un PDF (se ejecuta en el proceso trabajador)
+    
+    Devuelve el reporte y las métricas acumuladas por el trabajador desde
+    el documento anterior, para que el proceso principal las combine.
+    """
+    _count_document(pdf_path)
+    report = worker_validator(rules_path, budget).validate_entregable1(pdf_path)
+    if report.get("status") == "ERROR":
+        report["metadata"] = {"archivo": pdf_path}
+    return report, METRICS.drain()
+
+
+def extract_file(pdf_path: str, segment_name: str, rules_path: Optional[str], correlation_id: str,
+                 budget: Optional[ExtractionBudget] = None) -> Tuple[SharedDocumentHandle, Dict]:
+    """Extrae y normaliza un PDF y lo publica en memoria compartida (etapa de extracción)"""
+    _count_document(pdf_path)
+    with correlation(correlation_id):
+        validator = worker_validator(rules_path, budget)
+        document = Document.from_pdf(pdf_path, validator.extraction_cache, validator.extraction_budget)
+        handle = publish_document(document, segment_name)
+    return handle, METRICS.drain()
+
+
+def validate_shared(handle: SharedDocumentHandle, rules_path: Optional[str],
+                    correlation_id: str) -> Tuple[Dict, Dict]:
+    """Valida un documento publicado por la etapa de extracción (etapa de validación)"""
+    with correlation(correlation_id), SharedDocument(handle) as shared:
+        report = worker_validator(rules_path).validate_document(shared.document())
+    if report.get("status") == "ERROR":
+        report["metadata"] = {"archivo": handle.path}
+    return report, METRICS.drain()
+
+
+def extract_part(pdf_path: str, first: int, last: int, correlation_id: str,
+                 budget: Optional[ExtractionBudget] = None
+                 ) -> Tuple[str, Tuple[int, ...], Tuple[int, ...], Tuple[int, ...], Dict]:
+    """Extrae un rango de páginas de un PDF dividido (se ejecuta en el proceso trabajador)
+    
+    Devuelve el texto, los fines de página relativos al rango, las páginas
+    que agotaron su tiempo, las que no tienen capa de texto y las métricas
+    del trabajador.
+    """
+    _count_document(pdf_path)
+    with correlation(correlation_id), phase("extraccion_parte", archivo=pdf_path, desde=first, hasta=last) as info:
+        image_pages = []
+        try:
+            text, page_ends = extract_pdf(pdf_path, budget, first, last, image_pages)
+        except Exception as e:
+            log_failure("extraccion", e, archivo=pdf_path)
+            text, page_ends = "", ()
+        timed_out = tuple(budget.timed_out_pages) if budget else ()
+        info["paginas"] = len(page_ends)
+        info["caracteres"] = len(text)
+        if image_pages:
+            info["paginas_solo_imagen"] = len(image_pages)
+    return text, page_ends, timed_out, tuple(image_pages), METRICS.drain()
+
+
+def validate_parts(pdf_path: str, parts: List[Tuple[str, Tuple[int, ...], Tuple[int, ...], Tuple[int, ...]]],
+                   rules_path: Optional[str], correlation_id: str) -> Tuple[Dict, Dict]:
+    """Une las partes extraídas de un PDF dividido, en orden, y lo valida"""
+    texts, page_ends, timed_out, image_pages = [], [], [], []
+    offset = 0
+    for text, ends, part_timed_out, part_image_pages in parts:
+        texts.append(text)
+        page_ends.extend(offset + end for end in ends)
+        timed_out.extend(part_timed_out)
+        image_pages.extend(part_image_pages)
+        offset += len(text)
+    document = Document(pdf_path, "".join(texts), tuple(page_ends), timed_out_pages=tuple(timed_out),
+                        image_pages=tuple(image_pages))
+    with correlation(correlation_id):
+        report = worker_validator(rules_path).validate_document(document)
+    if report.get("status") == "ERROR":
+        report["metadata"] = {"archivo": pdf_path}
+    return report, METRICS.drain()
+
+
+def _timed(func: Callable, *args):
+    """Ejecuta func en el trabajador y devuelve (segundos, resultado)"""
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def export_individual(report: Dict, output_dir: str, formatos: List[str], validator: EntregableValidator):
+    """Exporta los reportes individuales solicitados con el validador exportador del lote"""
+    if not formatos:
+        return
+    base_name = os.path.splitext(os.path.basename(report["metadata"]["archivo"]))[0]
+    base_path = os.path.join(output_dir, f"reporte_{base_name}")
+    with correlation(report["metadata"].get("id_correlacion")):
+        if "json" in formatos:
+            _export_atomic(validator.export_report, report, base_path + ".json")
+        if "txt" in formatos:
+            _export_atomic(validator.export_report_txt, report, base_path + ".txt")
+        if "pdf" in formatos:
+            _export_atomic(validator.export_report_pdf, report, base_path + ".pdf")
+
+
+def _export_atomic(export: Callable[[Dict, str], bool], report: Dict, output_path: str):
+    # Quien lea la carpeta (otro nodo, otro proceso) nunca ve un reporte a medio escribir
+    tmp_path = f"{output_path}.{socket.gethostname()}.{os.getpid()}.tmp"
+    if export(report, tmp_path):
+        os.replace(tmp_path, output_path)
+    elif os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+
+class BatchOutputs:
+    """Destinos de los resultados del lote (JSON Lines, historial, resumen y reportes)"""
+    
+    def __init__(self, args):
+        self.args = args
+        self.formatos = [f for f in args.formatos.split(",") if f] if args.formatos else []
+        max_bytes = int(args.max_mb * 1024 * 1024) if args.max_mb else None
+        os.makedirs(args.salida, exist_ok=True)
+        
+        self.sink = JsonlSink(args.jsonl, max_bytes=max_bytes, compress=args.comprimir) if args.jsonl else None
+        self.store = None if args.sin_historial else ResultsStore(args.historial)
+        self.summary = BatchSummary(csv_prefix=args.resumen) if args.resumen else None
+        self.rule_costs = RuleCostRecorder() if args.costo_reglas else None
+        # Un solo validador exporta los reportes de todo el lote: cargar las reglas por reporte no escala
+        self.exporter = EntregableValidator(args.reglas) if self.formatos else None
+        self.stats = {"validados": 0, "errores": 0}
+    
+    def add(self, report: Dict, worker_metrics: Dict):
+        """Escribe el resultado de un documento en todos los destinos"""
+        METRICS.merge(worker_metrics)
+        if self.sink:
+            self.sink.write(report)
+        if self.summary:
+            self.summary.add(report)
+        if report.get("status") == "ERROR":
+            self.stats["errores"] += 1
+            return
+        self.stats["validados"] += 1
+        if self.rule_costs and "costo_reglas" in report.get("metadata", {}):
+            self.rule_costs.merge(report["metadata"]["costo_reglas"])
+        export_individual(report, self.args.salida, self.formatos, self.exporter)
+        if self.store:
+            self.store.save_report(report)
+        if self.args.metricas_archivo:
+            METRICS.write_textfile(self.args.metricas_archivo)
+    
+    def close(self):
+        """Cierra los archivos y genera el resumen consolidado"""
+        if self.sink:
+            self.sink.close()
+        if self.store:
+            self.store.close()
+        if self.summary:
+            self.summary.close()
+            self.summary.export_pdf(f"{self.args.resumen}.pdf")
+        if self.rule_costs and self.rule_costs.costs:
+            costs = self.stats["costo_reglas"] = self.rule_costs.summary()
+            log_event("costo_reglas_lote", **{k: v for k, v in costs.items() if k != "por_titulo"},
+                      mas_costosos=[row["titulo"] for row in costs["por_titulo"][:10]])
+
+
+def _init_worker(log_dir: Optional[str], console_enabled: bool, rule_costs: bool = False,
+                 recycle: RecyclePolicy = RecyclePolicy(), allocations: bool = False):
+    global _worker_rule_costs, _worker_recycle
+    _worker_rule_costs = rule_costs
+    _worker_recycle = recycle
+    if allocations:
+        track_allocations()
+    # Las señales de parada las atiende el proceso principal, que deja
+    # terminar los documentos en curso
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    configure_logging(log_dir, console_enabled)
+
+
+def _recycle_policy(args) -> RecyclePolicy:
+    return RecyclePolicy(args.memoria_maxima, args.reciclar_documentos, args.reciclar_mb)
+
+
+def _worker_initargs(args) -> Tuple:
+    return (None if args.sin_logs else args.logs, args.verbose, args.costo_reglas,
+            _recycle_policy(args), args.memoria_asignaciones)
+
+
+def _count_document(pdf_path: str):
+    global _worker_documents, _worker_bytes
+    _worker_documents += 1
+    try:
+        _worker_bytes += os.path.getsize(pdf_path)
+    except OSError:
+        pass
+
+
+def _worker_retire() -> Optional[str]:
+    """Motivo para reciclar el trabajador tras un documento (None: sigue)"""
+    return _worker_recycle.reason(_worker_documents, _worker_bytes)
+
+
+def _supervisor(args) -> Supervisor:
+    """Supervisor de trabajadores con plazo por documento y reciclaje"""
+    retire = _worker_retire if _recycle_policy(args).active else None
+    return Supervisor(args.procesos, _deadline(args), _init_worker, _worker_initargs(args), retire)
+
+
+def _budget(args) -> ExtractionBudget:
+    return ExtractionBudget(args.tiempo_pagina or None, args.tiempo_documento or None)
+
+
+def _deadline(args) -> Optional[float]:
+    """Plazo duro por documento: el doble del presupuesto de extracción
+    
+    El presupuesto corta las páginas lentas dentro del trabajador; el plazo
+    solo actúa si el trabajador no responde (bloqueo en código nativo).
+    """
+    return 2 * args.tiempo_documento if args.tiempo_documento else None
+
+
+def _sampled_call(sampler: DocumentSampler, args, pdf_path: str, func: Callable, *func_args) -> Tuple:
+    """(función, argumentos) de la tarea de un documento, perfilada si el documento sale en la muestra"""
+    if sampler(pdf_path):
+        return (run_profiled, pdf_path, args.logs, func) + func_args
+    return (func,) + func_args
+
+
+def _cost_model(args) -> CostModel:
+    return CostModel(pagina_s=args.costo_pagina, mb_s=args.costo_mb)
+
+
+def _blocked_report(estimate) -> Dict:
+    """Reporte de un PDF que el triaje descarta sin ocupar un trabajador"""
+    message = ("PDF cifrado con contraseña: no se puede extraer texto" if "cifrado" in estimate.flags
+               else "No se pudo extraer texto del PDF")
+    return {"status": "ERROR", "message": message, "metadata": {"archivo": estimate.path, "triaje": list(estimate.flags)}}
+
+
+def _failure_report(pdf_path: str, error: BaseException) -> Dict:
+    """Reporte de un documento cuyo trabajador venció el plazo o cayó"""
+    message = (f"Tiempo máximo por documento agotado ({error})" if isinstance(error, TaskTimeout)
+               else f"El trabajador falló al procesar el documento ({type(error).__name__}: {error})")
+    return {"status": "ERROR", "message": message, "metadata": {"archivo": pdf_path}}
+
+
+@dataclass
+class _SplitProgress:
+    """Partes ya extraídas de un documento dividido"""
+    correlation_id: str
+    parts: Dict[int, Tuple[str, Tuple[int, ...], Tuple[int, ...], Tuple[int, ...]]] = field(default_factory=dict)
+    finished: int = 0
+    real_s: float = 0.0
+    error: Optional[BaseException] = None
+
+
+def run_batch(pdfs: List[str], args) -> Dict[str, int]:
+    """Valida los PDFs y escribe cada resultado en cuanto termina
+    
+    Los documentos que el triaje descarta (vacíos, ilegibles, cifrados) se
+    informan sin ocupar un trabajador. Los demás se envían de mayor a menor
+    costo estimado y los que
+    superan la carga ideal de un trabajador se extraen por rangos de
+    páginas en paralelo; cada reporte lleva su costo estimado y real. Un
+    documento que supera el plazo duro o que tumba a su trabajador se
+    informa como error y el trabajador se reemplaza; el resto del lote
+    continúa.
+    """
+    outputs = BatchOutputs(args)
+    budget = _budget(args)
+    costs = CostReport(_cost_model(args))
+    sampler = DocumentSampler(args.perfilar)
+    
+    def finish(job: Job, report: Dict, worker_metrics: Dict, real_s: Optional[float]):
+        if real_s is not None:
+            report.setdefault("metadata", {"archivo": job.path})["costo"] = costs.add(job.estimate, real_s, job.parts)
+        outputs.add(report, worker_metrics)
+    
+    try:
+        with _supervisor(args) as supervisor:
+            estimates = [estimate_pdf(pdf, costs.model) for pdf in pdfs]
+            jobs = plan_jobs(estimates, supervisor.workers, args.parte_minima)
+            split: Dict[str, _SplitProgress] = {}
+            tasks = []
+            for job in jobs:
+                if job.parts == 1:
+                    tasks.append((("documento", job), _timed,
+                                  _sampled_call(sampler, args, job.path, validate_file, job.path, args.reglas, budget)))
+                    continue
+                progress = split.setdefault(job.path, _SplitProgress(new_correlation_id()))
+                tasks.append((("parte", job), _timed,
+                              _sampled_call(sampler, args, job.path, extract_part, job.path, job.first, job.last,
+                                            progress.correlation_id, budget)))
+            flags = Counter(flag for e in estimates for flag in e.flags)
+            log_event("plan_lote", documentos=len(estimates), trabajos=len(jobs), divididos=len(split),
+                      estimado_s=round(sum(e.cost for e in estimates), 3), banderas=dict(flags))
+            for estimate in estimates:
+                if estimate.blocked:
+                    METRICS.inc("rpa_documentos_procesados_total", estado="ERROR")
+                    outputs.add(_blocked_report(estimate), {})
+            
+            for (kind, job), result, error in supervisor.run(tasks):
+                if kind != "parte":
+                    progress = split.get(job.path) if kind == "union" else None
+                    if error is not None:
+                        finish(job, _failure_report(job.path, error), {}, None)
+                        continue
+                    elapsed, (report, worker_metrics) = result
+                    finish(job, report, worker_metrics, elapsed + (progress.real_s if progress else 0.0))
+                    continue
+                
+                progress = split[job.path]
+                progress.finished += 1
+                if error is not None:
+                    progress.error = error
+                else:
+                    elapsed, (text, page_ends, timed_out, image_pages, worker_metrics) = result
+                    METRICS.merge(worker_metrics)
+                    progress.real_s += elapsed
+                    progress.parts[job.first] = (text, page_ends, timed_out, image_pages)
+                if progress.finished < job.parts:
+                    continue
+                if progress.error is not None:
+                    finish(job, _failure_report(job.path, progress.error), {}, None)
+                    continue
+                # La unión está en el camino crítico del documento: pasa delante
+                parts = [progress.parts[first] for first in sorted(progress.parts)]
+                progress.parts.clear()
+                supervisor.add(("union", job), _timed,
+                               _sampled_call(sampler, args, job.path, validate_parts, job.path, parts, args.reglas,
+                                             progress.correlation_id), first=True)
+    finally:
+        outputs.stats["costo"] = costs.close()
+        outputs.close()
+    return outputs.stats
+
+
+def _largest_first(pdfs: List[str]) -> List[str]:
+    return sorted(pdfs, key=lambda pdf: (_file_key(pdf) or (0, 0))[1], reverse=True)
+
+
+def run_coordinated(args) -> Dict[str, int]:
+    """Valida las entradas junto con los demás nodos que usan el mismo --coordinar
+    
+    Cada trabajador libre toma un PDF por arrendamiento (los más grandes
+    primero); el nodo termina cuando todos los PDFs tienen su marca de hecho,
+    esperando mientras queden PDFs tomados por otros nodos por si alguno cae.
+    """
+    outputs = BatchOutputs(args)
+    budget = _budget(args)
+    sampler = DocumentSampler(args.perfilar)
+    
+    def task(pdf: str, key: str):
+        func, *func_args = _sampled_call(sampler, args, pdf, validate_file, pdf, args.reglas, budget)
+        return (pdf, key), func, tuple(func_args)
+    
+    try:
+        with LeaseCoordinator(args.coordinar, args.nodo, args.arrendamiento) as coordinator, \
+                _supervisor(args) as supervisor:
+            log_event("nodo", nodo=coordinator.node, estado=args.coordinar, arrendamiento_s=coordinator.ttl)
+            while True:
+                pdfs = _largest_first(collect_pdfs(args.entradas, report_missing=False))
+                claimed = coordinator.claim(pdfs, supervisor.workers)
+                if not claimed:
+                    if not coordinator.pending(pdfs):
+                        break
+                    time.sleep(coordinator.poll_interval)
+                    continue
+                for (pdf, key), result, error in supervisor.run(task(*item) for item in claimed):
+                    if error is not None:
+                        # Un PDF que tumba al trabajador queda hecho con error: si el
+                        # arrendamiento siguiera tomado, cada nodo caería con él
+                        report, worker_metrics = _failure_report(pdf, error), {}
+                    else:
+                        report, worker_metrics = result
+                    outputs.add(report, worker_metrics)
+                    coordinator.complete(key, pdf, report.get("metadata", {}).get("estado", report.get("status")))
+                    # El trabajador que quedó libre toma el siguiente PDF
+                    for item in coordinator.claim(pdfs, 1):
+                        supervisor.add(*task(*item))
+    finally:
+        outputs.close()
+    return outputs.stats
+
+
+def _node_path(path: Optional[str], node: str) -> Optional[str]:
+    """Ruta propia del nodo: output/reportes.jsonl -> output/reportes.<nodo>.jsonl"""
+    if not path:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{node}{ext}"
+
+
+def _by_cost(pdfs: List[str], model: CostModel) -> List[str]:
+    estimates = (estimate_pdf(pdf, model) for pdf in pdfs)
+    return [e.path for e in sorted(estimates, key=lambda e: e.cost, reverse=True)]
+
+
+def run_staged(pdfs: List[str], args) -> Dict[str, int]:
+    """Valida los PDFs por etapas: extracción, validación, reportes y consola
+    
+    Cada etapa corre de forma concurrente con las demás, conectada por colas
+    de tamaño --cola. El texto pasa de la extracción a la validación por
+    memoria compartida; los segmentos vivos nunca superan la concurrencia de
+    ambas etapas más el tamaño de la cola, y los que queden (trabajador
+    caído, interrupción) se eliminan al cerrar el lote. Extracción y
+    validación corren bajo el supervisor, con el mismo plazo por documento,
+    reintento aislado y reciclaje que el lote normal.
+    """
+    return asyncio.run(_run_staged(pdfs, args))
+
+
+async def _run_staged(pdfs: List[str], args) -> Dict[str, int]:
+    loop = asyncio.get_running_loop()
+    procesos = args.procesos or os.cpu_count() or 1
+    # Un solo hilo escribe los reportes: el historial SQLite no se comparte entre hilos
+    writer = ThreadPoolExecutor(max_workers=1)
+    outputs = await loop.run_in_executor(writer, BatchOutputs, args)
+    budget = _budget(args)
+    sampler = DocumentSampler(args.perfilar)
+    # De mayor a menor costo estimado, para no dejar un documento grande al final;
+    # la estimación lee cada PDF y no debe bloquear el bucle de eventos
+    pdfs = await loop.run_in_executor(None, _by_cost, pdfs, _cost_model(args))
+    
+    with SharedSegments() as segments, _supervisor(args) as supervisor:
+        async def call(key, func, *func_args):
+            return await asyncio.wrap_future(supervisor.submit(key, func, func_args))
+        
+        # Un documento que falla (plazo, trabajador caído, error al extraer) sigue
+        # como reporte de error; solo un fallo de la escritura detiene el lote
+        async def extract(pdf):
+            name, correlation_id = segments.reserve(), new_correlation_id()
+            try:
+                handle, worker_metrics = await call(
+                    pdf, *_sampled_call(sampler, args, pdf, extract_file, pdf, name, args.reglas,
+                                        correlation_id, budget)
+                )
+            except Exception as e:
+                segments.release(name)
+                return _failure_report(pdf, e)
+            except BaseException:
+                segments.release(name)
+                raise
+            METRICS.merge(worker_metrics)
+            return handle, name, correlation_id
+        
+        async def validate(item):
+            if isinstance(item, dict):
+                return item, {}
+            handle, name, correlation_id = item
+            try:
+                return await call(
+                    handle.path, *_sampled_call(sampler, args, handle.path, validate_shared, handle, args.reglas,
+                                                correlation_id)
+                )
+            except Exception as e:
+                return _failure_report(handle.path, e), {}
+            finally:
+                segments.release(name)
+        
+        async def write(item):
+            await loop.run_in_executor(writer, outputs.add, *item)
+            return item[0]
+        
+        async def show(report):
+            estado = report.get("metadata", {}).get("estado", report.get("status"))
+            console.info(f"  {estado:<10} {report.get('metadata', {}).get('archivo', '')}")
+        
+        pipeline = StagedPipeline([
+            Stage("extraccion", extract, procesos),
+            Stage("validacion", validate, procesos),
+            Stage("reportes", write),
+            Stage("consola", show),
+        ], queue_size=args.cola)
+        try:
+            await pipeline.run(pdfs)
+        finally:
+            await loop.run_in_executor(writer, outputs.close)
+            writer.shutdown()
+    return outputs.stats
+
+
+def _file_key(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _stop(signum, frame):
+    raise KeyboardInterrupt
+
+
+def watch_batch(args) -> Dict[str, int]:
+    """Vigila las entradas y valida los PDFs nuevos o modificados hasta Ctrl+C
+    
+    Un PDF se envía cuando su fecha y tamaño no cambiaron entre dos revisiones
+    (copia terminada). Los trabajadores recargan las reglas por su cuenta; con
+    --revalidar, un cambio de reglas vuelve a encolar los PDFs ya validados.
+    
+    Los documentos corren bajo el supervisor, como en el lote: uno que supera
+    el plazo duro o que tumba a su trabajador se informa como error y el
+    trabajador se reemplaza sin detener la vigilancia. Con una política de
+    reciclaje, el grupo de trabajadores se reemplaza cuando uno la cumple.
+    """
+    signal.signal(signal.SIGTERM, _stop)
+    rules = RuleWatcher(args.reglas or bundled_rules("entregable1"), check_interval=0)
+    outputs = BatchOutputs(args)
+    budget = _budget(args)
+    sampler = DocumentSampler(args.perfilar)
+    observed: Dict[str, Tuple[int, int]] = {}
+    validated: Dict[str, Tuple[int, int]] = {}
+    # Futuro -> PDF
+    pending: Dict[Future, str] = {}
+    
+    def finish(future):
+        pdf = pending.pop(future)
+        try:
+            report, worker_metrics = future.result()
+        except Exception as e:
+            report, worker_metrics = _failure_report(pdf, e), {}
+        outputs.add(report, worker_metrics)
+    
+    try:
+        with _supervisor(args) as supervisor:
+            try:
+                while True:
+                    version = rules.plan.version
+                    if rules.current().version != version and args.revalidar:
+                        console.info(f"Reglas actualizadas ({rules.plan.version}): se revalidan {len(validated)} PDFs")
+                        validated.clear()
+                    
+                    in_progress = set(pending.values())
+                    for pdf in collect_pdfs(args.entradas, report_missing=False):
+                        key = _file_key(pdf)
+                        previous, observed[pdf] = observed.get(pdf), key
+                        if key is None or key != previous or validated.get(pdf) == key or pdf in in_progress:
+                            continue
+                        validated[pdf] = key
+                        call = _sampled_call(sampler, args, pdf, validate_file, pdf, args.reglas, budget)
+                        pending[supervisor.submit(pdf, call[0], call[1:])] = pdf
+                        log_event("encolado", archivo=pdf)
+                    
+                    if not pending:
+                        time.sleep(args.vigilar)
+                        continue
+                    done, _ = wait(pending, timeout=args.vigilar, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finish(future)
+            except KeyboardInterrupt:
+                console.info("\nVigilancia detenida: terminando los documentos en curso...")
+                for future in [future for future in pending if future.cancel()]:
+                    del pending[future]
+                for future in as_completed(list(pending)):
+                    finish(future)
+    finally:
+        outputs.close()
+    return outputs.stats
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Validación por lotes del Entregable 1")
+    parser.add_argument("entradas", nargs="+", help="PDFs o carpetas con PDFs")
+    parser.add_argument("--reglas", help="Archivo de reglas (por defecto reglas/entregable1.json)")
+    parser.add_argument("--salida", default="output", help="Carpeta de reportes individuales")
+    parser.add_argument("--jsonl", help="Archivo JSON Lines donde agregar cada reporte")
+    parser.add_argument("--max-mb", type=float, help="Rotar el JSON Lines al superar este tamaño (MB)")
+    parser.add_argument("--comprimir", action="store_true", help="Comprimir con gzip los segmentos rotados")
+    parser.add_argument("--formatos", default=",".join(FORMATOS_VALIDOS),
+                        help="Reportes individuales a generar (json,txt,pdf); vacío para ninguno")
+    parser.add_argument("--solo-jsonl", action="store_true",
+                        help="Generar solo el JSON Lines, sin reportes individuales")
+    parser.add_argument("--resumen", help="Prefijo del resumen consolidado (PDF y CSV)")
+    parser.add_argument("--metricas-archivo",
+                        help="Archivo de métricas Prometheus (textfile collector), actualizado por documento")
+    parser.add_argument("--metricas-puerto", type=int,
+                        help="Servir métricas Prometheus en http://127.0.0.1:PUERTO/metrics")
+    parser.add_argument("--logs", default=DEFAULT_LOG_DIR,
+                        help="Carpeta de eventos estructurados (JSON Lines)")
+    parser.add_argument("--sin-logs", action="store_true", help="No registrar eventos en archivo")
+    parser.add_argument("--verbose", action="store_true",
+                        help="Mostrar en consola el detalle de cada documento")
+    parser.add_argument("--silencioso", action="store_true", help="Sin salida de consola")
+    parser.add_argument("--procesos", type=int, default=None, help="Número de procesos trabajadores")
+    parser.add_argument("--historial", default=DEFAULT_DB_PATH,
+                        help="Base de datos del historial de validaciones")
+    parser.add_argument("--sin-historial", action="store_true",
+                        help="No registrar los resultados en el historial")
+    parser.add_argument("--etapas", action="store_true",
+                        help="Extraer, validar y escribir reportes como etapas concurrentes, "
+                             "pasando el texto por memoria compartida")
+    parser.add_argument("--cola", type=int, default=2,
+                        help="Con --etapas, documentos en espera entre una etapa y la siguiente")
+    parser.add_argument("--tiempo-pagina", type=float, default=60, metavar="SEGUNDOS",
+                        help="Tiempo máximo de extracción por página; la página se omite y se informa (0: sin límite)")
+    parser.add_argument("--tiempo-documento", type=float, default=600, metavar="SEGUNDOS",
+                        help="Tiempo máximo de extracción por documento; el trabajador que supere el doble "
+                             "se reemplaza (0: sin límite)")
+    parser.add_argument("--parte-minima", type=int, default=50, metavar="PAGINAS",
+                        help="Páginas mínimas por parte al dividir un documento grande entre trabajadores "
+                             "(0: no dividir)")
+    parser.add_argument("--costo-pagina", type=float, default=CostModel.pagina_s, metavar="SEGUNDOS",
+                        help="Costo estimado por página para planificar el lote")
+    parser.add_argument("--costo-mb", type=float, default=CostModel.mb_s, metavar="SEGUNDOS",
+                        help="Costo estimado por MB del archivo para planificar el lote")
+    parser.add_argument("--coordinar", metavar="CARPETA",
+                        help="Repartir las entradas con otros nodos mediante arrendamientos en esta carpeta "
+                             "compartida")
+    parser.add_argument("--nodo", help="Con --coordinar, nombre de este nodo (por defecto host-proceso)")
+    parser.add_argument("--arrendamiento", type=float, default=120, metavar="SEGUNDOS",
+                        help="Con --coordinar, plazo sin renovar tras el cual otro nodo reclama un PDF")
+    parser.add_argument("--vigilar", type=float, metavar="SEGUNDOS",
+                        help="Quedar en ejecución revisando las entradas cada SEGUNDOS")
+    parser.add_argument("--revalidar", action="store_true",
+                        help="Con --vigilar, revalidar los PDFs ya procesados cuando cambien las reglas")
+    parser.add_argument("--memoria-maxima", type=float, metavar="MB",
+                        help="Reciclar los trabajadores cuya memoria residente supere este techo tras un documento")
+    parser.add_argument("--reciclar-documentos", type=int, metavar="N",
+                        help="Reciclar los trabajadores tras procesar N documentos cada uno")
+    parser.add_argument("--reciclar-mb", type=float, metavar="MB",
+                        help="Reciclar los trabajadores tras procesar PDFs que sumen estos MB")
+    parser.add_argument("--memoria-asignaciones", action="store_true",
+                        help="Registrar también el pico de memoria asignada por fase (tracemalloc; más lento)")
+    parser.add_argument("--costo-reglas", action="store_true",
+                        help="Medir el costo de cada título de las reglas (en cada reporte y al final del lote)")
+    parser.add_argument("--perfilar", type=int, default=interval_from_env(), metavar="N",
+                        help=f"Perfilar uno de cada N documentos en <logs>/perfilado (por defecto ${ENV_VAR})")
+    args = parser.parse_args()
+
+    configure_logging(None if args.sin_logs else args.logs, console_enabled=not args.silencioso)
+
+    if args.solo_jsonl:
+        if not args.jsonl:
+            parser.error("--solo-jsonl requiere --jsonl")
+        args.formatos = ""
+
+    invalid = [f for f in args.formatos.split(",") if f and f not in FORMATOS_VALIDOS]
+    if invalid:
+        parser.error(f"Formatos no válidos: {', '.join(invalid)}")
+
+    if args.revalidar and not args.vigilar:
+        parser.error("--revalidar requiere --vigilar")
+    if args.etapas and args.vigilar:
+        parser.error("--etapas no se puede combinar con --vigilar")
+    if args.cola < 1:
+        parser.error("--cola debe ser al menos 1")
+    if args.tiempo_pagina < 0 or args.tiempo_documento < 0:
+        parser.error("los tiempos máximos no pueden ser negativos")
+    if args.parte_minima < 0 or args.costo_pagina < 0 or args.costo_mb < 0:
+        parser.error("--parte-minima, --costo-pagina y --costo-mb no pueden ser negativos")
+    if args.coordinar and (args.vigilar or args.etapas):
+        parser.error("--coordinar no se puede combinar con --vigilar ni con --etapas")
+    if args.nodo and not args.coordinar:
+        parser.error("--nodo requiere --coordinar")
+    if args.memoria_maxima is not None and args.memoria_maxima <= 0:
+        parser.error("--memoria-maxima debe ser positivo")
+    if args.reciclar_documentos is not None and args.reciclar_documentos <= 0:
+        parser.error("--reciclar-documentos debe ser positivo")
+    if args.reciclar_mb is not None and args.reciclar_mb <= 0:
+        parser.error("--reciclar-mb debe ser positivo")
+    if args.etapas and _recycle_policy(args).active:
+        parser.error("--memoria-maxima, --reciclar-documentos y --reciclar-mb no se pueden combinar con --etapas")
+    if args.perfilar < 0:
+        parser.error("--perfilar no puede ser negativo")
+    if args.arrendamiento <= 0:
+        parser.error("--arrendamiento debe ser positivo")
+    if args.coordinar:
+        # Los archivos que se agregan (JSON Lines, historial, resumen, métricas) son
+        # propios de cada nodo; solo los reportes individuales se comparten
+        args.nodo = args.nodo or default_node_id()
+        args.jsonl = _node_path(args.jsonl, args.nodo)
+        args.historial = _node_path(args.historial, args.nodo)
+        args.resumen = _node_path(args.resumen, args.nodo)
+        args.metricas_archivo = _node_path(args.metricas_archivo, args.nodo)
+
+    pdfs = collect_pdfs(args.entradas)
+    if not pdfs and not args.vigilar:
+        console.info("✗ Error: No se encontraron PDFs para validar")
+        return
+
+    if args.metricas_puerto:
+        METRICS.serve(args.metricas_puerto)
+        console.info(f"✓ Métricas disponibles en http://127.0.0.1:{args.metricas_puerto}/metrics")
+
+    if args.vigilar:
+        console.info(f"Vigilando {', '.join(args.entradas)} cada {args.vigilar:g} s (Ctrl+C para detener)")
+        stats = watch_batch(args)
+        total = stats["validados"] + stats["errores"]
+    elif args.coordinar:
+        console.info(f"Nodo {args.nodo}: coordinando en {args.coordinar}")
+        stats = run_coordinated(args)
+        total = stats["validados"] + stats["errores"]
+    else:
+        stats = (run_staged if args.etapas else run_batch)(pdfs, args)
+        total = len(pdfs)
+
+    console.info("\n" + "="*80)
+    console.info("LOTE COMPLETADO")
+    console.info("="*80)
+    console.info(f"Documentos validados: {stats['validados']}/{total}")
+    console.info(f"Errores: {stats['errores']}")
+    costo = stats.get("costo")
+    if costo and costo["documentos"]:
+        console.info(f"Costo estimado: {costo['estimado_s']:.1f} s, real: {costo['real_s']:.1f} s "
+                     f"(costo por página ajustado: {costo['pagina_s_ajustado']} s)")
+    if stats.get("costo_reglas"):
+        console.info("")
+        for line in format_table(stats["costo_reglas"]):
+            console.info(line)
+    if args.jsonl:
+        console.info(f"Reportes JSON Lines: {args.jsonl}")
+    console.info("")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Contabilidad de memoria por fase y por documento
+Cada fase medida con phase() registra la memoria residente al empezar y al
+terminar y el pico residente alcanzado dentro de ella; con el seguimiento de
+asignaciones activo (tracemalloc) registra además el pico de memoria
+asignada por Python. El documento en curso reúne las fases en su reporte,
+para distinguir si el pico viene de las páginas de PyPDF2, de las copias del
+texto al normalizar o del armado del reporte PDF.
+
+En Linux el pico residente se reinicia al empezar cada fase
+(/proc/self/clear_refs); en otros sistemas solo se conoce el pico del
+proceso completo y el de cada fase es una cota superior. La memoria
+residente es del proceso: las fases de hilos concurrentes se solapan.
+"""
+
+
+import os
+import resource
+import sys
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+
+_MB = 1_048_576
+
+_STATUS = "/proc/self/status"
+_CLEAR_REFS = "/proc/self/clear_refs"
+
+
+def _resettable() -> bool:
+    try:
+        with open(_CLEAR_REFS, 'w') as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+# Pico residente reiniciable (Linux); se comprueba una vez por proceso
+_peak_resettable: Optional[bool] = None
+
+
+def rss_bytes() -> int:
+    """Memoria residente actual del proceso (0 si no se puede leer)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _status_kb(key: str) -> int:
+    with open(_STATUS) as f:
+        for line in f:
+            if line.startswith(key):
+                return int(line.split()[1])
+    return 0
+
+
+def peak_rss_bytes() -> int:
+    """Pico residente desde el último reinicio (o desde el inicio del proceso)"""
+    try:
+        return _status_kb("VmHWM:") * 1024
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss está en KB salvo en macOS (bytes)
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _reset_peaks():
+    global _peak_resettable
+    if _peak_resettable is None:
+        _peak_resettable = _resettable()
+    elif _peak_resettable:
+        try:
+            with open(_CLEAR_REFS, 'w') as f:
+                f.write("5")
+        except OSError:
+            _peak_resettable = False
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+
+
+def track_allocations(frames: int = 1):
+    """Activa el seguimiento de asignaciones (pico de memoria asignada por fase)
+
+    Tiene un costo apreciable de CPU: se activa a pedido.
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+@dataclass
+class _Window:
+    """Picos observados mientras una fase (o el documento) está abierta"""
+    rss_start: int
+    peak_rss: int = 0
+    peak_allocated: int = 0
+
+    def fold(self, peak_rss: int, peak_allocated: int):
+        self.peak_rss = max(self.peak_rss, peak_rss)
+        self.peak_allocated = max(self.peak_allocated, peak_allocated)
+
+
+@dataclass
+class DocumentMemory:
+    """Memoria de las fases de un documento"""
+    window: _Window
+    phases: Dict[str, Dict] = field(default_factory=dict)
+
+    def record(self, fase: str, usage: Dict):
+        # Una fase repetida (p. ej. varias exportaciones) conserva su mayor pico
+        previous = self.phases.get(fase)
+        if previous is None or usage["pico_rss_mb"] >= previous["pico_rss_mb"]:
+            self.phases[fase] = usage
+
+    def summary(self) -> Dict:
+        _fold_open()
+        summary = {"pico_rss_mb": _mb(self.window.peak_rss), "rss_mb": _mb(rss_bytes())}
+        if tracemalloc.is_tracing():
+            summary["asignado_pico_mb"] = _mb(self.window.peak_allocated)
+        summary["fases"] = dict(self.phases)
+        return summary
+
+
+# Ventanas abiertas (fases anidadas y documento) del contexto actual
+_open: ContextVar[Tuple[_Window, ...]] = ContextVar("memory_windows", default=())
+_document: ContextVar[Optional[DocumentMemory]] = ContextVar("document_memory", default=None)
+
+
+def _mb(value: int) -> float:
+    return round(value / _MB, 1)
+
+
+def _fold_open():
+    """Lleva los picos actuales a todas las ventanas abiertas y los reinicia"""
+    windows = _open.get()
+    if not windows:
+        return
+    peak_rss = peak_rss_bytes()
+    peak_allocated = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0
+    for window in windows:
+        window.fold(peak_rss, peak_allocated)
+    _reset_peaks()
+
+
+@contextmanager
+def _window():
+    _fold_open()
+    rss = rss_bytes()
+    window = _Window(rss, rss)
+    if not _open.get():
+        _reset_peaks()
+    token = _open.set(_open.get() + (window,))
+    try:
+        yield window
+    finally:
+        _fold_open()
+        _open.reset(token)
+
+
+@contextmanager
+def document_memory():
+    """Reúne la memoria de las fases del bloque (un documento)"""
+    with _window() as window:
+        document = DocumentMemory(window)
+        token = _document.set(document)
+        try:
+            yield document
+        finally:
+            _document.reset(token)
+
+
+@contextmanager
+def phase_memory(fase: str, info: Dict):
+    """Agrega a info la memoria de la fase y la anota en el documento en curso"""
+    with _window() as window:
+        try:
+            yield
+        finally:
+            _fold_open()
+            usage = {
+                "rss_inicio_mb": _mb(window.rss_start),
+                "rss_fin_mb": _mb(rss_bytes()),
+                "pico_rss_mb": _mb(window.peak_rss)
+            }
+            if tracemalloc.is_tracing():
+                usage["asignado_pico_mb"] = _mb(window.peak_allocated)
+            info["memoria"] = usage
+            document = _document.get()
+            if document is not None:
+                document.record(fase, usage)
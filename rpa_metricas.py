@@ -0,0 +1,197 @@
+"""
+Métricas del RPA en formato compatible con Prometheus
+Contadores e histogramas de latencia por fase, exportables a un archivo de
+texto (textfile collector) o mediante un endpoint HTTP local de scrape.
+
+Cada proceso trabajador acumula en su propio registro; el proceso principal
+combina las instantáneas que devuelven los trabajadores con merge().
+"""
+
+
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+HELP = {
+    "rpa_documentos_procesados_total": "Documentos procesados por estado final",
+    "rpa_paginas_extraidas_total": "Páginas extraídas de los PDFs",
+    "rpa_paginas_sin_texto_total": "Páginas sin capa de texto que no se interpretaron al extraer",
+    "rpa_fase_duracion_segundos": "Duración de cada fase del procesamiento",
+    "rpa_cache_consultas_total": "Consultas a cachés internas por resultado (acierto/fallo)",
+    "rpa_fallos_total": "Fallos por fase",
+}
+
+TYPES = {
+    "rpa_fase_duracion_segundos": "histogram",
+}
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: Tuple, extra: Tuple = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{v}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+class MetricsRegistry:
+    """Registro de contadores e histogramas de un proceso"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Tuple, float]] = {}
+        self._histograms: Dict[str, Dict[Tuple, list]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Incrementa un contador"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """Registra una observación en un histograma"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                # [conteos por bucket..., +Inf, suma]
+                hist = series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            hist[bisect_left(self.buckets, value)] += 1
+            hist[-1] += value
+
+    @contextmanager
+    def timer(self, fase: str, name: str = "rpa_fase_duracion_segundos"):
+        """Mide la duración de una fase; cuenta un fallo si se lanza una excepción"""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc("rpa_fallos_total", fase=fase)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, fase=fase)
+
+    def timed(self, fase: str):
+        """Decorador equivalente a timer() para métodos completos"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(fase):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def cache(self, cache: str, hit: bool):
+        """Registra un acierto o fallo de caché"""
+        self.inc("rpa_cache_consultas_total", cache=cache, resultado="acierto" if hit else "fallo")
+
+    def snapshot(self) -> Dict:
+        """Copia serializable del registro"""
+        with self._lock:
+            return {
+                "counters": {n: dict(s) for n, s in self._counters.items()},
+                "histograms": {n: {k: list(h) for k, h in s.items()} for n, s in self._histograms.items()},
+            }
+
+    def drain(self) -> Dict:
+        """Devuelve la instantánea y reinicia el registro (para enviar deltas al proceso principal)"""
+        with self._lock:
+            data = {
+                "counters": self._counters,
+                "histograms": self._histograms,
+            }
+            self._counters = {}
+            self._histograms = {}
+        return data
+
+    def merge(self, data: Dict):
+        """Suma una instantánea (p. ej. de un proceso trabajador) a este registro"""
+        with self._lock:
+            for name, series in data.get("counters", {}).items():
+                target = self._counters.setdefault(name, {})
+                for key, value in series.items():
+                    target[key] = target.get(key, 0) + value
+            for name, series in data.get("histograms", {}).items():
+                target = self._histograms.setdefault(name, {})
+                for key, hist in series.items():
+                    current = target.get(key)
+                    if current is None:
+                        target[key] = list(hist)
+                    else:
+                        for i, value in enumerate(hist):
+                            current[i] += value
+
+    def render(self) -> str:
+        """Genera el texto en formato de exposición de Prometheus"""
+        data = self.snapshot()
+        lines = []
+        for name in sorted(data["counters"]):
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} {TYPES.get(name, 'counter')}")
+            for key, value in sorted(data["counters"][name].items()):
+                lines.append(f"{name}{_format_labels(key)} {value:g}")
+        for name in sorted(data["histograms"]):
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, hist in sorted(data["histograms"][name].items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, hist):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(key, (('le', f'{bound:g}'),))} {cumulative}")
+                cumulative += hist[len(self.buckets)]
+                lines.append(f"{name}_bucket{_format_labels(key, (('le', '+Inf'),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(key)} {hist[-1]:.6f}")
+                lines.append(f"{name}_count{_format_labels(key)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, output_path: str):
+        """Escribe las métricas para el textfile collector (escritura atómica)"""
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{output_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp_path, output_path)
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Inicia un endpoint /metrics en un hilo de fondo"""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+# Registro del proceso actual
+METRICS = MetricsRegistry()
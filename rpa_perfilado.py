@@ -0,0 +1,149 @@
+"""
+Perfilado de documentos bajo demanda
+Con --perfilar N (o la variable de entorno RPA_PERFILAR=N) se perfila uno de
+cada N documentos, de principio a fin (extracción, validación y reporte), y
+se guardan dos archivos por documento en logs/perfilado/:
+
+  <fecha>_<archivo>_<proceso>.prof    cProfile (pstats, snakeviz, tuna)
+  <fecha>_<archivo>_<proceso>.folded  pilas muestreadas en formato plegado
+                                      (flamegraph.pl, speedscope, inferno)
+
+Los documentos no muestreados no pasan por este módulo: no hay perfilador
+ni temporizador activo mientras se procesan.
+"""
+
+
+import cProfile
+import os
+import re
+import signal
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import count
+from typing import Any, Callable, Dict, Optional
+
+from rpa_registro import DEFAULT_LOG_DIR, log_event
+
+
+ENV_VAR = "RPA_PERFILAR"
+
+# Intervalo de muestreo de las pilas (segundos de CPU)
+SAMPLE_INTERVAL = 0.001
+
+
+def interval_from_env(default: int = 0) -> int:
+    """Intervalo de muestreo de RPA_PERFILAR (0: sin perfilado)"""
+    value = os.environ.get(ENV_VAR, "")
+    try:
+        return max(int(value), 0) if value else default
+    except ValueError:
+        return default
+
+
+class DocumentSampler:
+    """Decide qué documentos se perfilan: el primero y luego uno de cada N
+
+    La decisión se recuerda por documento, de modo que las partes de un
+    documento dividido y su unión se perfilan todas o ninguna.
+    """
+
+    def __init__(self, every: int = 0):
+        self.every = every
+        self._counter = count()
+        self._decisions: Dict[str, bool] = {}
+
+    def __call__(self, pdf_path: str) -> bool:
+        if not self.every:
+            return False
+        if pdf_path not in self._decisions:
+            self._decisions[pdf_path] = next(self._counter) % self.every == 0
+        return self._decisions[pdf_path]
+
+
+class _StackSampler:
+    """Muestrea la pila del hilo principal con SIGPROF (tiempo de CPU)"""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        # Marcos exteriores al bloque perfilado, comunes a todas las muestras
+        self.outer_frames = 0
+        self._previous = None
+
+    @staticmethod
+    def available() -> bool:
+        return hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+
+    def _sample(self, signum, frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        self.stacks[";".join(reversed(names[:len(names) - self.outer_frames]))] += 1
+
+    def start(self, root):
+        """Empieza a muestrear; las pilas se cortan en el marco root"""
+        self.outer_frames = 0
+        while root.f_back is not None:
+            root = root.f_back
+            self.outer_frames += 1
+        self._previous = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self._previous)
+
+    def write(self, output_path: str):
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for stack, samples in self.stacks.most_common():
+                f.write(f"{stack} {samples}\n")
+
+
+def _base_name(label: str) -> str:
+    name = os.path.splitext(os.path.basename(label))[0]
+    return re.sub(r"[^\w.-]", "_", name)[:60]
+
+
+@contextmanager
+def profiled(label: str, log_dir: Optional[str] = DEFAULT_LOG_DIR):
+    """Perfila el bloque y guarda el perfil cProfile y las pilas plegadas
+
+    Las pilas solo se muestrean en el hilo principal de procesos Unix; en
+    otro caso se guarda solo el perfil cProfile.
+    """
+    output_dir = os.path.join(log_dir or DEFAULT_LOG_DIR, "perfilado")
+    os.makedirs(output_dir, exist_ok=True)
+    sampler = _StackSampler() if _StackSampler.available() else None
+    profiler = cProfile.Profile()
+    if sampler:
+        # Marco que abrió el bloque (el generador y __enter__ van antes)
+        sampler.start(sys._getframe(2))
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        if sampler:
+            sampler.stop()
+        # Las partes de un documento dividido comparten correlación: el proceso
+        # y los milisegundos distinguen sus perfiles
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')[:-3]
+        base = os.path.join(output_dir, f"{stamp}_{_base_name(label)}_{os.getpid()}")
+        profiler.dump_stats(f"{base}.prof")
+        outputs = [f"{base}.prof"]
+        if sampler:
+            sampler.write(f"{base}.folded")
+            outputs.append(f"{base}.folded")
+        log_event("perfilado", archivo=label, salidas=outputs,
+                  muestras=sum(sampler.stacks.values()) if sampler else None)
+
+
+def run_profiled(label: str, log_dir: Optional[str], func: Callable, *args) -> Any:
+    """Ejecuta func(*args) perfilado (se envía al proceso trabajador en lugar de func)"""
+    with profiled(label, log_dir):
+        return func(*args)
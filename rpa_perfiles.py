@@ -0,0 +1,169 @@
+"""
+Perfiles de validación sobre una sola extracción
+Cada perfil es un validador con sus reglas (Entregable 1, inspección ocular,
+inspección estricta). El PDF se extrae y se normaliza una vez y todos los
+perfiles seleccionados se ejecutan sobre el mismo documento, con un reporte
+por perfil.
+
+Uso:
+  python rpa_perfiles.py input/entregable1.pdf
+  python rpa_perfiles.py input/entregable1.pdf --perfiles entregable1,inspeccion_estricta
+  python rpa_perfiles.py --listar
+"""
+
+
+import argparse
+import os
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from rpa_documento import Document
+from rpa_extraccion import ExtractionCache
+from rpa_general import EntregableValidator
+from rpa_historial import ResultsStore, DEFAULT_DB_PATH
+from rpa_registro import DEFAULT_LOG_DIR, configure_logging, console, correlation, log_event
+from rpa_reglas import bundled_rules
+from rpa_validador import InformeInspeccionValidator
+
+
+@dataclass(frozen=True)
+class Profile:
+    """Perfil de validación registrado"""
+    nombre: str
+    descripcion: str
+    # Crea el validador; debe ofrecer validate_document() y export_report*()
+    factory: Callable[[], object]
+
+
+PROFILES: Dict[str, Profile] = {}
+
+
+def register_profile(nombre: str, descripcion: str, factory: Callable[[], object]) -> Profile:
+    """Registra (o reemplaza) un perfil de validación"""
+    profile = PROFILES[nombre] = Profile(nombre, descripcion, factory)
+    return profile
+
+
+def get_profile(nombre: str) -> Profile:
+    """Perfil registrado con ese nombre"""
+    try:
+        return PROFILES[nombre]
+    except KeyError:
+        raise ValueError(f"Perfil desconocido: {nombre} (disponibles: {', '.join(PROFILES)})") from None
+
+
+register_profile(
+    "entregable1", "Entregable 1 completo (siete componentes)",
+    EntregableValidator
+)
+register_profile(
+    "inspeccion_ocular", "Informe Técnico de Inspección Ocular",
+    lambda: InformeInspeccionValidator(bundled_rules("inspeccion_ocular"))
+)
+register_profile(
+    "inspeccion_estricta", "Informe de Inspección Ocular con criterio estricto",
+    lambda: InformeInspeccionValidator(bundled_rules("inspeccion_estricta"))
+)
+
+
+class ProfilePipeline:
+    """Ejecuta varios perfiles sobre una sola extracción de cada PDF"""
+
+    def __init__(self, nombres: List[str], extraction_cache: Optional[ExtractionCache] = None):
+        self.profiles = [get_profile(nombre) for nombre in nombres]
+        # Los validadores se crean una vez y se reutilizan entre documentos
+        self.validators = {profile.nombre: profile.factory() for profile in self.profiles}
+        self.extraction_cache = extraction_cache
+
+    def run(self, pdf_path: str) -> Dict[str, Dict]:
+        """Reportes de cada perfil para un PDF, en el orden de los perfiles"""
+        with correlation() as correlation_id:
+            document = Document.from_pdf(pdf_path, self.extraction_cache)
+            reports = {}
+            for nombre, validator in self.validators.items():
+                report = validator.validate_document(document)
+                report.setdefault("metadata", {"archivo": pdf_path})["perfil"] = nombre
+                reports[nombre] = report
+            log_event(
+                "perfiles", archivo=pdf_path, id_correlacion=correlation_id,
+                perfiles=list(reports), paginas=document.pages
+            )
+        return reports
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(
+        usage="python rpa_perfiles.py <ruta_pdf> [opciones]",
+        epilog="Ejemplo: python rpa_perfiles.py entregable1.pdf --perfiles entregable1,inspeccion_ocular"
+    )
+    parser.add_argument("pdf_path", nargs="?")
+    parser.add_argument("--perfiles", default=",".join(PROFILES),
+                        help="Perfiles a ejecutar separados por comas (por defecto todos)")
+    parser.add_argument("--listar", action="store_true", help="Listar los perfiles disponibles")
+    parser.add_argument("--salida", default=".", help="Carpeta de los reportes")
+    parser.add_argument("--historial", default=DEFAULT_DB_PATH,
+                        help="Base de datos del historial de validaciones")
+    parser.add_argument("--sin-historial", action="store_true",
+                        help="No registrar los resultados en el historial")
+    parser.add_argument("--logs", default=DEFAULT_LOG_DIR,
+                        help="Carpeta de eventos estructurados (JSON Lines)")
+    parser.add_argument("--sin-logs", action="store_true", help="No registrar eventos en archivo")
+    parser.add_argument("--silencioso", action="store_true", help="Sin salida de consola")
+    args = parser.parse_args()
+
+    configure_logging(None if args.sin_logs else args.logs, console_enabled=not args.silencioso)
+
+    if args.listar:
+        for profile in PROFILES.values():
+            console.info(f"  {profile.nombre:<22}{profile.descripcion}")
+        return
+
+    if not args.pdf_path:
+        parser.error("se requiere la ruta del PDF")
+    if not os.path.exists(args.pdf_path):
+        console.info(f"✗ Error: El archivo '{args.pdf_path}' no existe")
+        return
+
+    try:
+        pipeline = ProfilePipeline([p.strip() for p in args.perfiles.split(",") if p.strip()])
+    except ValueError as e:
+        parser.error(str(e))
+
+    reports = pipeline.run(args.pdf_path)
+
+    os.makedirs(args.salida, exist_ok=True)
+    base_name = os.path.splitext(os.path.basename(args.pdf_path))[0]
+    generated = []
+    for nombre, report in reports.items():
+        if report.get("status") == "ERROR":
+            console.info(f"\n✗ {nombre}: {report.get('message')}")
+            continue
+        validator = pipeline.validators[nombre]
+        base = os.path.join(args.salida, f"reporte_{base_name}_{nombre}")
+        with correlation(report["metadata"]["id_correlacion"]):
+            validator.export_report(report, f"{base}.json")
+            validator.export_report_txt(report, f"{base}.txt")
+            validator.export_report_pdf(report, f"{base}.pdf")
+        generated.extend(f"{base}.{ext}" for ext in ("json", "txt", "pdf"))
+
+    if not args.sin_historial:
+        with ResultsStore(args.historial) as store:
+            for report in reports.values():
+                if report.get("status") != "ERROR":
+                    store.save_report(report)
+        console.info(f"✓ Resultados registrados en historial: {args.historial}")
+
+    console.info("\n" + "="*80)
+    console.info("VALIDACIÓN POR PERFILES COMPLETADA")
+    console.info("="*80)
+    for nombre, report in reports.items():
+        console.info(f"  {nombre:<22}{report['metadata'].get('estado', report.get('status'))}")
+    console.info(f"\nReportes generados:")
+    for output in generated:
+        console.info(f"  • {output}")
+    console.info("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Planificación de lotes por costo estimado
+Cada PDF se estima antes de encargar trabajo a partir de un triaje ligero
+(tamaño, /Count del árbol de páginas y banderas, sin recorrer las páginas
+ni extraer texto). Los trabajos se envían de mayor a menor costo, para que
+un expediente grande no empiece al final y deje a los demás trabajadores
+sin tarea; un documento que por sí solo superaría la carga ideal de un
+trabajador se divide en rangos de páginas que se extraen en paralelo y se
+validan juntos.
+
+El costo real de cada documento se compara con el estimado para poder
+ajustar el modelo.
+"""
+
+
+import math
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from rpa_registro import log_event
+from rpa_triaje import BLOCKING_FLAGS, triage_pdf
+
+
+@dataclass(frozen=True)
+class CostModel:
+    """Costo estimado de validar un PDF, en segundos de un trabajador"""
+    fijo_s: float = 0.05
+    pagina_s: float = 0.01
+    mb_s: float = 0.05
+
+    def estimate(self, pages: int, size: int) -> float:
+        return self.fijo_s + self.pagina_s * pages + self.mb_s * size / 1_048_576
+
+
+@dataclass(frozen=True)
+class PdfEstimate:
+    """Tamaño, páginas declaradas, banderas de triaje y costo estimado de un PDF"""
+    path: str
+    size: int
+    pages: int
+    cost: float
+    flags: Tuple[str, ...] = ()
+
+    @property
+    def blocked(self) -> bool:
+        """El triaje indica que no se puede validar (no ocupa un trabajador)"""
+        return any(flag in BLOCKING_FLAGS for flag in self.flags)
+
+
+def estimate_pdf(path: str, model: CostModel = CostModel()) -> PdfEstimate:
+    """Estima un PDF sin recorrer sus páginas; uno ilegible cuenta como de cero páginas"""
+    triage = triage_pdf(path, walk_pages=False)
+    if triage.error:
+        log_event("triaje", archivo=path, banderas=triage.banderas, error=triage.error)
+    return PdfEstimate(path, triage.bytes, triage.paginas, model.estimate(triage.paginas, triage.bytes),
+                       tuple(triage.banderas))
+
+
+@dataclass(frozen=True)
+class Job:
+    """Trabajo del lote: un documento completo o un rango de sus páginas"""
+    estimate: PdfEstimate
+    cost: float
+    first: int = 1
+    # Última página del rango (None: documento completo)
+    last: Optional[int] = None
+    parts: int = 1
+
+    @property
+    def path(self) -> str:
+        return self.estimate.path
+
+
+def plan_jobs(estimates: Iterable[PdfEstimate], workers: int, min_part_pages: int = 50) -> List[Job]:
+    """Trabajos ordenados de mayor a menor costo (LPT); los bloqueados no generan trabajo
+
+    Un documento cuyo costo supera la carga ideal por trabajador (costo total
+    / trabajadores) se divide en tantas partes como hagan falta para no
+    superarla, sin pasar del número de trabajadores ni bajar de
+    min_part_pages páginas por parte (0: no dividir).
+    """
+    estimates = [e for e in estimates if not e.blocked]
+    share = sum(e.cost for e in estimates) / max(workers, 1)
+    jobs = []
+    for estimate in estimates:
+        parts = 1
+        if workers > 1 and min_part_pages and share > 0:
+            parts = min(workers, math.ceil(estimate.cost / share), estimate.pages // min_part_pages)
+        if parts <= 1:
+            jobs.append(Job(estimate, estimate.cost))
+            continue
+        for i in range(parts):
+            first = estimate.pages * i // parts + 1
+            last = estimate.pages * (i + 1) // parts
+            jobs.append(Job(estimate, estimate.cost * (last - first + 1) / estimate.pages, first, last, parts))
+    jobs.sort(key=lambda job: job.cost, reverse=True)
+    return jobs
+
+
+@dataclass
+class CostReport:
+    """Costos estimados y reales por documento del lote"""
+    model: CostModel
+    rows: List[Dict] = field(default_factory=list)
+
+    def add(self, estimate: PdfEstimate, real_s: float, parts: int = 1) -> Dict:
+        """Registra el costo real de un documento y devuelve la fila (para el reporte)"""
+        row = {
+            "estimado_s": round(estimate.cost, 3),
+            "real_s": round(real_s, 3),
+            "paginas": estimate.pages,
+            "bytes": estimate.size,
+            "partes": parts
+        }
+        self.rows.append(row)
+        log_event("costo", archivo=estimate.path, **row)
+        return row
+
+    def summary(self) -> Dict:
+        """Totales y el costo por página que mejor explica los tiempos reales"""
+        estimated = sum(row["estimado_s"] for row in self.rows)
+        real = sum(row["real_s"] for row in self.rows)
+        # Mínimos cuadrados de (real - fijo - tamaño) sobre las páginas
+        pages_sq = sum(row["paginas"] ** 2 for row in self.rows)
+        residual = sum(
+            row["paginas"] * (row["real_s"] - self.model.fijo_s - self.model.mb_s * row["bytes"] / 1_048_576)
+            for row in self.rows
+        )
+        return {
+            "documentos": len(self.rows),
+            "estimado_s": round(estimated, 3),
+            "real_s": round(real, 3),
+            "real_sobre_estimado": round(real / estimated, 3) if estimated else None,
+            "pagina_s_modelo": self.model.pagina_s,
+            "pagina_s_ajustado": round(residual / pages_sq, 5) if pages_sq else None
+        }
+
+    def close(self) -> Dict:
+        summary = self.summary()
+        log_event("planificacion", **summary)
+        return summary
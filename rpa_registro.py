@@ -0,0 +1,154 @@
+"""
+Registro estructurado del RPA
+Eventos JSON Lines en logs/ (archivo, fase, duración, páginas, errores) con un
+id de correlación por documento, y la salida de consola como renderizador
+opcional para personas.
+"""
+
+
+import functools
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional
+
+from rpa_memoria import phase_memory
+from rpa_metricas import METRICS
+
+
+DEFAULT_LOG_DIR = "logs"
+
+# Id de correlación del documento en proceso
+_correlation_id: ContextVar[Optional[str]] = ContextVar("correlation_id", default=None)
+
+# Salida de consola para personas (banners y resultados)
+console = logging.getLogger("rpa.consola")
+# Eventos estructurados para máquinas
+events = logging.getLogger("rpa.eventos")
+
+
+class _ConsoleHandler(logging.Handler):
+    """Escribe el mensaje tal cual en la salida estándar actual"""
+
+    def emit(self, record):
+        try:
+            print(record.getMessage())
+        except Exception:
+            self.handleError(record)
+
+
+class _JsonLinesFormatter(logging.Formatter):
+    """Formatea un evento como una línea JSON compacta"""
+
+    def format(self, record):
+        event = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(),
+            "nivel": record.levelname,
+            "pid": record.process,
+            "correlacion": getattr(record, "correlacion", None),
+            "fase": record.getMessage(),
+        }
+        event.update(getattr(record, "campos", {}))
+        return json.dumps(event, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+console.setLevel(logging.INFO)
+console.propagate = False
+console.addHandler(_ConsoleHandler())
+
+events.setLevel(logging.INFO)
+events.propagate = False
+events.addHandler(logging.NullHandler())
+
+
+def configure_logging(log_dir: Optional[str] = DEFAULT_LOG_DIR, console_enabled: bool = True):
+    """Configura el archivo de eventos y la salida de consola
+
+    Los eventos se agregan a logs/rpa_AAAA-MM-DD.log; cada línea se escribe
+    con una sola llamada en modo append, por lo que varios procesos pueden
+    compartir el archivo.
+    """
+    console.disabled = not console_enabled
+
+    for handler in list(events.handlers):
+        if isinstance(handler, logging.FileHandler):
+            events.removeHandler(handler)
+            handler.close()
+
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+        path = os.path.join(log_dir, f"rpa_{datetime.now().strftime('%Y-%m-%d')}.log")
+        handler = logging.FileHandler(path, mode='a', encoding='utf-8')
+        handler.setFormatter(_JsonLinesFormatter())
+        events.addHandler(handler)
+
+
+def new_correlation_id() -> str:
+    """Genera un id de correlación corto"""
+    return uuid.uuid4().hex[:12]
+
+
+def current_correlation_id() -> Optional[str]:
+    """Id de correlación del documento en proceso"""
+    return _correlation_id.get()
+
+
+@contextmanager
+def correlation(correlation_id: Optional[str] = None):
+    """Asocia un id de correlación a todos los eventos del bloque
+
+    Sin id explícito se conserva el del bloque exterior o se genera uno nuevo.
+    """
+    token = _correlation_id.set(correlation_id or _correlation_id.get() or new_correlation_id())
+    try:
+        yield _correlation_id.get()
+    finally:
+        _correlation_id.reset(token)
+
+
+def log_event(fase: str, level: int = logging.INFO, **campos):
+    """Registra un evento estructurado"""
+    if events.isEnabledFor(level):
+        events.log(level, fase, extra={"correlacion": _correlation_id.get(), "campos": campos})
+
+
+@contextmanager
+def phase(fase: str, **campos):
+    """Mide una fase: registra el evento con su duración, su memoria y la métrica de latencia
+
+    El bloque recibe un diccionario donde puede agregar campos al evento
+    (p. ej. páginas extraídas).
+    """
+    info = dict(campos)
+    start = time.perf_counter()
+    try:
+        with METRICS.timer(fase), phase_memory(fase, info):
+            yield info
+    except Exception as e:
+        info["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        info["duracion_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        log_event(fase, logging.ERROR if "error" in info else logging.INFO, **info)
+
+
+def logged_phase(fase: str):
+    """Decorador equivalente a phase() para métodos completos"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(fase):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def log_failure(fase: str, error: Exception, **campos):
+    """Registra un fallo capturado (sin excepción propagada) como evento y métrica"""
+    METRICS.inc("rpa_fallos_total", fase=fase)
+    log_event(fase, logging.ERROR, error=f"{type(error).__name__}: {error}", **campos)
@@ -0,0 +1,329 @@
+"""
+Reglas declarativas de validación
+Los requisitos (títulos, mínimos, escalas, normas, anexos) se leen de archivos
+JSON en reglas/ y se compilan en un plan de coincidencia. El plan compilado se
+guarda en reglas/.cache/ y se reutiliza mientras el archivo de reglas no cambie.
+
+Los procesos de larga duración usan RuleWatcher, que detecta cambios en el
+archivo de reglas y reemplaza el plan sin reiniciar el proceso.
+"""
+
+
+import hashlib
+import json
+import os
+import pickle
+import re
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from rpa_aproximado import ApproximateHeading
+from rpa_indice import DEFAULT_MAX_LENGTH
+from rpa_registro import log_event, log_failure
+from rpa_texto import normalize_text
+
+
+RULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reglas")
+
+# Cambiar al modificar la estructura de RulePlan (invalida los planes en caché);
+# los cambios en el código del compilador los detecta además _compiler_digest()
+PLAN_FORMAT = 3
+
+# Módulos cuyo código determina el plan compilado
+_COMPILER_MODULES = (__name__, "rpa_aproximado", "rpa_indice", "rpa_texto")
+
+
+def bundled_rules(nombre: str) -> str:
+    """Ruta del archivo de reglas incluido con el RPA (p. ej. 'entregable1')"""
+    return os.path.join(RULES_DIR, f"{nombre}.json")
+
+
+def _iter_strings(node) -> Iterable[str]:
+    """Recorre todas las cadenas contenidas en listas del archivo de reglas"""
+    if isinstance(node, dict):
+        for value in node.values():
+            yield from _iter_strings(value)
+    elif isinstance(node, list):
+        for value in node:
+            if isinstance(value, str):
+                yield value
+            else:
+                yield from _iter_strings(value)
+
+
+def heading_forms(heading_normalized: str) -> Dict[str, str]:
+    """Formas buscadas de un título: aislado, tras numeración '1.' o tras letras 'A.'
+
+    Basta con un dígito o una letra antes del título: si '\\d+' o '[A-Z]+'
+    coinciden, también lo hace su último carácter, y así se evita el
+    retroceso sobre secuencias largas.
+    """
+    escaped = re.escape(heading_normalized)
+    return {
+        "aislado": rf'\b{escaped}\b',
+        "numerado": rf'\d\.?\s*{escaped}',
+        "letras": rf'[A-Z]\.?\s*{escaped}'
+    }
+
+
+def heading_pattern(heading_normalized: str) -> str:
+    """Patrón de un título normalizado: sus tres formas unidas en una sola expresión"""
+    return "|".join(heading_forms(heading_normalized).values())
+
+
+class RulePlan:
+    """Plan de coincidencia compilado a partir de un archivo de reglas"""
+
+    def __init__(self, rules: Dict, source_path: str, version: str):
+        self.rules = rules
+        self.nombre = rules.get("nombre", os.path.splitext(os.path.basename(source_path))[0])
+        self.source_path = source_path
+        self.version = version
+        # Texto original -> texto normalizado (cada título se normaliza una sola vez)
+        self.normalized: Dict[str, str] = {}
+        # Texto normalizado -> patrón (un patrón por título distinto)
+        self.pattern_sources: Dict[str, str] = {}
+        for value in _iter_strings(rules):
+            if value not in self.normalized:
+                normalized = normalize_text(value)
+                self.normalized[value] = normalized
+                self.pattern_sources.setdefault(normalized, heading_pattern(normalized))
+        self._compiled = {}
+        # Presupuesto de errores de la búsqueda aproximada (sin la sección, solo exacta)
+        aproximada = rules.get("coincidencia_aproximada") or {}
+        self.max_errors = int(aproximada.get("max_errores", 0))
+        self.chars_per_error = max(1, int(aproximada.get("caracteres_por_error", 12)))
+        self._approximate = {}
+        # Índice de líneas de título y búsqueda de respaldo en el cuerpo
+        indice = rules.get("indice_titulos") or {}
+        self.heading_line_max = int(indice.get("longitud_maxima", DEFAULT_MAX_LENGTH))
+        self.body_fallback = bool(indice.get("respaldo_cuerpo", True))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Las expresiones compiladas se reconstruyen bajo demanda
+        state["_compiled"] = {}
+        state["_approximate"] = {}
+        return state
+
+    def normalize(self, value: str) -> str:
+        """Forma normalizada de un texto de las reglas"""
+        normalized = self.normalized.get(value)
+        if normalized is None:
+            normalized = self.normalized[value] = normalize_text(value)
+        return normalized
+
+    def pattern(self, heading_normalized: str):
+        """Expresión compilada de un título normalizado"""
+        compiled = self._compiled.get(heading_normalized)
+        if compiled is None:
+            source = self.pattern_sources.get(heading_normalized) or heading_pattern(heading_normalized)
+            compiled = self._compiled[heading_normalized] = re.compile(source)
+        return compiled
+
+    def search(self, text_normalized: str, heading_normalized: str) -> bool:
+        """Indica si el título aparece en el texto normalizado"""
+        # Filtro rápido: sin la subcadena no puede haber coincidencia
+        if heading_normalized not in text_normalized:
+            return False
+        return self.pattern(heading_normalized).search(text_normalized) is not None
+
+    def error_budget(self, heading_normalized: str) -> int:
+        """Errores tolerados para un título (los títulos cortos solo se buscan exactos)"""
+        return min(self.max_errors, len(heading_normalized) // self.chars_per_error)
+
+    def approximate(self, text_normalized: str, heading_normalized: str) -> Optional[Dict]:
+        """Coincidencia aproximada del título dentro del presupuesto de errores, o None"""
+        budget = self.error_budget(heading_normalized)
+        if budget <= 0:
+            return None
+        matcher = self._approximate.get(heading_normalized)
+        if matcher is None:
+            matcher = self._approximate[heading_normalized] = ApproximateHeading(heading_normalized, budget)
+        return matcher.search(text_normalized)
+
+    def variant_groups(self, sections: List[str]) -> List[List[str]]:
+        """Grupos de variantes (con y sin tilde) de una lista de títulos, en orden de aparición"""
+        groups: Dict[str, List[str]] = {}
+        for section in sections:
+            groups.setdefault(self.normalize(section), []).append(section)
+        return [group for group in groups.values() if len(group) > 1]
+
+    def component(self, key: str) -> Dict:
+        """Configuración de un componente del entregable"""
+        return self.rules["componentes"][key]
+
+
+def _file_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _compiler_digest() -> str:
+    """Hash del código que compila los planes: un plan guardado por otra versión no se reutiliza"""
+    digest = hashlib.sha256(str(PLAN_FORMAT).encode())
+    for name in _COMPILER_MODULES:
+        try:
+            with open(sys.modules[name].__file__, 'rb') as f:
+                digest.update(f.read())
+        except (KeyError, AttributeError, TypeError, OSError):
+            # Sin fuente legible (p. ej. empaquetado): cuenta la estructura del plan
+            digest.update(name.encode())
+    return digest.hexdigest()[:16]
+
+
+_COMPILER = _compiler_digest()
+
+_CACHE_KEYS = {"mtime_ns", "size", "sha256", "plan"}
+
+
+def _cache_path(path: str) -> str:
+    directory = os.path.join(os.path.dirname(os.path.abspath(path)), ".cache")
+    return os.path.join(directory, os.path.basename(path) + ".plan")
+
+
+def _read_cache(cache_path: str) -> Optional[Dict]:
+    """Entrada de la caché o None; una caché ilegible se recompila y se sobrescribe"""
+    try:
+        with open(cache_path, 'rb') as f:
+            cached = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        # Archivo truncado o plan de clases que ya no existen
+        log_failure("cache_reglas", e, cache=cache_path)
+        return None
+    if not isinstance(cached, dict) or cached.get("compilador") != _COMPILER:
+        return None
+    if not _CACHE_KEYS <= cached.keys() or not isinstance(cached["plan"], RulePlan):
+        return None
+    return cached
+
+
+def _write_cache(cache_path: str, entry: Dict):
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # Sin permisos de escritura: se usa el plan sin guardarlo
+        pass
+
+
+def compile_rules(path: str) -> RulePlan:
+    """Compila un archivo de reglas sin usar la caché"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return RulePlan(json.loads(data.decode('utf-8')), path, _file_digest(data)[:12])
+
+
+def load_plan(path: str) -> RulePlan:
+    """Carga el plan compilado de un archivo de reglas, usando la caché en disco
+
+    La caché se valida primero por fecha de modificación y tamaño; si no
+    coinciden se compara el hash del contenido antes de recompilar.
+    """
+    stat = os.stat(path)
+    cache_path = _cache_path(path)
+    cached = _read_cache(cache_path)
+
+    if cached and cached["mtime_ns"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+        return cached["plan"]
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    digest = _file_digest(data)
+
+    if cached and cached["sha256"] == digest:
+        plan = cached["plan"]
+    else:
+        plan = RulePlan(json.loads(data.decode('utf-8')), path, digest[:12])
+
+    _write_cache(cache_path, {
+        "compilador": _COMPILER,
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": digest,
+        "plan": plan
+    })
+    return plan
+
+
+def _missing_keys(old, new, prefix: str = "") -> List[str]:
+    """Claves del plan anterior que no existen en el nuevo (recursivo)"""
+    missing = []
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key, value in old.items():
+            path = f"{prefix}{key}"
+            if key not in new:
+                missing.append(path)
+            else:
+                missing.extend(_missing_keys(value, new[key], path + "."))
+    return missing
+
+
+class RuleWatcher:
+    """Plan de reglas que se recarga cuando cambia el archivo
+
+    current() revisa el archivo como máximo una vez cada check_interval
+    segundos y, si cambió, compila el nuevo plan y lo publica reemplazando
+    la referencia. Quien ya obtuvo un plan sigue usándolo hasta terminar
+    su documento. Un archivo inválido o al que le faltan claves del plan
+    vigente se registra como fallo y se conserva el plan anterior.
+    """
+
+    def __init__(self, path: str, check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._plan = load_plan(path)
+        self._stat_key = self._stat()
+        self._next_check = time.monotonic() + check_interval
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @property
+    def plan(self) -> RulePlan:
+        """Plan vigente, sin revisar el archivo"""
+        return self._plan
+
+    def current(self) -> RulePlan:
+        """Plan vigente, recargándolo si el archivo cambió"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return self._plan
+        with self._lock:
+            if now < self._next_check:
+                return self._plan
+            self._next_check = now + self.check_interval
+            stat_key = self._stat()
+            if stat_key is None or stat_key == self._stat_key:
+                return self._plan
+            self._stat_key = stat_key
+            try:
+                plan = load_plan(self.path)
+            except (OSError, ValueError) as e:
+                log_failure("recarga_reglas", e, reglas=self.path, version_vigente=self._plan.version)
+                return self._plan
+            missing = _missing_keys(self._plan.rules, plan.rules)
+            if missing:
+                log_failure(
+                    "recarga_reglas", KeyError(", ".join(missing[:5])),
+                    reglas=self.path, version_vigente=self._plan.version, version_rechazada=plan.version
+                )
+                return self._plan
+            if plan.version != self._plan.version:
+                log_event(
+                    "recarga_reglas", reglas=self.path,
+                    version_anterior=self._plan.version, version=plan.version
+                )
+                self._plan = plan
+            return self._plan
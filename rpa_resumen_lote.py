@@ -0,0 +1,326 @@
+"""
+Reporte consolidado de un lote de validaciones
+Agrega los reportes de forma incremental (solo guarda una fila resumida por
+documento y contadores por componente) y genera un PDF/CSV de resumen
+
+Uso:
+  python rpa_resumen_lote.py output/reportes.jsonl --pdf output/resumen_lote.pdf --csv output/resumen_lote
+  python rpa_resumen_lote.py reporte_*.json --pdf resumen.pdf
+"""
+
+
+import argparse
+import csv
+import json
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, LongTable, TableStyle, PageBreak
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+
+from rpa_historial import report_validations, expediente_from_path
+from rpa_jsonl import read_jsonl
+
+
+EXPEDIENTE_FIELDS = ["expediente", "archivo", "fecha_validacion", "estado",
+                     "componentes_validos", "total_componentes", "cumplimiento", "fotografias"]
+
+TOP_FALTANTES = 5
+
+
+def compliance_percentage(report: Dict) -> float:
+    """Porcentaje de cumplimiento de un reporte"""
+    if "validacion" in report:
+        detalles = report["validacion"]["detalles"]
+        if detalles.get("secciones_totales"):
+            return detalles["secciones_encontradas"] / detalles["secciones_totales"] * 100
+    validaciones = report_validations(report)
+    if not validaciones:
+        return 0.0
+    return sum(1 for v in validaciones if v["valido"]) / len(validaciones) * 100
+
+
+def photo_count(report: Dict) -> int:
+    """Fotografías reportadas por los componentes del reporte"""
+    return max(
+        (v["detalles"]["fotografias"] for v in report_validations(report)
+         if isinstance(v.get("detalles", {}).get("fotografias"), int)),
+        default=0
+    )
+
+
+class BatchSummary:
+    """Acumulador incremental de resultados de un lote"""
+
+    def __init__(self, csv_prefix: Optional[str] = None):
+        self.rows: List[Dict] = []
+        self.errores = 0
+        self.componentes_total = Counter()
+        self.componentes_fallos = Counter()
+        self.faltantes = {}
+        self.fotografias = []
+        self.csv_prefix = csv_prefix
+        self._csv_file = None
+        self._csv_writer = None
+        if csv_prefix:
+            self._csv_file = open(f"{csv_prefix}_expedientes.csv", 'w', encoding='utf-8', newline='')
+            self._csv_writer = csv.DictWriter(self._csv_file, fieldnames=EXPEDIENTE_FIELDS)
+            self._csv_writer.writeheader()
+
+    def add(self, report: Dict):
+        """Agrega un reporte al resumen (el reporte completo no se conserva)"""
+        meta = report.get("metadata")
+        if report.get("status") == "ERROR" or not meta or "estado" not in meta:
+            self.errores += 1
+            return
+
+        validaciones = report_validations(report)
+        for val in validaciones:
+            componente = val["componente"]
+            self.componentes_total[componente] += 1
+            if not val["valido"]:
+                self.componentes_fallos[componente] += 1
+                self.faltantes.setdefault(componente, Counter()).update(val["elementos_faltantes"])
+
+        fotos = photo_count(report)
+        self.fotografias.append(fotos)
+
+        row = {
+            "expediente": expediente_from_path(meta["archivo"]),
+            "archivo": meta["archivo"],
+            "fecha_validacion": meta["fecha_validacion"],
+            "estado": meta["estado"],
+            "componentes_validos": sum(1 for v in validaciones if v["valido"]),
+            "total_componentes": len(validaciones),
+            "cumplimiento": round(compliance_percentage(report), 1),
+            "fotografias": fotos
+        }
+        self.rows.append(row)
+        if self._csv_writer:
+            self._csv_writer.writerow(row)
+            self._csv_file.flush()
+
+    def component_failures(self) -> List[Dict]:
+        """Tabla de fallos por componente, del más al menos observado"""
+        table = []
+        for componente, total in self.componentes_total.items():
+            fallos = self.componentes_fallos[componente]
+            table.append({
+                "componente": componente,
+                "evaluados": total,
+                "observados": fallos,
+                "tasa_observacion": round(fallos / total * 100, 1) if total else 0.0,
+                "faltantes_frecuentes": [
+                    f"{item} ({count})"
+                    for item, count in self.faltantes.get(componente, Counter()).most_common(TOP_FALTANTES)
+                ]
+            })
+        table.sort(key=lambda r: (-r["observados"], r["componente"]))
+        return table
+
+    def totals(self) -> Dict:
+        """Totales generales del lote"""
+        documentos = len(self.rows)
+        aprobados = sum(1 for r in self.rows if r["estado"] == "APROBADO")
+        return {
+            "documentos": documentos,
+            "aprobados": aprobados,
+            "observados": documentos - aprobados,
+            "errores": self.errores,
+            "cumplimiento_promedio": round(sum(r["cumplimiento"] for r in self.rows) / documentos, 1) if documentos else 0.0,
+            "fotografias_total": sum(self.fotografias),
+            "fotografias_min": min(self.fotografias, default=0),
+            "fotografias_max": max(self.fotografias, default=0)
+        }
+
+    def close(self):
+        """Cierra el CSV incremental y escribe el CSV de componentes"""
+        if self._csv_file and not self._csv_file.closed:
+            self._csv_file.close()
+        if self.csv_prefix:
+            self.export_components_csv(f"{self.csv_prefix}_componentes.csv")
+
+    def export_components_csv(self, output_path: str):
+        """Exporta la tabla de fallos por componente a CSV"""
+        with open(output_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["componente", "evaluados", "observados", "tasa_observacion", "faltantes_frecuentes"])
+            for row in self.component_failures():
+                writer.writerow([row["componente"], row["evaluados"], row["observados"],
+                                 row["tasa_observacion"], "; ".join(row["faltantes_frecuentes"])])
+        print(f"✓ Resumen CSV exportado: {output_path}")
+
+    def export_pdf(self, output_path: str = "resumen_lote.pdf"):
+        """Exporta el resumen del lote a PDF"""
+        try:
+            doc = SimpleDocTemplate(
+                output_path,
+                pagesize=A4,
+                rightMargin=54,
+                leftMargin=54,
+                topMargin=72,
+                bottomMargin=50
+            )
+
+            story = []
+            styles = getSampleStyleSheet()
+
+            title_style = ParagraphStyle(
+                'CustomTitle',
+                parent=styles['Heading1'],
+                fontSize=18,
+                textColor=colors.HexColor('#1a1a1a'),
+                spaceAfter=30,
+                alignment=TA_CENTER,
+                fontName='Helvetica-Bold'
+            )
+
+            subtitle_style = ParagraphStyle(
+                'CustomSubtitle',
+                parent=styles['Heading2'],
+                fontSize=14,
+                textColor=colors.HexColor('#2c3e50'),
+                spaceAfter=12,
+                spaceBefore=12,
+                fontName='Helvetica-Bold'
+            )
+
+            normal_style = ParagraphStyle(
+                'CustomNormal',
+                parent=styles['Normal'],
+                fontSize=10,
+                textColor=colors.HexColor('#333333'),
+                alignment=TA_JUSTIFY,
+                spaceAfter=6
+            )
+
+            cell_style = ParagraphStyle(
+                'Cell',
+                parent=styles['Normal'],
+                fontSize=8,
+                leading=10
+            )
+
+            header_style = TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#34495e')),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, -1), 8),
+                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ('TOPPADDING', (0, 0), (-1, -1), 4),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+            ])
+
+            # PORTADA
+            totals = self.totals()
+            story.append(Spacer(1, 1.2*inch))
+            story.append(Paragraph("RESUMEN CONSOLIDADO<br/>VALIDACIÓN POR LOTES", title_style))
+            story.append(Spacer(1, 0.3*inch))
+
+            info_data = [
+                ["Fecha de generación:", datetime.now().strftime('%d/%m/%Y %H:%M:%S')],
+                ["Documentos validados:", str(totals["documentos"])],
+                ["Aprobados:", str(totals["aprobados"])],
+                ["Observados:", str(totals["observados"])],
+                ["Errores de lectura:", str(totals["errores"])],
+                ["Cumplimiento promedio:", f"{totals['cumplimiento_promedio']:.1f}%"],
+                ["Fotografías (total / mín / máx):",
+                 f"{totals['fotografias_total']} / {totals['fotografias_min']} / {totals['fotografias_max']}"]
+            ]
+            info_table = Table(info_data, colWidths=[2.8*inch, 3.5*inch])
+            info_table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#ecf0f1')),
+                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+                ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+                ('FONTSIZE', (0, 0), (-1, -1), 10),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+                ('TOPPADDING', (0, 0), (-1, -1), 8),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ]))
+            story.append(info_table)
+            story.append(PageBreak())
+
+            # FALLOS POR COMPONENTE
+            story.append(Paragraph("FALLOS POR COMPONENTE", subtitle_style))
+            story.append(Paragraph(
+                "Componentes ordenados por número de documentos observados, con los elementos "
+                "faltantes más frecuentes.", normal_style))
+            story.append(Spacer(1, 0.15*inch))
+
+            comp_data = [["Componente", "Evaluados", "Observados", "Tasa", "Faltantes frecuentes"]]
+            for row in self.component_failures():
+                comp_data.append([
+                    Paragraph(row["componente"], cell_style),
+                    str(row["evaluados"]),
+                    str(row["observados"]),
+                    f"{row['tasa_observacion']:.1f}%",
+                    Paragraph("<br/>".join(row["faltantes_frecuentes"]) or "-", cell_style)
+                ])
+            comp_table = Table(comp_data, colWidths=[1.8*inch, 0.7*inch, 0.8*inch, 0.6*inch, 2.6*inch], repeatRows=1)
+            comp_table.setStyle(header_style)
+            story.append(comp_table)
+            story.append(PageBreak())
+
+            # CUMPLIMIENTO POR EXPEDIENTE
+            story.append(Paragraph("CUMPLIMIENTO POR EXPEDIENTE", subtitle_style))
+            story.append(Spacer(1, 0.15*inch))
+
+            exp_data = [["Expediente", "Estado", "Componentes", "Cumplimiento", "Fotografías"]]
+            for row in sorted(self.rows, key=lambda r: (r["cumplimiento"], r["expediente"])):
+                exp_data.append([
+                    Paragraph(row["expediente"], cell_style),
+                    row["estado"],
+                    f"{row['componentes_validos']}/{row['total_componentes']}",
+                    f"{row['cumplimiento']:.1f}%",
+                    str(row["fotografias"])
+                ])
+            exp_table = LongTable(exp_data, colWidths=[2.6*inch, 1.0*inch, 1.0*inch, 1.0*inch, 0.9*inch], repeatRows=1)
+            exp_table.setStyle(header_style)
+            story.append(exp_table)
+
+            doc.build(story)
+
+            print(f"✓ Resumen PDF exportado: {output_path}")
+            return True
+
+        except Exception as e:
+            print(f"✗ Error al exportar resumen PDF: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+
+def iter_reports(paths: List[str]):
+    """Itera reportes desde archivos JSON Lines (.jsonl/.jsonl.gz) o JSON individuales"""
+    for path in paths:
+        if path.endswith((".jsonl", ".jsonl.gz")):
+            yield from read_jsonl(path)
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                yield json.load(f)
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Resumen consolidado de un lote de validaciones")
+    parser.add_argument("reportes", nargs="+", help="Archivos JSON Lines o reportes JSON")
+    parser.add_argument("--pdf", default="resumen_lote.pdf", help="Ruta del PDF de resumen")
+    parser.add_argument("--csv", help="Prefijo de los CSV de resumen")
+    args = parser.parse_args()
+
+    summary = BatchSummary(csv_prefix=args.csv)
+    for report in iter_reports(args.reportes):
+        summary.add(report)
+    summary.close()
+    summary.export_pdf(args.pdf)
+
+
+if __name__ == "__main__":
+    main()
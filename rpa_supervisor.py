@@ -0,0 +1,334 @@
+"""
+Supervisor de procesos trabajadores con plazo por tarea
+El presupuesto de extracción corta las páginas lentas dentro del trabajador,
+pero un bloqueo dentro de código nativo no se puede interrumpir desde el
+mismo proceso. El supervisor envía a lo sumo una tarea por trabajador, sabe
+qué proceso ejecuta cada una y, si una supera su plazo, mata ese proceso,
+reemplaza el grupo de trabajadores y reencola las demás tareas en curso.
+
+Las tareas se ejecutan con run(), que entrega los resultados de un lote a
+medida que terminan, o con submit(), que devuelve un futuro por tarea y las
+atiende en un hilo propio (flujos continuos y etapas asyncio).
+
+Con una función de retiro, cada trabajador la consulta al terminar una
+tarea (p. ej. memoria residente sobre un techo); si pide retirarse, el grupo
+se recicla sin interrumpir nada: las tareas en curso terminan en el grupo
+anterior, cuyos procesos salen al quedar libres, y las nuevas van a uno
+nuevo.
+"""
+
+
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from collections import deque
+from itertools import count
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from rpa_registro import log_event, log_failure
+
+
+# Cola por la que cada trabajador avisa qué tarea empezó (id de tarea, pid)
+_started = None
+
+# Función que indica, tras cada tarea, si el trabajador debe retirarse (motivo o None)
+_retire = None
+
+
+class TaskTimeout(Exception):
+    """Una tarea superó su plazo y su trabajador fue reemplazado"""
+
+
+def _init_supervised(started, initializer, initargs, retire):
+    global _started, _retire
+    _started = started
+    _retire = retire
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def _run_supervised(task_id: int, func: Callable, args: Tuple) -> Tuple[Any, Optional[str]]:
+    _started.put((task_id, os.getpid()))
+    result = func(*args)
+    return result, _retire() if _retire is not None else None
+
+
+@dataclass
+class _Task:
+    task_id: int
+    key: Any
+    func: Callable
+    args: Tuple
+    pid: Optional[int] = None
+    started: Optional[float] = None
+    # Veces que su trabajador murió sin que la tarea estuviera vencida
+    crashes: int = 0
+    # Grupo de trabajadores al que se envió
+    executor: Optional[ProcessPoolExecutor] = None
+    # Futuro de las tareas enviadas con submit()
+    future: Optional[Future] = None
+
+
+class Supervisor:
+    """Ejecuta tareas en procesos con un plazo máximo por tarea (None: sin plazo)"""
+
+    def __init__(self, workers: Optional[int] = None, deadline: Optional[float] = None,
+                 initializer: Optional[Callable] = None, initargs: Tuple = (),
+                 retire: Optional[Callable[[], Optional[str]]] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.deadline = deadline
+        self.initializer = initializer
+        self.initargs = initargs
+        self.retire = retire
+        self.replacements = 0
+        self.recycles = 0
+        self._queue = deque()
+        self._running: Dict[Any, _Task] = {}
+        self._by_id: Dict[int, _Task] = {}
+        self._ids = count()
+        # Servicio de submit(): hilo, cierre y futuro que lo despierta
+        self._lock = threading.Lock()
+        self._service: Optional[threading.Thread] = None
+        self._closing = False
+        self._wakeup = Future()
+        self._context = multiprocessing.get_context()
+        self._started = self._context.SimpleQueue()
+        self._executor = self._new_executor()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=self._context, initializer=_init_supervised,
+            initargs=(self._started, self.initializer, self.initargs, self.retire)
+        )
+
+    def close(self):
+        """Detiene el servicio de submit() (cancela lo que no empezó) y cierra el grupo"""
+        if self._service is not None:
+            with self._lock:
+                self._closing = True
+            self._wake()
+            self._service.join()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def add(self, key: Any, func: Callable, args: Tuple, first: bool = False):
+        """Encola una tarea más; puede llamarse mientras run() entrega resultados
+
+        Con first la tarea pasa delante de las que esperan (p. ej. la que
+        depende de otras ya terminadas).
+        """
+        self._enqueue(_Task(next(self._ids), key, func, args), first)
+
+    def _enqueue(self, task: _Task, first: bool = False):
+        if first:
+            self._queue.appendleft(task)
+        else:
+            self._queue.append(task)
+
+    def submit(self, key: Any, func: Callable, args: Tuple) -> Future:
+        """Encola una tarea y devuelve su futuro (para flujos continuos o asyncio)
+
+        Las tareas enviadas así las atiende un hilo del supervisor con el
+        mismo plazo, reintento y reemplazo de trabajadores que run(); el
+        futuro termina con TaskTimeout o BrokenProcessPool si la tarea venció
+        o su trabajador cayó dos veces. Un supervisor se usa con run() o con
+        submit(), no con ambos. Cancelar el futuro antes de que la tarea
+        empiece la descarta.
+        """
+        future = Future()
+        with self._lock:
+            if self._closing:
+                raise RuntimeError("Supervisor cerrado")
+            if self._service is None:
+                self._service = threading.Thread(target=self._serve, name="supervisor", daemon=True)
+                self._service.start()
+            self._enqueue(_Task(next(self._ids), key, func, args, future=future))
+        self._wake()
+        return future
+
+    def _wake(self):
+        with self._lock:
+            if not self._wakeup.done():
+                self._wakeup.set_result(None)
+
+    def _serve(self):
+        """Hilo de submit(): despacha las tareas y resuelve sus futuros"""
+        try:
+            while True:
+                with self._lock:
+                    if self._closing:
+                        break
+                    # Un futuro nuevo antes de despachar: un submit() posterior lo despierta
+                    if self._wakeup.done():
+                        self._wakeup = Future()
+                    wakeup = self._wakeup
+                for task, result, error in self._step(wakeup):
+                    if error is not None:
+                        task.future.set_exception(error)
+                    else:
+                        task.future.set_result(result)
+        except BaseException as e:
+            self._fail_pending(e)
+            raise
+        self._fail_pending(None)
+
+    def _fail_pending(self, error: Optional[BaseException]):
+        """Termina los futuros que no llegaron a resolverse (cierre o fallo del servicio)"""
+        tasks = list(self._queue) + list(self._running.values())
+        self._queue.clear()
+        for task in tasks:
+            if task.future is None or task.future.done():
+                continue
+            if error is None and task.future.cancel():
+                continue
+            task.future.set_exception(error or BrokenProcessPool("Supervisor cerrado"))
+
+    def run(self, tasks: Iterable[Tuple[Any, Callable, Tuple]]) -> Iterator[Tuple[Any, Any, Optional[BaseException]]]:
+        """Ejecuta (clave, función, argumentos) y entrega (clave, resultado, error) al terminar cada una
+
+        Las tareas se envían en el orden recibido. Una tarea vencida se
+        entrega con TaskTimeout como error.
+        """
+        for key, func, args in tasks:
+            self.add(key, func, args)
+        while self._queue or self._running:
+            for task, result, error in self._step():
+                yield task.key, result, error
+
+    def _step(self, wakeup: Optional[Future] = None) -> Iterator[Tuple[_Task, Any, Optional[BaseException]]]:
+        """Despacha tareas, espera la primera que termine (o wakeup) y entrega las terminadas"""
+        queue, running, by_id = self._queue, self._running, self._by_id
+        # Una tarea por trabajador: la que se envía empieza de inmediato
+        while queue and len(running) < self.workers:
+            # Una tarea cuyo trabajador ya murió se reintenta sola: si vuelve
+            # a caer, la culpa es suya y no de otra tarea del mismo grupo
+            if queue[0].crashes and running:
+                break
+            task = queue.popleft()
+            # Las reencoladas (trabajador caído o grupo reemplazado) ya estaban en curso
+            if task.future is not None and not task.future.running() and not task.future.set_running_or_notify_cancel():
+                continue
+            by_id[task.task_id] = task
+            task.executor = self._executor
+            running[self._executor.submit(_run_supervised, task.task_id, task.func, task.args)] = task
+            if task.crashes:
+                break
+
+        self._collect_starts(by_id)
+        waiting = list(running) + ([wakeup] if wakeup is not None else [])
+        timeout = self._next_check(running.values()) if running else None
+        done, _ = wait(waiting, timeout=timeout, return_when=FIRST_COMPLETED)
+        self._collect_starts(by_id)
+        broken = False
+        for future in done:
+            if future not in running:
+                continue
+            task = running.pop(future)
+            by_id.pop(task.task_id, None)
+            try:
+                result = self._result(future, task)
+            except BrokenProcessPool as e:
+                broken = True
+                yield from self._retry(task, queue, e)
+            except Exception as e:
+                yield task, None, e
+            else:
+                yield task, result, None
+
+        self._collect_starts(by_id)
+        overdue = [task for task in running.values() if self._is_overdue(task)]
+        if overdue or broken:
+            yield from self._replace_executor(running, by_id, queue, overdue)
+
+    def _result(self, future, task: _Task):
+        """Resultado de la tarea; si su trabajador pidió retirarse, se recicla el grupo
+
+        Un pedido de un grupo ya reciclado no vuelve a reciclar el actual.
+        """
+        result, reason = future.result()
+        if reason is not None and task.executor is self._executor:
+            self._recycle(reason, task.pid)
+        return result
+
+    def _recycle(self, reason: str, pid: Optional[int]):
+        """Grupo nuevo para las tareas siguientes; el anterior termina las suyas y sale"""
+        previous, self._executor = self._executor, self._new_executor()
+        previous.shutdown(wait=False)
+        self.recycles += 1
+        log_event("reciclaje_trabajadores", motivo=reason, pid_trabajador=pid)
+
+    def _retry(self, task: _Task, queue, error: BaseException):
+        """Reencola una tarea cuyo trabajador murió; a la segunda vez se entrega el error"""
+        task.crashes += 1
+        task.pid = task.started = None
+        if task.crashes > 1:
+            log_failure("trabajador_caido", error, tarea=str(task.key))
+            yield task, None, error
+        else:
+            queue.appendleft(task)
+
+    def _collect_starts(self, by_id: Dict[int, _Task]):
+        while not self._started.empty():
+            task_id, pid = self._started.get()
+            task = by_id.get(task_id)
+            if task is not None:
+                task.pid, task.started = pid, time.monotonic()
+
+    def _next_check(self, tasks) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        now = time.monotonic()
+        remaining = [task.started + self.deadline - now for task in tasks if task.started is not None]
+        # Las tareas aún sin aviso de inicio se revisan en breve
+        return max(0.0, min(remaining, default=1.0))
+
+    def _is_overdue(self, task: _Task) -> bool:
+        return (self.deadline is not None and task.started is not None
+                and time.monotonic() - task.started > self.deadline)
+
+    def _replace_executor(self, running, by_id, queue, overdue):
+        """Mata los trabajadores vencidos, reencola las demás tareas en curso y crea un grupo nuevo"""
+        for task in overdue:
+            if task.pid is not None:
+                try:
+                    os.kill(task.pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+                except ProcessLookupError:
+                    pass
+        # Con un trabajador muerto el grupo completo queda inutilizable
+        done, _ = wait(running)
+        overdue_ids = {task.task_id for task in overdue}
+        for future in done:
+            task = running.pop(future)
+            by_id.pop(task.task_id, None)
+            if task.task_id in overdue_ids:
+                error = TaskTimeout(f"Plazo de {self.deadline:g} s agotado")
+                log_failure("plazo_tarea", error, tarea=str(task.key), pid_trabajador=task.pid)
+                yield task, None, error
+                continue
+            try:
+                result = self._result(future, task)
+            except BrokenProcessPool as e:
+                if overdue_ids:
+                    # Cayó por el trabajador vencido: se reintenta sin contarlo
+                    task.pid = task.started = None
+                    queue.appendleft(task)
+                else:
+                    yield from self._retry(task, queue, e)
+            except Exception as e:
+                yield task, None, e
+            else:
+                yield task, result, None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = self._new_executor()
+        self.replacements += 1
+        log_event("reemplazo_trabajadores", vencidas=len(overdue), reencoladas=len(queue))
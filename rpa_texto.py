@@ -0,0 +1,102 @@
+"""
+Utilidades de texto compartidas por los validadores del RPA
+
+La normalización usa una tabla de traducción precalculada a partir de la
+descomposición Unicode NFD: en textos Latin-1 (el caso habitual en español)
+mayúsculas, tildes y espacios se resuelven en una sola pasada de
+bytes.translate. Los textos con otros caracteres (viñetas, comillas, ligaduras)
+reemplazan cada carácter distinto una sola vez.
+"""
+
+
+import functools
+import re
+import unicodedata
+
+
+# Caracteres invisibles que parten palabras en el texto extraído
+_INVISIBLE = (0x00AD, 0x200B, 0x200C, 0x200D, 0x2060, 0xFEFF)
+# Ligaduras que NFD no descompone
+_LIGATURES = {"Æ": "AE", "Œ": "OE", "Ĳ": "IJ"}
+
+
+@functools.lru_cache(maxsize=4096)
+def _fold(char: str) -> str:
+    """Forma normalizada de un carácter ya en mayúsculas"""
+    if char.isspace():
+        return " "
+    if ord(char) in _INVISIBLE or unicodedata.combining(char):
+        return ""
+    if char in _LIGATURES:
+        return _LIGATURES[char]
+    decomposed = unicodedata.normalize("NFD", char)
+    base = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return base or char
+
+
+def _fold_all(char: str) -> str:
+    """Como _fold, normalizando también lo que produce (Ǣ -> Æ -> AE)"""
+    folded = _fold(char)
+    if folded == char:
+        return char
+    return "".join(c if c.isascii() else _fold_all(c) for c in folded)
+
+
+def _build_latin1_table():
+    table = bytearray(range(256))
+    delete = bytearray()
+    special = []
+    for code in range(256):
+        char = chr(code)
+        upper = char.upper()
+        folded = _fold(upper) if len(upper) == 1 else upper
+        if folded == "":
+            delete.append(code)
+        elif len(folded) == 1 and ord(folded) <= 0xFF:
+            table[code] = ord(folded)
+        else:
+            # ß -> SS, Æ -> AE, µ -> Μ: se resuelven por la vía general
+            special.append(char)
+    return bytes(table), bytes(delete), tuple(special)
+
+
+# Byte Latin-1 -> byte normalizado (mayúscula sin tilde; espacios como ' ')
+_LATIN1_TABLE, _LATIN1_DELETE, _LATIN1_SPECIAL = _build_latin1_table()
+
+_ASCII_SPACES = "\t\n\r\x0b\x0c\x1c\x1d\x1e\x1f"
+_NON_ASCII = re.compile(r'[^\x00-\x7f]')
+_SPACE_RUN = re.compile(r'  +')
+
+
+def _normalize_latin1(text: str) -> str:
+    return text.encode('latin-1').translate(_LATIN1_TABLE, _LATIN1_DELETE).decode('latin-1')
+
+
+def _normalize_mixed(text: str) -> str:
+    """Vía general para textos con caracteres fuera de Latin-1
+
+    Se reemplaza cada carácter no ASCII distinto una sola vez en todo el
+    texto, ya en su forma final: lo que produce no vuelve a reemplazarse.
+    """
+    text = text.upper()
+    for char in set(_NON_ASCII.findall(text)):
+        folded = _fold_all(char)
+        if folded != char:
+            text = text.replace(char, folded)
+    for char in _ASCII_SPACES:
+        if char in text:
+            text = text.replace(char, " ")
+    return text
+
+
+def normalize_text(text: str) -> str:
+    """Normaliza texto para comparación (mayúsculas, sin tildes, espacios simples)"""
+    if any(char in text for char in _LATIN1_SPECIAL):
+        text = _normalize_mixed(text)
+    else:
+        try:
+            text = _normalize_latin1(text)
+        except UnicodeEncodeError:
+            text = _normalize_mixed(text)
+    # Solo quedan espacios ' ': basta con colapsar las repeticiones
+    return _SPACE_RUN.sub(' ', text).strip(' ')
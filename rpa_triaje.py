@@ -0,0 +1,173 @@
+"""
+Triaje de PDFs sin extraer texto
+Responde, a partir de la estructura del PDF (trailer, árbol de páginas y
+recursos), cuántas páginas tiene, cuáles declaran fuentes (capa de texto),
+cuántas imágenes contiene, si tiene marcadores y su tamaño, en milisegundos
+por archivo. Marca los documentos que necesitarán un trato especial antes
+de ocupar un trabajador en su validación completa.
+
+Los flujos de contenido no se descomprimen: la búsqueda de operadores de
+texto, más precisa pero más cara, la hace el trabajador al extraer.
+
+Uso:
+  python rpa_triaje.py input/
+  python rpa_triaje.py input/ --jsonl output/triaje.jsonl --silencioso
+"""
+
+
+import argparse
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+import PyPDF2
+from PyPDF2 import PasswordType
+
+from rpa_extraccion import MappedPdf, page_resources, pdf_page_count, release_page, release_reader
+from rpa_jsonl import JsonlSink
+from rpa_registro import DEFAULT_LOG_DIR, configure_logging, console, log_event
+
+
+# Páginas a partir de las cuales un documento se marca como grande
+DEFAULT_LARGE_PAGES = 300
+
+# Banderas que impiden validar el documento
+BLOCKING_FLAGS = ("vacio", "ilegible", "cifrado")
+
+
+@dataclass
+class TriageResult:
+    """Datos estructurales de un PDF y sus banderas"""
+    archivo: str
+    bytes: int = 0
+    paginas: int = 0
+    # Páginas cuyos recursos declaran al menos una fuente
+    paginas_con_texto: int = 0
+    imagenes: int = 0
+    marcadores: bool = False
+    cifrado: bool = False
+    duracion_ms: float = 0.0
+    banderas: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def blocked(self) -> bool:
+        """No se puede validar (vacío, ilegible o cifrado con contraseña)"""
+        return any(flag in BLOCKING_FLAGS for flag in self.banderas)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def _has_outline(root) -> bool:
+    outlines = root.get("/Outlines")
+    return outlines is not None and outlines.get_object().get("/First") is not None
+
+
+def triage_pdf(path: str, large_pages: int = DEFAULT_LARGE_PAGES, walk_pages: bool = True) -> TriageResult:
+    """Triaje de un PDF; los errores quedan en la bandera y en el campo error
+    
+    Con walk_pages=False solo se leen el trailer y el /Count del árbol de
+    páginas (para planificar un lote): sin capa de texto, imágenes ni sus
+    banderas.
+    """
+    start = time.perf_counter()
+    result = TriageResult(path)
+    try:
+        with MappedPdf(path) as mapped:
+            result.bytes = mapped.size
+            if not mapped.size:
+                result.banderas.append("vacio")
+                return result
+            reader = PyPDF2.PdfReader(mapped.stream())
+            try:
+                if reader.is_encrypted:
+                    result.cifrado = True
+                    # Los cifrados sin contraseña de usuario se leen con normalidad
+                    if reader.decrypt("") == PasswordType.NOT_DECRYPTED:
+                        result.banderas.append("cifrado")
+                        return result
+                root = reader.trailer["/Root"].get_object()
+                result.marcadores = _has_outline(root)
+                if walk_pages:
+                    result.paginas = len(reader.pages)
+                    images = set()
+                    for index, page in enumerate(reader.pages):
+                        resources = page_resources(page)
+                        result.paginas_con_texto += resources.fonts
+                        images |= resources.images
+                        release_page(reader, index, page)
+                    result.imagenes = len(images)
+                else:
+                    result.paginas = pdf_page_count(reader)
+            finally:
+                release_reader(reader)
+    except Exception as e:
+        result.banderas.append("ilegible")
+        result.error = f"{type(e).__name__}: {e}"
+        return result
+    finally:
+        result.duracion_ms = round((time.perf_counter() - start) * 1000, 3)
+
+    if not result.paginas:
+        result.banderas.append("sin_paginas")
+    elif walk_pages and not result.paginas_con_texto:
+        # Escaneado: la validación no encontrará texto sin OCR
+        result.banderas.append("sin_capa_texto")
+    elif walk_pages and result.paginas_con_texto < result.paginas:
+        result.banderas.append("capa_texto_parcial")
+    if result.paginas >= large_pages:
+        result.banderas.append("grande")
+    return result
+
+
+def main():
+    """Función principal"""
+    # Importado aquí: el lote carga los validadores, que el triaje no necesita
+    from rpa_lote import collect_pdfs
+
+    parser = argparse.ArgumentParser(description="Triaje de PDFs sin extraer texto")
+    parser.add_argument("entradas", nargs="+", help="PDFs o carpetas con PDFs")
+    parser.add_argument("--jsonl", help="Archivo JSON Lines donde agregar el triaje de cada PDF")
+    parser.add_argument("--paginas-grande", type=int, default=DEFAULT_LARGE_PAGES,
+                        help="Páginas a partir de las cuales un documento se marca como grande")
+    parser.add_argument("--logs", default=DEFAULT_LOG_DIR,
+                        help="Carpeta de eventos estructurados (JSON Lines)")
+    parser.add_argument("--sin-logs", action="store_true", help="No registrar eventos en archivo")
+    parser.add_argument("--silencioso", action="store_true", help="Sin salida de consola")
+    args = parser.parse_args()
+
+    configure_logging(None if args.sin_logs else args.logs, console_enabled=not args.silencioso)
+
+    pdfs = collect_pdfs(args.entradas)
+    if not pdfs:
+        console.info("✗ Error: No se encontraron PDFs")
+        return
+
+    sink = JsonlSink(args.jsonl) if args.jsonl else None
+    flagged = 0
+    try:
+        console.info(f"{'PÁGINAS':>8} {'TEXTO':>7} {'IMÁG.':>6} {'MARC.':>5} {'MB':>8} {'MS':>8}  ARCHIVO / BANDERAS")
+        for pdf in pdfs:
+            result = triage_pdf(pdf, args.paginas_grande)
+            log_event("triaje", **result.to_dict())
+            if sink:
+                sink.write(result.to_dict())
+            flagged += bool(result.banderas)
+            console.info(
+                f"{result.paginas:>8} {result.paginas_con_texto:>7} {result.imagenes:>6} "
+                f"{'sí' if result.marcadores else 'no':>5} {result.bytes / 1_048_576:>8.2f} "
+                f"{result.duracion_ms:>8.1f}  {pdf}"
+                + (f"  [{', '.join(result.banderas)}]" if result.banderas else "")
+            )
+    finally:
+        if sink:
+            sink.close()
+
+    console.info(f"\n{len(pdfs)} PDFs revisados, {flagged} con banderas")
+    if args.jsonl:
+        console.info(f"Triaje JSON Lines: {args.jsonl}")
+
+
+if __name__ == "__main__":
+    main()
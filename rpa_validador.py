@@ -5,12 +5,13 @@ Adaptado al formato real del documento
 """
 
 
-import PyPDF2
 import re
 import os
+import time
+import argparse
 from datetime import datetime
 from dataclasses import dataclass
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 import json
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -19,6 +20,19 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, Tabl
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
 
+from rpa_texto import normalize_text
+from rpa_reglas import load_plan, bundled_rules
+from rpa_extraccion import extract_pdf, text_coverage
+from rpa_indice import HeadingIndex
+from rpa_evidencias import EvidenceTable, extract_evidence
+from rpa_documento import Document
+from rpa_historial import ResultsStore, DEFAULT_DB_PATH
+from rpa_memoria import document_memory
+from rpa_metricas import METRICS
+from rpa_registro import (
+    DEFAULT_LOG_DIR, configure_logging, console, correlation, log_event, log_failure, logged_phase, phase
+)
+
 
 @dataclass
 class ValidationResult:
@@ -33,97 +47,152 @@ class ValidationResult:
 class InformeInspeccionValidator:
     """Validador del Informe Técnico de Inspección Ocular"""
     
-    def __init__(self):
-        # Estructura REAL basada en el entregable1.pdf
-        self.estructura_informe = {
-            "secciones_obligatorias": [
-                "ANTECEDENTES",
-                "METODOLOGIA PARA LA INSPECCION",
-                "METODOLOGÍA PARA LA INSPECCIÓN",
-                "UBICACION DEL PROYECTO",
-                "UBICACIÓN DEL PROYECTO",
-                "ACCESOS",
-                "INFORMACION RECOGIDA DE CAMPO",
-                "INFORMACIÓN RECOGIDA DE CAMPO",
-                "INFRAESTRUCTURA EXISTENTE",
-                "SERVICIOS BASICOS EXISTENTES",
-                "SERVICIOS BÁSICOS EXISTENTES",
-                "LIBRE DISPONIBILIDAD DEL TERRENO",
-                "COMPATIBILIZACION DEL AREA A INTERVENIR",
-                "COMPATIBILIZACIÓN DEL ÁREA A INTERVENIR",
-                "VERIFICACION DE DATOS CONSIGNADOS EN LA PARTIDA REGISTRAL",
-                "VERIFICACIÓN DE DATOS CONSIGNADOS EN LA PARTIDA REGISTRAL",
-                "CONCLUSIONES Y RECOMENDACIONES"
-            ],
-            "minimo_requerido": 11,  # Las 11 secciones únicas obligatorias
-            # Secciones que se consideran como "panel fotográfico implícito"
-            "fotografias_incluidas": True  # El documento incluye fotografías en cada módulo
-        }
+    def __init__(self, rules_path: Optional[str] = None):
+        # Estructura REAL basada en el entregable1.pdf (reglas/inspeccion_ocular.json)
+        self.plan = load_plan(rules_path or bundled_rules("inspeccion_ocular"))
+        self.estructura_informe = self.plan.rules
+        # Coincidencias de títulos del documento en proceso
+        self._matches_text = None
+        self._matches = {}
+        # Títulos hallados solo en el cuerpo o por coincidencia aproximada
+        self._approximate_matches = {}
+        self._approximate_hits = {}
+        self._body_hits = {}
+        # Texto normalizado, índice de títulos y evidencias numéricas del último texto
+        self._normalized_source = None
+        self._normalized_text = ""
+        self._index_source = None
+        self._index = None
+        self._evidence_source = None
+        self._evidence = None
+        # Documento compartido en validación (texto normalizado, índice y evidencias)
+        self.document: Optional[Document] = None
+        # Fin de cada página y páginas sin capa de texto del último PDF extraído
+        self.last_page_ends: Tuple[int, ...] = ()
+        self.last_image_pages: List[int] = []
     
     def extract_text_from_pdf(self, pdf_path: str) -> str:
         """Extrae texto de un PDF"""
+        self.last_page_ends = ()
+        self.last_image_pages = []
         try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-                return text
+            text, self.last_page_ends = extract_pdf(pdf_path, image_pages=self.last_image_pages)
+            return text
         except Exception as e:
-            print(f"Error al leer PDF: {e}")
+            log_failure("extraccion", e, archivo=pdf_path)
+            console.info(f"Error al leer PDF: {e}")
             return ""
     
     def normalize_text(self, text: str) -> str:
         """Normaliza texto para comparación"""
-        text = text.upper()
-        replacements = {
-            'Á': 'A', 'É': 'E', 'Í': 'I', 'Ó': 'O', 'Ú': 'U',
-            'Ñ': 'N', '\n': ' ', '\t': ' '
-        }
-        for old, new in replacements.items():
-            text = text.replace(old, new)
-        text = re.sub(r'\s+', ' ', text)
-        return text.strip()
+        if self.document is not None and text is self.document.text:
+            return self.document.normalized
+        if text is self._normalized_source:
+            METRICS.cache("texto_normalizado", hit=True)
+            return self._normalized_text
+        if len(text) <= 1000:
+            # Títulos sueltos: no se guardan ni se miden
+            return normalize_text(text)
+        METRICS.cache("texto_normalizado", hit=False)
+        with phase("normalizacion", caracteres=len(text)):
+            normalized = normalize_text(text)
+        self._normalized_source = text
+        self._normalized_text = normalized
+        return normalized
+    
+    def evidence(self, text: str) -> EvidenceTable:
+        """Evidencias numéricas del texto (se extraen una vez por documento)"""
+        if self.document is not None and text is self.document.text:
+            return self.document.evidence()
+        text_normalized = self.normalize_text(text)
+        if text_normalized is not self._evidence_source:
+            with phase("evidencias") as info:
+                self._evidence = extract_evidence(text_normalized)
+                info.update(self._evidence.summary())
+            self._evidence_source = text_normalized
+        return self._evidence
+    
+    def heading_index(self, text: str) -> HeadingIndex:
+        """Índice de líneas de título del texto (se construye una vez por documento)"""
+        if self.document is not None and text is self.document.text:
+            return self.document.heading_index(self.plan.heading_line_max)
+        if text is not self._index_source:
+            with phase("indice_titulos") as info:
+                self._index = HeadingIndex(text, self.plan.heading_line_max)
+                info["lineas"] = self._index.total_lines
+                info["lineas_titulo"] = len(self._index)
+            self._index_source = text
+        return self._index
     
     def find_sections(self, text: str, sections_list: List[str]) -> Dict[str, bool]:
-        """Busca secciones en el texto"""
+        """Busca secciones en el texto
+        
+        Cada título se busca primero en las líneas de título del documento y,
+        si no aparece allí, en el cuerpo completo.
+        """
         text_normalized = self.normalize_text(text)
+        if text_normalized is not self._matches_text:
+            self._matches_text = text_normalized
+            self._matches = {}
+            self._approximate_matches = {}
+        headings = self.heading_index(text).text
         found_sections = {}
         
         for section in sections_list:
-            section_normalized = self.normalize_text(section)
-            patterns = [
-                rf'\b{re.escape(section_normalized)}\b',
-                rf'\d+\.?\s*{re.escape(section_normalized)}',
-                rf'[A-Z]+\.?\s*{re.escape(section_normalized)}'
-            ]
-            
-            found = False
-            for pattern in patterns:
-                if re.search(pattern, text_normalized):
-                    found = True
-                    break
-            
-            found_sections[section] = found
+            # Cada título distinto se busca una sola vez por documento
+            section_normalized = self.plan.normalize(section)
+            location = self._matches.get(section_normalized)
+            if location is None:
+                location = self._locate(headings, text_normalized, section_normalized)
+                self._matches[section_normalized] = location
+            if location == "cuerpo":
+                self._body_hits.setdefault(section_normalized, section)
+            elif location == "aproximada":
+                self._approximate_hits.setdefault(
+                    section_normalized, (section, self._approximate_matches[section_normalized])
+                )
+            found_sections[section] = bool(location)
         
         return found_sections
     
+    def _locate(self, headings: str, text_normalized: str, section_normalized: str) -> str:
+        """Dónde aparece un título: 'titulo', 'cuerpo', 'aproximada' o '' si no aparece"""
+        if self.plan.search(headings, section_normalized):
+            return "titulo"
+        if self.plan.body_fallback and self.plan.search(text_normalized, section_normalized):
+            return "cuerpo"
+        # Texto dañado (palabras partidas, letras confundidas)
+        sources = [("titulo", headings)]
+        if self.plan.body_fallback:
+            sources.append(("cuerpo", text_normalized))
+        for ubicacion, source in sources:
+            approximate = self.plan.approximate(source, section_normalized)
+            if approximate:
+                self._approximate_matches[section_normalized] = {
+                    "errores": approximate["errores"],
+                    "fragmento": approximate["fragmento"],
+                    "ubicacion": ubicacion
+                }
+                return "aproximada"
+        return ""
+    
+    def take_match_notes(self) -> Dict:
+        """Títulos hallados solo en el cuerpo o por coincidencia aproximada desde la última llamada"""
+        notes = {}
+        if self._approximate_hits:
+            notes["secciones_aproximadas"] = {
+                section: dict(info) for section, info in self._approximate_hits.values()
+            }
+        if self._body_hits:
+            notes["secciones_en_cuerpo"] = list(self._body_hits.values())
+        self._approximate_hits = {}
+        self._body_hits = {}
+        return notes
+    
     def check_photographs(self, text: str) -> Dict:
         """Verifica la presencia de fotografías/panel fotográfico"""
-        text_normalized = self.normalize_text(text)
-        
-        # Buscar referencias a fotografías
-        foto_patterns = [
-            r'FOTOGRAFIA\s*N',
-            r'FOTO\s*N',
-            r'FIGURA\s*N',
-            r'IMAGEN\s*N'
-        ]
-        
-        foto_count = 0
-        for pattern in foto_patterns:
-            matches = re.findall(pattern, text_normalized)
-            foto_count += len(matches)
+        # Referencias a fotografías (pies de foto, figuras, imágenes)
+        foto_count = self.evidence(text).count("pie_foto")
         
         return {
             "fotografias_encontradas": foto_count,
@@ -136,18 +205,11 @@ class InformeInspeccionValidator:
         secciones = config["secciones_obligatorias"]
         
         found_sections = self.find_sections(text, secciones)
+        notes = self.take_match_notes()
         
         # Agrupar variantes de secciones
         unique_sections = {}
-        section_groups = [
-            ["METODOLOGIA PARA LA INSPECCION", "METODOLOGÍA PARA LA INSPECCIÓN"],
-            ["UBICACION DEL PROYECTO", "UBICACIÓN DEL PROYECTO"],
-            ["INFORMACION RECOGIDA DE CAMPO", "INFORMACIÓN RECOGIDA DE CAMPO"],
-            ["SERVICIOS BASICOS EXISTENTES", "SERVICIOS BÁSICOS EXISTENTES"],
-            ["COMPATIBILIZACION DEL AREA A INTERVENIR", "COMPATIBILIZACIÓN DEL ÁREA A INTERVENIR"],
-            ["VERIFICACION DE DATOS CONSIGNADOS EN LA PARTIDA REGISTRAL", 
-             "VERIFICACIÓN DE DATOS CONSIGNADOS EN LA PARTIDA REGISTRAL"]
-        ]
+        section_groups = self.plan.variant_groups(secciones)
         
         for section in secciones:
             group_found = False
@@ -166,7 +228,7 @@ class InformeInspeccionValidator:
         foto_info = self.check_photographs(text)
         
         # Si hay fotografías en el documento, se considera que tiene panel fotográfico implícito
-        if foto_info["tiene_panel_fotografico"]:
+        if config["panel_fotografico_implicito"] and foto_info["tiene_panel_fotografico"]:
             unique_sections["PANEL FOTOGRÁFICO (IMPLÍCITO)"] = True
         
         found_count = sum(1 for v in unique_sections.values() if v)
@@ -182,59 +244,123 @@ class InformeInspeccionValidator:
         if foto_info["fotografias_encontradas"] > 0:
             warnings.append(f"Documento incluye {foto_info['fotografias_encontradas']} fotografías distribuidas en secciones")
         
+        details = {
+            "secciones_encontradas": found_count,
+            "secciones_requeridas": config["minimo_requerido"],
+            "secciones_totales": len(unique_sections),
+            "detalle_secciones": unique_sections,
+            "fotografias": foto_info["fotografias_encontradas"]
+        }
+        # Títulos hallados fuera de las líneas de título o de forma aproximada:
+        # se informan aparte para que el revisor los confirme en el documento
+        details.update(notes)
+        if "secciones_aproximadas" in notes:
+            warnings.append(f"{len(notes['secciones_aproximadas'])} sección(es) encontrada(s) por coincidencia aproximada")
+        if "secciones_en_cuerpo" in notes:
+            warnings.append(f"{len(notes['secciones_en_cuerpo'])} sección(es) encontrada(s) solo en el texto, no como título")
+        
         return ValidationResult(
-            component="ESTUDIO TÉCNICO DE INSPECCIÓN OCULAR",
+            component=config["componente"],
             is_valid=is_valid,
             missing_items=missing,
             warnings=warnings,
-            details={
-                "secciones_encontradas": found_count,
-                "secciones_requeridas": config["minimo_requerido"],
-                "secciones_totales": len(unique_sections),
-                "detalle_secciones": unique_sections,
-                "fotografias": foto_info["fotografias_encontradas"]
-            }
+            details=details
         )
     
     def validate_pdf(self, pdf_path: str) -> Dict:
         """Valida el Informe de Inspección Ocular desde PDF"""
-        print(f"\n{'='*80}")
-        print(f"VALIDACIÓN DEL ESTUDIO TÉCNICO DE INSPECCIÓN OCULAR")
-        print(f"{'='*80}")
-        print(f"Archivo: {pdf_path}")
-        print(f"Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
-        print(f"{'='*80}\n")
+        return self._with_correlation(pdf_path, self._validate_pdf, pdf_path)
+    
+    def validate_document(self, document: Document) -> Dict:
+        """Valida el informe sobre un documento ya extraído (compartido entre perfiles)"""
+        return self._with_correlation(document.path, self._validate_shared, document)
+    
+    def _with_correlation(self, pdf_path: str, validate, *args) -> Dict:
+        """Ejecuta una validación con id de correlación y eventos de inicio y fin"""
+        with correlation() as correlation_id, document_memory() as memory:
+            start = time.perf_counter()
+            log_event("inicio_documento", archivo=pdf_path)
+            report = validate(*args)
+            if "metadata" in report:
+                report["metadata"]["id_correlacion"] = correlation_id
+                report["metadata"]["memoria"] = memory.summary()
+            log_event(
+                "fin_documento",
+                archivo=pdf_path,
+                estado=report.get("metadata", {}).get("estado", report.get("status")),
+                duracion_ms=round((time.perf_counter() - start) * 1000, 3)
+            )
+            return report
+    
+    def _print_header(self, pdf_path: str):
+        console.info(f"\n{'='*80}")
+        console.info(f"VALIDACIÓN DEL ESTUDIO TÉCNICO DE INSPECCIÓN OCULAR")
+        console.info(f"{'='*80}")
+        console.info(f"Archivo: {pdf_path}")
+        console.info(f"Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
+        console.info(f"{'='*80}\n")
+    
+    def _validate_pdf(self, pdf_path: str) -> Dict:
+        """Ejecuta la validación del informe sobre un PDF"""
+        self._print_header(pdf_path)
         
-        print("Extrayendo texto del PDF...")
-        text = self.extract_text_from_pdf(pdf_path)
+        console.info("Extrayendo texto del PDF...")
+        with phase("extraccion", archivo=pdf_path) as info:
+            text = self.extract_text_from_pdf(pdf_path)
+            info["paginas"] = len(self.last_page_ends)
+            info["caracteres"] = len(text)
+            if self.last_image_pages:
+                info["paginas_solo_imagen"] = len(self.last_image_pages)
+            # Las líneas de título se indexan antes de perder los saltos de línea
+            info["lineas_titulo"] = len(self.heading_index(text))
         
+        return self._validate_text(pdf_path, text)
+    
+    def _validate_shared(self, document: Document) -> Dict:
+        """Ejecuta la validación del informe sobre un documento compartido"""
+        self._print_header(document.path)
+        self.last_page_ends = document.page_ends
+        self.last_image_pages = list(document.image_pages)
+        self.document = document
+        try:
+            return self._validate_text(document.path, document.text)
+        finally:
+            self.document = None
+    
+    def _validate_text(self, pdf_path: str, text: str) -> Dict:
+        """Valida el informe y arma el reporte"""
         if not text:
             return {
                 "status": "ERROR",
                 "message": "No se pudo extraer texto del PDF"
             }
         
-        print(f"✓ Texto extraído: {len(text)} caracteres\n")
+        console.info(f"✓ Texto extraído: {len(text)} caracteres\n")
         
-        print("Validando Estudio Técnico de Inspección Ocular...\n")
-        result = self.validate_informe_inspeccion(text)
+        console.info("Validando Estudio Técnico de Inspección Ocular...\n")
+        with phase("validate_informe_inspeccion") as info:
+            result = self.validate_informe_inspeccion(text)
+            info["componente"] = result.component
+            info["valido"] = result.is_valid
         self._print_result(result)
         
-        print(f"\n{'='*80}")
-        print(f"RESUMEN")
-        print(f"{'='*80}")
-        print(f"Estado: {'✓ APROBADO' if result.is_valid else '✗ OBSERVADO'}")
-        print(f"Secciones encontradas: {result.details['secciones_encontradas']}/{result.details['secciones_totales']}")
-        print(f"Cumplimiento: {(result.details['secciones_encontradas']/result.details['secciones_totales']*100):.1f}%")
-        print(f"Fotografías incluidas: {result.details['fotografias']}")
-        print(f"{'='*80}\n")
+        console.info(f"\n{'='*80}")
+        console.info(f"RESUMEN")
+        console.info(f"{'='*80}")
+        console.info(f"Estado: {'✓ APROBADO' if result.is_valid else '✗ OBSERVADO'}")
+        console.info(f"Secciones encontradas: {result.details['secciones_encontradas']}/{result.details['secciones_totales']}")
+        console.info(f"Cumplimiento: {(result.details['secciones_encontradas']/result.details['secciones_totales']*100):.1f}%")
+        console.info(f"Fotografías incluidas: {result.details['fotografias']}")
+        console.info(f"{'='*80}\n")
         
         report = {
             "metadata": {
                 "archivo": pdf_path,
                 "fecha_validacion": datetime.now().isoformat(),
-                "componente": "ESTUDIO TÉCNICO DE INSPECCIÓN OCULAR",
-                "estado": "APROBADO" if result.is_valid else "OBSERVADO"
+                "componente": result.component,
+                "estado": "APROBADO" if result.is_valid else "OBSERVADO",
+                "reglas": self.plan.nombre,
+                "version_reglas": self.plan.version
             },
             "validacion": {
                 "componente": result.component,
@@ -246,6 +372,22 @@ class InformeInspeccionValidator:
             "observaciones_generales": self._generate_observations(result)
         }
         
+        page_ends = self.document.page_ends if self.document is not None else self.last_page_ends
+        coverage = report["metadata"]["cobertura_texto"] = text_coverage(text, page_ends)
+        if coverage["sin_texto"]:
+            report["observaciones_generales"].append(
+                f"Páginas sin texto: {len(coverage['sin_texto'])} de {coverage['paginas']} "
+                f"(escaneadas o solo imagen; no se revisan sin OCR)"
+            )
+        
+        timed_out = self.document.timed_out_pages if self.document is not None else ()
+        if timed_out:
+            report["metadata"]["paginas_tiempo_agotado"] = list(timed_out)
+            report["observaciones_generales"].insert(
+                0, f"Extracción incompleta: tiempo agotado en {len(timed_out)} página(s) "
+                   f"({', '.join(map(str, timed_out))})"
+            )
+        
         return report
     
     def _print_result(self, result: ValidationResult):
@@ -253,17 +395,17 @@ class InformeInspeccionValidator:
         status_icon = "✓" if result.is_valid else "✗"
         status_text = "VÁLIDO" if result.is_valid else "OBSERVADO"
         
-        print(f"   {status_icon} {status_text}")
+        console.info(f"   {status_icon} {status_text}")
         
         if result.missing_items:
-            print(f"\n   Elementos faltantes:")
+            console.info(f"\n   Elementos faltantes:")
             for item in result.missing_items:
-                print(f"      • {item}")
+                console.info(f"      • {item}")
         
         if result.warnings:
-            print(f"\n   Información adicional:")
+            console.info(f"\n   Información adicional:")
             for warning in result.warnings:
-                print(f"      ℹ {warning}")
+                console.info(f"      ℹ {warning}")
     
     def _generate_observations(self, result: ValidationResult) -> List[str]:
         """Genera observaciones generales"""
@@ -286,17 +428,20 @@ class InformeInspeccionValidator:
         
         return observations
     
+    @logged_phase("export_report")
     def export_report(self, report: Dict, output_path: str = "reporte_inspeccion_ocular.json"):
         """Exporta reporte a JSON"""
         try:
             with open(output_path, 'w', encoding='utf-8') as f:
                 json.dump(report, f, ensure_ascii=False, indent=2)
-            print(f"\n✓ Reporte JSON exportado: {output_path}")
+            console.info(f"\n✓ Reporte JSON exportado: {output_path}")
             return True
         except Exception as e:
-            print(f"\n✗ Error al exportar reporte JSON: {e}")
+            log_failure("export_report", e, archivo=output_path)
+            console.info(f"\n✗ Error al exportar reporte JSON: {e}")
             return False
     
+    @logged_phase("export_report_txt")
     def export_report_txt(self, report: Dict, output_path: str = "reporte_inspeccion_ocular.txt"):
         """Exporta reporte a formato TXT legible"""
         try:
@@ -345,12 +490,14 @@ class InformeInspeccionValidator:
                 f.write("Fin del reporte\n")
                 f.write("="*80 + "\n")
             
-            print(f"✓ Reporte TXT exportado: {output_path}")
+            console.info(f"✓ Reporte TXT exportado: {output_path}")
             return True
         except Exception as e:
-            print(f"✗ Error al exportar reporte TXT: {e}")
+            log_failure("export_report_txt", e, archivo=output_path)
+            console.info(f"✗ Error al exportar reporte TXT: {e}")
             return False
     
+    @logged_phase("export_report_pdf")
     def export_report_pdf(self, report: Dict, output_path: str = "reporte_inspeccion_ocular.pdf"):
         """Exporta reporte a formato PDF profesional"""
         try:
@@ -494,12 +641,15 @@ class InformeInspeccionValidator:
             story.append(Spacer(1, 0.1*inch))
             
             detalle_secciones = val['detalles'].get('detalle_secciones', {})
+            secciones_aproximadas = val['detalles'].get('secciones_aproximadas', {})
             if detalle_secciones:
                 sections_data = [["Sección", "Estado"]]
                 
                 for seccion, encontrada in detalle_secciones.items():
                     estado_icon = "✓" if encontrada else "✗"
                     estado_text_cell = f"{estado_icon} {'Encontrada' if encontrada else 'Faltante'}"
+                    if seccion in secciones_aproximadas:
+                        estado_text_cell += " (aprox.)"
                     sections_data.append([seccion, estado_text_cell])
                 
                 sections_table = Table(sections_data, colWidths=[4.2*inch, 1.3*inch])
@@ -596,11 +746,12 @@ class InformeInspeccionValidator:
             
             doc.build(story)
             
-            print(f"✓ Reporte PDF exportado: {output_path}")
+            console.info(f"✓ Reporte PDF exportado: {output_path}")
             return True
             
         except Exception as e:
-            print(f"✗ Error al exportar reporte PDF: {e}")
+            log_failure("export_report_pdf", e, archivo=output_path)
+            console.info(f"✗ Error al exportar reporte PDF: {e}")
             import traceback
             traceback.print_exc()
             return False
@@ -608,30 +759,48 @@ class InformeInspeccionValidator:
 
 def main():
     """Función principal"""
-    import sys
+    parser = argparse.ArgumentParser(
+        usage="python rpa_validador.py <ruta_pdf> [opciones]",
+        epilog="Ejemplo: python rpa_validador.py entregable1.pdf"
+    )
+    parser.add_argument("pdf_path", nargs="?")
+    parser.add_argument("--reglas",
+                        help="Archivo de reglas (por defecto reglas/inspeccion_ocular.json; "
+                             "reglas/inspeccion_estricta.json para la validación estricta)")
+    parser.add_argument("--historial", default=DEFAULT_DB_PATH,
+                        help="Base de datos del historial de validaciones")
+    parser.add_argument("--sin-historial", action="store_true",
+                        help="No registrar el resultado en el historial")
+    parser.add_argument("--logs", default=DEFAULT_LOG_DIR,
+                        help="Carpeta de eventos estructurados (JSON Lines)")
+    parser.add_argument("--sin-logs", action="store_true", help="No registrar eventos en archivo")
+    parser.add_argument("--silencioso", action="store_true", help="Sin salida de consola")
+    args = parser.parse_args()
     
-    print("\n" + "="*80)
-    print("RPA - VALIDADOR DE ESTUDIO TÉCNICO DE INSPECCIÓN OCULAR")
-    print("Expediente Técnico IE N° 33065 Pacro Yuncan")
-    print("="*80 + "\n")
+    configure_logging(None if args.sin_logs else args.logs, console_enabled=not args.silencioso)
     
-    if len(sys.argv) < 2:
-        print("Uso: python rpa_inspeccion_ocular.py <ruta_pdf>")
-        print("\nEjemplo:")
-        print("  python rpa_inspeccion_ocular.py entregable1.pdf")
+    console.info("\n" + "="*80)
+    console.info("RPA - VALIDADOR DE ESTUDIO TÉCNICO DE INSPECCIÓN OCULAR")
+    console.info("Expediente Técnico IE N° 33065 Pacro Yuncan")
+    console.info("="*80 + "\n")
+    
+    if not args.pdf_path:
+        console.info("Uso: python rpa_inspeccion_ocular.py <ruta_pdf>")
+        console.info("\nEjemplo:")
+        console.info("  python rpa_inspeccion_ocular.py entregable1.pdf")
         return
     
-    pdf_path = sys.argv[1]
+    pdf_path = args.pdf_path
     
     if not os.path.exists(pdf_path):
-        print(f"✗ Error: El archivo '{pdf_path}' no existe")
+        console.info(f"✗ Error: El archivo '{pdf_path}' no existe")
         return
     
-    validator = InformeInspeccionValidator()
+    validator = InformeInspeccionValidator(args.reglas)
     report = validator.validate_pdf(pdf_path)
     
     if report.get("status") == "ERROR":
-        print(f"\n✗ Error: {report.get('message')}")
+        console.info(f"\n✗ Error: {report.get('message')}")
         return
     
     base_name = os.path.splitext(os.path.basename(pdf_path))[0]
@@ -640,23 +809,29 @@ def main():
     txt_output = f"reporte_{base_name}.txt"
     pdf_output = f"reporte_{base_name}.pdf"
     
-    validator.export_report(report, json_output)
-    validator.export_report_txt(report, txt_output)
-    validator.export_report_pdf(report, pdf_output)
+    with correlation(report["metadata"]["id_correlacion"]):
+        validator.export_report(report, json_output)
+        validator.export_report_txt(report, txt_output)
+        validator.export_report_pdf(report, pdf_output)
+    
+    if not args.sin_historial:
+        with ResultsStore(args.historial) as store:
+            store.save_report(report)
+        console.info(f"✓ Resultado registrado en historial: {args.historial}")
     
-    print("\n" + "="*80)
-    print("VALIDACIÓN COMPLETADA")
-    print("="*80)
-    print(f"\nEstado: {report['metadata']['estado']}")
-    print(f"Secciones encontradas: {report['validacion']['detalles']['secciones_encontradas']}/{report['validacion']['detalles']['secciones_totales']}")
+    console.info("\n" + "="*80)
+    console.info("VALIDACIÓN COMPLETADA")
+    console.info("="*80)
+    console.info(f"\nEstado: {report['metadata']['estado']}")
+    console.info(f"Secciones encontradas: {report['validacion']['detalles']['secciones_encontradas']}/{report['validacion']['detalles']['secciones_totales']}")
     porcentaje = (report['validacion']['detalles']['secciones_encontradas'] / report['validacion']['detalles']['secciones_totales'] * 100)
-    print(f"Cumplimiento: {porcentaje:.1f}%")
-    print(f"Fotografías: {report['validacion']['detalles']['fotografias']}")
-    print(f"\nReportes generados:")
-    print(f"  • {json_output}")
-    print(f"  • {txt_output}")
-    print(f"  • {pdf_output}")
-    print("\n")
+    console.info(f"Cumplimiento: {porcentaje:.1f}%")
+    console.info(f"Fotografías: {report['validacion']['detalles']['fotografias']}")
+    console.info(f"\nReportes generados:")
+    console.info(f"  • {json_output}")
+    console.info(f"  • {txt_output}")
+    console.info(f"  • {pdf_output}")
+    console.info("\n")
 
 
 if __name__ == "__main__":